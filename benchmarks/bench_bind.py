@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+"""Cost of the "configure once, bind per request" pattern: ``fs.bind(obj)``
+on a FieldSet configured with a few fields of a wide model, compared to the
+previous implementation which deep-copied every field of the model."""
+from copy import deepcopy
+
+from common import make_models, make_session, populate, bench, report
+
+from formalchemy import FieldSet
+from formalchemy.base import ModelRenderer
+from sqlalchemy.util import OrderedDict
+
+
+def deepcopy_bind(fs, model):
+    # what bind() used to do
+    mr = object.__new__(fs.__class__)
+    mr.__dict__ = dict(fs.__dict__)
+    ModelRenderer.rebind(mr, model)
+    mr._fields = OrderedDict([(key, deepcopy(field)) for key, field in fs._fields.iteritems()])
+    for field in mr._fields.itervalues():
+        field.parent = mr
+    mr._render_fields = OrderedDict([(field.key, deepcopy(field)) for field in fs._render_fields.itervalues()])
+    for field in mr._render_fields.itervalues():
+        field.parent = mr
+    return mr
+
+
+def main(columns=150, number=1000):
+    Base, Wide, Lookup = make_models(columns=columns)
+    session = make_session(Base)
+    obj, = populate(session, Wide, Lookup)
+
+    fs = FieldSet(Wide)
+    fs.configure(include=[getattr(fs, 'column_%03i' % i) for i in range(10)])
+
+    report('Bind (%i columns, 10 rendered)' % columns, [
+        ('deep copy of every field', bench(lambda: deepcopy_bind(fs, obj), number)),
+        ('fs.bind(obj)', bench(lambda: fs.bind(obj), number)),
+        ('fs.bind(obj).render()', bench(lambda: fs.bind(obj).render(), number / 10)),
+        ])
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+"""Scaling of ``FieldSet.configure()`` with the number of attributes of the
+model.  The cost per attribute should stay flat."""
+from common import make_models, bench, report
+
+from formalchemy import FieldSet
+
+
+def main(sizes=(10, 100, 200, 500, 1000)):
+    timings = []
+    for size in sizes:
+        Base, Wide, Lookup = make_models(columns=size, relations=0,
+                                         name='Wide%i' % size)
+        fs = FieldSet(Wide)
+        fields = [getattr(fs, 'column_%03i' % i) for i in range(size)]
+        exclude = fields[::2]
+        options = [field.label(field.key) for field in fields[1::2]]
+        number = max(1, 2000 / size)
+
+        def configure():
+            fs.configure(exclude=exclude, options=options)
+        seconds = bench(configure, number)
+        timings.append(('configure() %4i attributes' % size, seconds))
+        timings.append(('  per attribute', seconds / size))
+    report('Configure', timings)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+"""Cost of a ``FieldSet(Model)`` / ``Grid(Model)`` construction, with the
+introspection cache (warm) and without it (cold: the cache is cleared before
+each construction, which is what every construction used to cost)."""
+from common import make_models, bench, report
+
+from formalchemy import FieldSet, Grid
+from formalchemy import base
+
+
+def main(columns=150, number=100):
+    Base, Wide, Lookup = make_models(columns=columns)
+
+    def cold(cls):
+        def construct():
+            base.clear_introspection_cache()
+            cls(Wide)
+        return construct
+
+    def warm(cls):
+        def construct():
+            cls(Wide)
+        return construct
+
+    timings = []
+    for cls in (FieldSet, Grid):
+        timings.append(('%s(%i columns) cold' % (cls.__name__, columns),
+                        bench(cold(cls), number)))
+        timings.append(('%s(%i columns) warm' % (cls.__name__, columns),
+                        bench(warm(cls), number)))
+    report('Construction', timings)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""Rendering of an editable ``Grid`` of 100 rows with date, time and datetime
+columns.  Every row renders the same month, day, hour, minute and second
+selects; only the selected options differ."""
+import datetime
+
+import sqlalchemy as sa
+from sqlalchemy.ext.declarative import declarative_base
+
+from common import make_session, bench, report
+
+from formalchemy import FieldSet, Grid
+
+
+def main(rows=100):
+    Base = declarative_base()
+
+    class Event(Base):
+        __tablename__ = 'events'
+        id = sa.Column(sa.Integer, primary_key=True)
+        day = sa.Column(sa.Date)
+        hour = sa.Column(sa.Time)
+        start = sa.Column(sa.DateTime)
+        end = sa.Column(sa.DateTime)
+
+    session = make_session(Base)
+    origin = datetime.datetime(2010, 1, 1, 8, 30)
+    for i in range(rows):
+        start = origin + datetime.timedelta(days=i, minutes=7 * i)
+        session.add(Event(id=i + 1, day=start.date(), hour=start.time(),
+                          start=start, end=start + datetime.timedelta(hours=2)))
+    session.commit()
+    instances = session.query(Event).all()
+
+    grid = Grid(Event).bind(instances, session=session)
+    fs = FieldSet(Event)
+
+    def render_grid():
+        grid.rebind(instances, session=session)
+        return grid.render()
+
+    def render_fieldset():
+        return fs.bind(instances[0]).render()
+
+    timings = [('Grid %i rows, 4 date/time columns' % rows, bench(render_grid, 10)),
+               ('FieldSet, 4 date/time fields', bench(render_fieldset, 500))]
+    report('Dates', timings)
+
+if __name__ == '__main__':
+    main()
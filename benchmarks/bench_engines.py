@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""Render time of a ``FieldSet`` and a ``Grid`` with each template engine.
+Genshi is only measured when it is installed and given templates with the
+same markup, since FormAlchemy has no default genshi templates."""
+import os
+import sys
+
+from common import make_models, make_session, populate, bench, report
+
+from formalchemy import FieldSet, Grid
+from formalchemy import templates
+
+
+def main(columns=20, rows=100, number=50):
+    Base, Wide, Lookup = make_models(columns=columns, relations=1)
+    session = make_session(Base)
+    instances = populate(session, Wide, Lookup, count=rows)
+    engines = [('TempitaEngine', templates.TempitaEngine()),
+               ('NativeEngine', templates.NativeEngine())]
+    if templates.HAS_MAKO:
+        engines.insert(0, ('MakoEngine', templates.MakoEngine(
+                            input_encoding='utf-8', output_encoding='utf-8')))
+    directory = os.environ.get('GENSHI_TEMPLATES')
+    if templates.HAS_GENSHI and directory:
+        engines.append(('GenshiEngine', templates.GenshiEngine(directories=[directory])))
+    else:
+        sys.stderr.write('GenshiEngine skipped: set GENSHI_TEMPLATES to a '
+                         'directory containing fieldset.html and grid.html\n')
+
+    fs = FieldSet(Wide).bind(instances[0])
+    grid = Grid(Wide).bind(instances, session=session)
+    timings = []
+    for name, engine in engines:
+        fs.engine = grid.engine = engine
+        fs.readonly = grid.readonly = False
+        timings.append(('%s FieldSet' % name, bench(fs.render, number)))
+        timings.append(('%s Grid (%i rows)' % (name, rows), bench(grid.render, max(1, number / 10))))
+        fs.readonly = grid.readonly = True
+        timings.append(('%s FieldSet, readonly' % name, bench(fs.render, number)))
+        timings.append(('%s Grid (%i rows), readonly' % (name, rows), bench(grid.render, max(1, number / 10))))
+    report('Engines (%i columns)' % columns, timings)
+
+if __name__ == '__main__':
+    main()
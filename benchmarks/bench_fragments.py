@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""Render time of a readonly ``Grid`` page and of a readonly ``FieldSet``
+(a ``show`` page) without and with a warm ``FragmentCache``.  Like in a
+request, the rows are loaded for each render, so the relations rendered
+without cache are lazy loaded."""
+import os
+import shutil
+import tempfile
+
+from common import make_models, make_session, populate, bench, report
+
+from formalchemy import FieldSet, Grid
+from formalchemy import config
+from formalchemy.cache import FragmentCache, MemoryBackend, DbmBackend
+
+
+def main(columns=20, rows=100, number=20):
+    Base, Wide, Lookup = make_models(columns=columns, relations=3)
+    session = make_session(Base)
+    populate(session, Wide, Lookup, count=rows)
+    grid = Grid(Wide)
+    grid.configure(readonly=True)
+    fs = FieldSet(Wide)
+    fs.configure(readonly=True)
+
+    def render_grid():
+        session.expunge_all()
+        grid.rebind(session.query(Wide).all(), session=session)
+        return grid.render()
+
+    def render_fieldset():
+        session.expunge_all()
+        fs.rebind(session.query(Wide).get(1), session=session)
+        return fs.render()
+
+    dirname = tempfile.mkdtemp()
+    dbm = DbmBackend(os.path.join(dirname, 'fragments'))
+    timings = []
+    try:
+        for name, cache in [('no cache', None),
+                            ('MemoryBackend', FragmentCache(MemoryBackend())),
+                            ('DbmBackend', FragmentCache(dbm))]:
+            config.fragment_cache = cache
+            # warm the cache
+            render_grid()
+            timings.append(('Grid (%i rows), %s' % (rows, name), bench(render_grid, number)))
+            timings.append(('FieldSet, %s' % name, bench(render_fieldset, number * 10)))
+    finally:
+        config.fragment_cache = None
+        dbm.close()
+        shutil.rmtree(dirname)
+    report('Readonly fragments (%i columns, 3 relations)' % columns, timings)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""The tags of ``formalchemy.helpers`` compared to the same tags built with
+WebHelpers, which the helpers used to call.  The markup is the same."""
+from common import bench, report
+
+from webhelpers.html import HTML, literal, tags
+from formalchemy import helpers as h
+
+
+def main(number=20000):
+    cases = [
+        ('text_field',
+         lambda: h.text_field('Wide-1-column_001', value=u'column_001 1', maxlength=40),
+         lambda: tags.text('Wide-1-column_001', value=u'column_001 1', id='Wide-1-column_001', maxlength=40)),
+        ('hidden_field',
+         lambda: h.hidden_field('Wide-1-id', value=1),
+         lambda: tags.hidden('Wide-1-id', value=1, id='Wide-1-id')),
+        ('check_box',
+         lambda: h.check_box('Wide-1-flag', True, checked=True),
+         lambda: tags.checkbox('Wide-1-flag', True, checked=True, id='Wide-1-flag')),
+        ('text_area',
+         lambda: h.text_area('Wide-1-notes', u'Some <notes>'),
+         lambda: tags.textarea('Wide-1-notes', u'Some <notes>', id='Wide-1-notes')),
+        ('label',
+         lambda: h.label(u'Column 001', for_='Wide-1-column_001'),
+         lambda: HTML.tag('label', _closed=False, **{'for': 'Wide-1-column_001'}) + literal(u'Column 001') + literal('</label>')),
+        ('content_tag',
+         lambda: h.content_tag('span', u'value', id='Wide-1-column_001'),
+         lambda: HTML.tag('span', _closed=False, id='Wide-1-column_001') + HTML(u'value') + literal('</span>')),
+        ('select_around',
+         lambda: h.select_around('Wide-1-lookup_0', u'<option value="1">One</option>'),
+         lambda: tags.select('Wide-1-lookup_0', None, [], id='Wide-1-lookup_0')),
+        ]
+    timings = []
+    for name, helper, webhelpers in cases:
+        assert name == 'select_around' or helper() == webhelpers(), name
+        timings.append(('%-15s formalchemy.helpers' % name, bench(helper, number)))
+        timings.append(('%-15s WebHelpers' % name, bench(webhelpers, number)))
+    report('Helpers (per tag)', timings, unit='us')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+"""Render throughput of forms needing translations: each render looks up
+the translation catalog for the template, and date fields for their month
+names."""
+import datetime
+
+import sqlalchemy as sa
+from sqlalchemy.ext.declarative import declarative_base
+
+from common import bench, report
+
+from formalchemy import FieldSet, Grid
+from formalchemy.i18n import get_translator
+
+Base = declarative_base()
+
+class Event(Base):
+    __tablename__ = 'events'
+    id = sa.Column(sa.Integer, primary_key=True)
+    name = sa.Column(sa.Unicode(40))
+    date = sa.Column(sa.Date)
+
+
+def main(rows=100):
+    events = [Event(id=i + 1, name=u'Event %i' % i,
+                    date=datetime.date(2010, 1, 1) + datetime.timedelta(i))
+              for i in range(rows)]
+    fs = FieldSet(Event).bind(events[0])
+    grid = Grid(Event).bind(events)
+    report('Translations', [
+        ('get_translator()', bench(lambda: get_translator('fr'), 1000)),
+        ('FieldSet.render()', bench(lambda: fs.render(lang='fr'), 100)),
+        ('Grid.render(), %i rows' % rows, bench(lambda: grid.render(lang='fr'), 5)),
+        ])
+
+if __name__ == '__main__':
+    main()
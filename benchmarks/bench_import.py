@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""Wall time and number of modules loaded by ``import formalchemy`` in a new
+interpreter, then by the first render of a form (which loads what the
+import no longer does: template engine, mako, mapper compilation)."""
+import os
+import sys
+import subprocess
+
+from common import report
+
+SCRIPT = r'''
+import sys, time
+sys.path.insert(0, %(path)r)
+modules = len(sys.modules)
+start = time.time()
+import formalchemy
+imported = time.time()
+print imported - start, len(sys.modules) - modules,
+import sqlalchemy as sa
+from sqlalchemy.ext.declarative import declarative_base
+class User(declarative_base()):
+    __tablename__ = 'users'
+    id = sa.Column(sa.Integer, primary_key=True)
+    name = sa.Column(sa.Unicode(30))
+modules = len(sys.modules)
+start = time.time()
+formalchemy.FieldSet(User).render()
+print time.time() - start, len(sys.modules) - modules,
+print ' '.join([name for name in ('mako', 'genshi', 'pylons') if name in sys.modules]) or '-'
+'''
+
+
+def main(number=5):
+    path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    script = SCRIPT % dict(path=path)
+    runs = []
+    for i in range(number):
+        output = subprocess.Popen([sys.executable, '-c', script],
+                                  stdout=subprocess.PIPE).communicate()[0]
+        runs.append(output.split())
+    # best wall times, module counts do not vary
+    best = min(runs, key=lambda run: float(run[0]))
+    first_render = min([float(run[2]) for run in runs])
+    report('import formalchemy', [
+        ('import formalchemy', float(best[0])),
+        ('first render', first_render),
+        ])
+    report('Modules', [
+        ('loaded by import formalchemy', int(best[1])),
+        ('loaded by the first render', int(best[3])),
+        ], unit='modules')
+    print 'optional packages loaded:', ' '.join(best[4:])
+
+if __name__ == '__main__':
+    main()
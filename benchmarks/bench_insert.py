@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+"""Cost of building a form by inserting many manual fields with
+``FieldSet.insert()``, one at a time and in one call."""
+from common import make_models, bench, report
+
+from formalchemy import FieldSet, Field
+
+
+def main(sizes=(10, 100, 500, 1000)):
+    Base, Wide, Lookup = make_models(columns=10, relations=0)
+    timings = []
+    for size in sizes:
+        names = ['extra_%04i' % i for i in range(size)]
+        number = max(1, 2000 / size)
+
+        def one_by_one():
+            fs = FieldSet(Wide)
+            for name in names:
+                fs.insert(fs.column_005, Field(name))
+
+        def batch():
+            fs = FieldSet(Wide)
+            fs.insert(fs.column_005, *[Field(name) for name in names])
+
+        timings.append(('insert() %4i fields, one by one' % size, bench(one_by_one, number)))
+        timings.append(('insert() %4i fields, in one call' % size, bench(batch, number)))
+    report('Insert', timings)
+
+if __name__ == '__main__':
+    main()
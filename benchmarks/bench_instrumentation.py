@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""Cost of the instrumentation on the render of a 100 rows ``Grid`` and on
+the validation of a ``FieldSet``: disabled (the default, which should cost
+nothing), and enabled with an observer."""
+from common import make_models, make_session, populate, bench, report
+
+from formalchemy import config, FieldSet, Grid
+from formalchemy.instrumentation import Instrumentation
+
+
+def main(rows=100):
+    Base, Wide, Lookup = make_models(columns=10, relations=1)
+    session = make_session(Base)
+    instances = populate(session, Wide, Lookup, count=rows)
+    grid = Grid(Wide).bind(instances, session=session)
+    data = dict(('Wide-1-column_%03i' % i, u'value') for i in range(10))
+    data['Wide-1-lookup_0_id'] = u'1'
+
+    def render():
+        grid.rebind(instances, session=session)
+        return grid.render()
+
+    def validate():
+        return FieldSet(Wide).bind(instances[0], data=data).validate()
+
+    instrumentation = Instrumentation()
+    reports = []
+    instrumentation.subscribe(lambda report: reports.append(report.elapsed))
+    timings = []
+    for label, setting in (('disabled', None), ('enabled', instrumentation)):
+        config.instrumentation = setting
+        timings.append(('Grid %i rows, %s' % (rows, label), bench(render, 10)))
+        timings.append(('FieldSet.validate(), %s' % label, bench(validate, 200)))
+    config.instrumentation = None
+    report('Instrumentation', timings)
+
+if __name__ == '__main__':
+    main()
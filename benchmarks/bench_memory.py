@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""Memory held by bound FieldSets and by a Grid after rendering a page.
+
+Sizes are computed with ``sys.getsizeof`` by following the FormAlchemy
+objects (renderers, fields and their renderers) and the builtin containers
+they own.  Models, sessions, classes and SQLAlchemy objects are shared and
+are not counted."""
+import gc
+import sys
+
+from common import make_models, make_session, populate, report
+
+from formalchemy import FieldSet, Grid
+from formalchemy import base, fields
+
+CONTAINERS = (dict, list, tuple, set)
+OWNERS = (base.ModelRenderer, fields.AbstractField, fields.FieldRenderer)
+
+
+def footprint(obj, seen=None):
+    """bytes owned by `obj`"""
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        for key, value in obj.iteritems():
+            size += footprint(key, seen) + footprint(value, seen)
+    elif isinstance(obj, CONTAINERS):
+        for value in obj:
+            size += footprint(value, seen)
+    elif isinstance(obj, OWNERS):
+        # the __dict__ and slot values. (accessing __dict__ would allocate it)
+        for value in gc.get_referents(obj):
+            if isinstance(value, CONTAINERS + OWNERS):
+                size += footprint(value, seen)
+    return size
+
+
+def main(columns=40, rows=500, number=100):
+    Base, Wide, Lookup = make_models(columns=columns)
+    session = make_session(Base)
+    instances = populate(session, Wide, Lookup, count=rows)
+
+    fs = FieldSet(Wide)
+    fs.configure(include=[getattr(fs, 'column_%03i' % i) for i in range(10)])
+    bound = [fs.bind(obj) for obj in instances[:number]]
+    for b in bound:
+        b.render()
+
+    # what is shared with fs is not counted
+    seen = set()
+    footprint(fs, seen)
+    fs_size = sum([footprint(b, seen) for b in bound]) / len(bound)
+
+    grid = Grid(Wide).bind(instances, session=session)
+    grid.configure(readonly=True)
+    grid.render()
+
+    report('Memory (%i columns)' % columns, [
+        ('bound and rendered FieldSet (10 fields)', fs_size),
+        ('Grid page (%i rows, readonly)' % rows, footprint(grid)),
+        ], unit='bytes')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""Cost of the options of a relation to a large lookup table, when the
+related instances are loaded (labelled by ``unicode(item)``) and when only
+``(label, pk)`` rows are fetched with ``with_option_label()``."""
+from common import make_models, make_session, populate, bench, report
+
+from formalchemy import FieldSet
+
+
+def main(lookups=20000, number=5):
+    Base, Wide, Lookup = make_models(columns=5, relations=1)
+    session = make_session(Base)
+    populate(session, Wide, Lookup, count=1, related_count=0)
+    session.execute(Lookup.__table__.insert(),
+                    [dict(id=i + 1, label=u'Lookup %i' % i) for i in range(lookups)])
+    session.commit()
+
+    fs = FieldSet(Wide)
+    fs.configure(include=[fs.lookup_0])
+    labelled = FieldSet(Wide)
+    labelled.configure(include=[labelled.lookup_0.with_option_label(Lookup.label)])
+
+    def options(fs):
+        def func():
+            # start from an empty identity map, like a new request would
+            session.expunge_all()
+            obj = session.query(Wide).get(1)
+            fs.bind(obj, session=session).lookup_0._relation_options()
+        return func
+
+    def render(fs):
+        def func():
+            session.expunge_all()
+            obj = session.query(Wide).get(1)
+            fs.bind(obj, session=session).render()
+        return func
+
+    report('Options of a %i rows table' % lookups, [
+        ('options, instances loaded', bench(options(fs), number)),
+        ('options, (label, pk) rows', bench(options(labelled), number)),
+        ('render, instances loaded', bench(render(fs), number)),
+        ('render, (label, pk) rows', bench(render(labelled), number)),
+        ])
+
+if __name__ == '__main__':
+    main()
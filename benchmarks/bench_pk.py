@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+"""Cost of extracting primary keys and raw values, as done for every option
+and every row of a Grid, over 100k instances of a single and of a composite
+PK model."""
+from common import make_models, bench, report
+
+import sqlalchemy as sa
+from formalchemy import FieldSet
+from formalchemy.fields import _pk
+
+
+def main(count=100000):
+    Base, Wide, Lookup = make_models(columns=10, relations=0)
+
+    class Composite(Base):
+        __tablename__ = 'composites'
+        id = sa.Column(sa.Integer, primary_key=True)
+        code = sa.Column('CODE', sa.Unicode(10), primary_key=True)
+
+    singles = [Wide(id=i) for i in xrange(count)]
+    composites = [Composite(id=i, code=u'%i' % i) for i in xrange(count)]
+
+    fs = FieldSet(Wide)
+    field = fs.column_001
+    def raw_values():
+        for obj in singles:
+            field.parent.model = obj
+            field.raw_value
+
+    report('Primary keys (%i instances)' % count, [
+        ('_pk(), single column', bench(lambda: [_pk(o) for o in singles], 1)),
+        ('_pk(), composite', bench(lambda: [_pk(o) for o in composites], 1)),
+        ('field.raw_value, empty column', bench(raw_values, 1)),
+        ])
+
+if __name__ == '__main__':
+    main()
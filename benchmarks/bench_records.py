@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+"""Json listing of a ``Grid`` of 100 rows, as built by the admin
+applications: the values read by rebinding the grid to each row, as they
+used to be, and with ``records()``."""
+from common import make_models, make_session, populate, bench, report
+
+from formalchemy import Grid
+from formalchemy.fields import _pk, _stringify
+
+
+def main(rows=100):
+    Base, Wide, Lookup = make_models(columns=10, relations=1)
+    session = make_session(Base)
+    instances = populate(session, Wide, Lookup, count=rows)
+    grid = Grid(Wide).bind(instances, session=session)
+    keys = grid.render_fields.keys()
+
+    def rebound(text):
+        values = []
+        for row in grid.rows:
+            grid._set_active(row)
+            if text:
+                fields = [_stringify(field.render_readonly()) for field in grid.render_fields.values()]
+            else:
+                fields = [field.model_value for field in grid.render_fields.values()]
+            values.append(dict(zip(keys, fields), id=_pk(row)))
+        return values
+
+    def records(text):
+        return [dict(zip(keys, fields), id=pk) for pk, fields in grid.records(text=text)]
+
+    timings = []
+    for text, label in ((False, 'values'), (True, 'text')):
+        assert rebound(text) == records(text)
+        timings.append(('_set_active() per row, %s' % label, bench(lambda: rebound(text), 20)))
+        timings.append(('records(), %s' % label, bench(lambda: records(text), 20)))
+    report('Json listing of %i rows' % rows, timings)
+
+if __name__ == '__main__':
+    main()
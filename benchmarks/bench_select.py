@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+"""Rendering of selects and checkbox sets with many options, most of them
+selected, as done for each row of a grid sharing the same options."""
+from common import bench, report
+
+from formalchemy import Field, FieldSet, types
+
+
+def main(sizes=(100, 1000, 5000)):
+    timings = []
+    for size in sizes:
+        options = [('Option %i' % i, i) for i in range(size)]
+        selected = range(0, size, 2)
+
+        class Form(object):
+            single = Field(type=types.Integer, value=size / 2).dropdown(options=options)
+            many = Field(type=types.Integer, value=selected).dropdown(options=options, multiple=True)
+            boxes = Field(type=types.Integer, value=selected).checkbox(options=options)
+        fs = FieldSet(Form)
+        number = max(1, 20000 / size)
+        timings.append(('select, %4i options' % size, bench(fs.single.render, number)))
+        timings.append(('multiple select, %4i options' % size, bench(fs.many.render, number)))
+        timings.append(('checkboxes, %4i options' % size, bench(fs.boxes.render, number / 10 or 1)))
+    report('Options', timings)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+"""Time to the first byte and size of the largest string built when
+rendering a readonly ``Grid`` bound to a query with ``render()`` and with
+``render_iter()``.  With ``render_iter()`` both should not depend on the
+number of rows."""
+from common import make_models, make_session, populate, bench, report
+
+from formalchemy import Grid
+
+
+def main(sizes=(500, 5000), chunk_size=100):
+    Base, Wide, Lookup = make_models(columns=10, relations=1)
+    session = make_session(Base)
+    populate(session, Wide, Lookup, count=max(sizes))
+    grid = Grid(Wide)
+    grid.configure(readonly=True)
+    timings = []
+    strings = []
+    for size in sizes:
+        def query():
+            session.expunge_all()
+            return grid.prepare_query(session.query(Wide)).limit(size).yield_per(chunk_size)
+
+        def whole():
+            return grid.bind(query(), session=session).render()
+
+        def first_chunk():
+            return grid.bind(query(), session=session).render_iter(chunk_size).next()
+
+        number = max(1, 5000 / size)
+        timings.append(('render()           %5i rows, first byte' % size, bench(whole, number)))
+        timings.append(('render_iter()      %5i rows, first byte' % size, bench(first_chunk, number)))
+        biggest = max([len(chunk) for chunk in
+                       grid.bind(query(), session=session).render_iter(chunk_size)])
+        strings.append(('render()           %5i rows, html' % size, len(whole())))
+        strings.append(('render_iter()      %5i rows, largest chunk' % size, biggest))
+    report('Streaming (%i rows per chunk)' % chunk_size, timings)
+    report('Largest string', strings, unit='bytes')
+
+if __name__ == '__main__':
+    main()
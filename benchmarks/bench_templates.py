@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+"""Startup cost of the template engines (what each new process pays before
+its first render), without and with a persistent ``cache_dir``."""
+import shutil
+import tempfile
+
+from common import bench, report
+
+from formalchemy import templates
+
+
+def main(number=20):
+    cache_dir = tempfile.mkdtemp()
+    try:
+        def engine(cls, **kw):
+            def func():
+                # a new process has not processed the bundled templates yet
+                templates._mako_sources.clear()
+                cls(**kw).preload()
+            return func
+        mako = dict(input_encoding='utf-8', output_encoding='utf-8')
+        # fill the cache
+        templates.MakoEngine(cache_dir=cache_dir, **mako)
+        templates.TempitaEngine(cache_dir=cache_dir)
+        report('Engine startup', [
+            ('MakoEngine()', bench(engine(templates.MakoEngine, **mako), number)),
+            ('MakoEngine(cache_dir)', bench(engine(templates.MakoEngine, cache_dir=cache_dir, **mako), number)),
+            ('MakoEngine(cache_dir, production)', bench(engine(templates.MakoEngine, cache_dir=cache_dir, production=True, **mako), number)),
+            ('TempitaEngine()', bench(engine(templates.TempitaEngine), number)),
+            ('TempitaEngine(cache_dir)', bench(engine(templates.TempitaEngine, cache_dir=cache_dir), number)),
+            ('TempitaEngine(cache_dir, production)', bench(engine(templates.TempitaEngine, cache_dir=cache_dir, production=True), number)),
+            ])
+    finally:
+        shutil.rmtree(cache_dir)
+
+if __name__ == '__main__':
+    main()
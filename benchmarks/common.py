@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""Shared helpers for the FormAlchemy benchmarks.
+
+Each ``bench_*.py`` script of this directory is standalone and can be run
+with::
+
+    $ bin/python benchmarks/bench_construction.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sqlalchemy as sa
+from sqlalchemy.orm import relation, scoped_session, sessionmaker
+from sqlalchemy.ext.declarative import declarative_base
+
+
+def make_models(columns=150, relations=3, name='Wide'):
+    """Return a ``(Base, model, related)`` tuple. ``model`` is a mapped class
+    with ``columns`` Unicode columns and ``relations`` many-to-one relations
+    to the ``related`` lookup class."""
+    Base = declarative_base()
+
+    class Lookup(Base):
+        __tablename__ = '%s_lookups' % name.lower()
+        id = sa.Column(sa.Integer, primary_key=True)
+        label = sa.Column(sa.Unicode(40), nullable=False)
+        def __unicode__(self):
+            return self.label
+
+    attrs = dict(__tablename__='%ss' % name.lower(),
+                 id=sa.Column(sa.Integer, primary_key=True))
+    for i in range(columns):
+        attrs['column_%03i' % i] = sa.Column(sa.Unicode(40), nullable=bool(i % 2))
+    for i in range(relations):
+        attrs['lookup_%i_id' % i] = sa.Column(sa.Integer, sa.ForeignKey(Lookup.id))
+        attrs['lookup_%i' % i] = relation(Lookup, primaryjoin=attrs['lookup_%i_id' % i] == Lookup.id)
+    model = type(name, (Base,), attrs)
+    return Base, model, Lookup
+
+
+def make_session(Base):
+    """Return a session bound to a fresh in-memory sqlite database"""
+    engine = sa.create_engine('sqlite://')
+    Base.metadata.create_all(engine)
+    return scoped_session(sessionmaker(bind=engine))()
+
+
+def populate(session, model, related, count=1, related_count=10):
+    """Store ``related_count`` lookups and ``count`` instances of ``model``
+    (created by :func:`make_models`), and return the instances"""
+    lookups = [related(id=i + 1, label=u'Lookup %i' % i) for i in range(related_count)]
+    session.add_all(lookups)
+    columns = [c.key for c in model.__table__.c if c.key.startswith('column_')]
+    instances = []
+    for i in range(count):
+        obj = model(id=i + 1)
+        for column in columns:
+            setattr(obj, column, u'%s %i' % (column, i))
+        for j, lookup in enumerate(lookups[:3]):
+            setattr(obj, 'lookup_%i' % j, lookups[(i + j) % len(lookups)])
+        instances.append(obj)
+    session.add_all(instances)
+    session.commit()
+    return instances
+
+
+def bench(func, number=100, repeat=3):
+    """Return the best time (in seconds) of ``repeat`` runs of ``number``
+    calls of ``func``, per call"""
+    timings = []
+    for i in range(repeat):
+        start = time.time()
+        for j in xrange(number):
+            func()
+        timings.append((time.time() - start) / number)
+    return min(timings)
+
+
+def report(title, results, unit='ms'):
+    """print a list of ``(label, value)``.  values are timings in seconds,
+    printed in milliseconds (or microseconds with ``unit='us'``), unless
+    another ``unit`` is given"""
+    print title
+    print '=' * len(title)
+    for label, value in results:
+        if unit == 'ms':
+            value *= 1000
+        elif unit == 'us':
+            value *= 1000000
+        print '%-45s %10.3f %s' % (label, value, unit)
+    print
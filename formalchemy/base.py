@@ -19,7 +19,6 @@ from sqlalchemy.orm import compile_mappers, object_session, class_mapper
 from sqlalchemy.orm.session import Session
 from sqlalchemy.orm.scoping import ScopedSession
 from sqlalchemy.orm.dynamic import DynamicAttributeImpl
-from sqlalchemy.util import OrderedDict
 
 try:
     from sqlalchemy.orm.exc import UnmappedInstanceError
@@ -31,9 +30,17 @@ except ImportError:
 
 
 import fields, fatypes
+from formalchemy.instrumentation import instrumented
 
 
-compile_mappers() # initializes InstrumentedAttributes
+_mappers_compiled = []
+
+def _compile_mappers():
+    """initializes InstrumentedAttributes. Done when the first renderer is
+    created instead of at import time, when the models may not be defined"""
+    if not _mappers_compiled:
+        compile_mappers()
+        _mappers_compiled.append(True)
 
 
 try:
@@ -48,6 +55,62 @@ except ImportError:
         return getattr(cls, p.key)
 
 
+# Process-wide cache of the fields generated by introspecting a mapped class,
+# keyed by mapper.  Values are `(properties, fields)` pairs: `properties` is
+# the tuple of mapper properties the fields were computed from and is used to
+# detect a reconfigured mapper (new backrefs, `add_property`...), `fields` is
+# the list of unbound `AttributeField` templates.
+_introspection_cache = {}
+
+def _introspect(cls, renderer):
+    """
+    Return the list of unbound `AttributeField` templates for the mapped
+    class `cls`.  `renderer` is the `ModelRenderer` being constructed; it is
+    only used while the templates are computed.
+    """
+    mapper = class_mapper(cls)
+    properties = tuple(mapper.iterate_properties)
+    try:
+        cached_properties, template = _introspection_cache[mapper]
+    except KeyError:
+        pass
+    else:
+        if cached_properties == properties:
+            return template
+
+    # load synonyms so we can ignore them
+    synonyms = set(p for p in properties
+                   if isinstance(p, SynonymProperty))
+    # load discriminators so we can ignore them
+    discs = set(p for p in properties
+                if hasattr(p, '_is_polymorphic_discriminator')
+                and p._is_polymorphic_discriminator)
+    synonym_names = set(s.name for s in synonyms)
+    # attributes we're interested in
+    attrs = []
+    for p in properties:
+        attr = _get_attribute(cls, p)
+        if ((isinstance(p, SynonymProperty) or attr.property.key not in synonym_names)
+            and not isinstance(attr.impl, DynamicAttributeImpl)
+            and p not in discs):
+            attrs.append(attr)
+    # sort relations last
+    L = [fields.AttributeField(attr, renderer) for attr in attrs]
+    L.sort(lambda a, b: cmp(a.is_relation, b.is_relation)) # note, key= not used for 2.3 support
+    # don't keep a reference to the renderer (and its model) in the cache
+    template = [field.bind(None) for field in L]
+    _introspection_cache[mapper] = (properties, template)
+    return template
+
+def clear_introspection_cache():
+    """
+    Forget the fields computed for all mapped classes.  Reconfigured mappers
+    are detected automatically; this is only useful to release memory, e.g.
+    after `sqlalchemy.orm.clear_mappers()`.
+    """
+    _introspection_cache.clear()
+
+
 def prettify(text):
     """
     Turn an attribute name into something prettier, for a default label where none is given.
@@ -58,6 +121,203 @@ def prettify(text):
     return text.replace("_", " ").capitalize()
 
 
+class FieldRegistry(dict):
+    """
+    The ordered dict of `{key: Field}` used for the `_fields` and
+    `_render_fields` of a `ModelRenderer`.
+
+    Fields are also indexed by themselves (they hash on their attribute, or on
+    their name for manual fields) so that finding the field equal to a given
+    one does not require a scan, and the order is kept in a linked list so
+    that fields can be inserted, moved and removed anywhere in constant time.
+    """
+    def __init__(self, ____sequence=None, **kwargs):
+        self._index = {}
+        # see snapshot()
+        self._snapshot = None
+        # key: [previous link, next link, key]
+        self._links = {}
+        self._root = root = []
+        root[:] = [root, root, None]
+        self.update(____sequence, **kwargs)
+
+    def _link(self, key, successor):
+        # link `key` before the `successor` link
+        predecessor = successor[0]
+        predecessor[1] = successor[0] = self._links[key] = [predecessor, successor, key]
+
+    def _unlink(self, key):
+        predecessor, successor, key = self._links.pop(key)
+        predecessor[1] = successor
+        successor[0] = predecessor
+
+    def _unindex(self, key, field):
+        if self._index.get(field) == key:
+            del self._index[field]
+
+    def __setitem__(self, key, field):
+        self._snapshot = None
+        if key in self:
+            self._unindex(key, self[key])
+        else:
+            self._link(key, self._root)
+        dict.__setitem__(self, key, field)
+        self._index[field] = key
+
+    def __delitem__(self, key):
+        self._snapshot = None
+        field = dict.pop(self, key)
+        self._unlink(key)
+        self._unindex(key, field)
+
+    def __iter__(self):
+        root = self._root
+        link = root[1]
+        while link is not root:
+            yield link[2]
+            link = link[1]
+
+    def keys(self):
+        return list(self)
+
+    def values(self):
+        return [self[key] for key in self]
+
+    def items(self):
+        return [(key, self[key]) for key in self]
+
+    def iterkeys(self):
+        return iter(self.keys())
+
+    def itervalues(self):
+        return iter(self.values())
+
+    def iteritems(self):
+        return iter(self.items())
+
+    def update(self, ____sequence=None, **kwargs):
+        if ____sequence is not None:
+            if hasattr(____sequence, 'keys'):
+                for key in ____sequence.keys():
+                    self[key] = ____sequence[key]
+            else:
+                for key, field in ____sequence:
+                    self[key] = field
+        if kwargs:
+            self.update(kwargs)
+
+    def setdefault(self, key, field):
+        if key not in self:
+            self[key] = field
+        return self[key]
+
+    def pop(self, key, *default):
+        if key not in self:
+            return dict.pop(self, key, *default)
+        field = self[key]
+        del self[key]
+        return field
+
+    def popitem(self):
+        if not self:
+            raise KeyError('dictionary is empty')
+        key = self._root[0][2]
+        return key, self.pop(key)
+
+    def clear(self):
+        self._snapshot = None
+        dict.clear(self)
+        self._index.clear()
+        self._links.clear()
+        self._root[:] = [self._root, self._root, None]
+
+    def copy(self):
+        return self.__copy__()
+
+    def __copy__(self):
+        return self.__class__(self.items())
+
+    def __reduce__(self):
+        # the links are rebuilt from the items, for deepcopy and pickle
+        return (self.__class__, (self.items(),))
+
+    def sort(self, *args, **kwargs):
+        keys = self.keys()
+        keys.sort(*args, **kwargs)
+        self.reorder(keys)
+
+    def snapshot(self):
+        """return the fields as a `{key: field}` dict whose `ordered`
+        attribute lists the `(key, field)` pairs in order. Later changes of
+        the registry do not modify it: it is shared until the next one"""
+        if self._snapshot is None:
+            self._snapshot = _FieldsSnapshot(self.items())
+        return self._snapshot
+
+    def has_field(self, field):
+        """True iff a field equal to `field` is registered"""
+        return field in self._index
+
+    def get_field(self, field, default=None):
+        """return the registered field equal to `field`"""
+        try:
+            return self[self._index[field]]
+        except KeyError:
+            return default
+
+    def insert(self, key, items, after=False):
+        """Insert the `(key, field)` pairs of `items` before (or after) `key`,
+        in the given order.  Keys which are already registered are moved."""
+        items = _unique_items(items)
+        for new_key, field in items:
+            if new_key == key:
+                raise ValueError('can not move %s relative to itself' % key)
+        self._snapshot = None
+        # unlink the moved keys first: one of them may be the anchor's
+        # neighbour
+        for new_key, field in items:
+            if new_key in self:
+                self._unlink(new_key)
+                self._unindex(new_key, self[new_key])
+        link = self._links[key]
+        if after:
+            link = link[1]
+        for new_key, field in items:
+            self._link(new_key, link)
+            dict.__setitem__(self, new_key, field)
+            self._index[field] = new_key
+
+    def reorder(self, keys):
+        """Move `keys` first, in the given order.  The other keys keep their
+        relative order after them."""
+        keys = [key for key, _ in _unique_items((key, None) for key in keys)]
+        self._snapshot = None
+        for key in keys:
+            self._unlink(key)
+        first = self._root[1]
+        for key in keys:
+            self._link(key, first)
+
+
+class _FieldsSnapshot(dict):
+    """The fields of a `FieldRegistry` at a given time (see snapshot())"""
+    def __init__(self, items):
+        dict.__init__(self, items)
+        self.ordered = items
+
+
+def _unique_items(items):
+    """return the list of the `(key, value)` pairs of `items`, without the
+    repeated keys"""
+    seen = set()
+    unique = []
+    for key, value in items:
+        if key not in seen:
+            seen.add(key)
+            unique.append((key, value))
+    return unique
+
+
 class SimpleMultiDict(dict):
     """
     Adds `getone`, `getall` methods to dict.  Assumes that values are either
@@ -86,6 +346,15 @@ class ModelRenderer(object):
     """
     prettify = staticmethod(prettify)
 
+    # relation options queried during a render, by field key (see Grid.render)
+    _options_memo = None
+    # gettext functions used during a render, by language
+    _translators = None
+    # fragment cache entries read during a render, by instance id
+    _fragments = None
+    # the instrumentation report of the current operation
+    _report = None
+
     def __init__(self, model, session=None, data=None, prefix=None):
         """
         - `model`:
@@ -156,8 +425,8 @@ class ModelRenderer(object):
         >>> fs2 = fs.bind(user)
         >>> html = fs2.render()
 
-        The `render_fields` attribute is an OrderedDict of all the `Field`'s
-        that have been configured, keyed by name. The order of the fields
+        The `render_fields` attribute is an OrderedDict (a `FieldRegistry`)
+        of all the `Field`'s that have been configured, keyed by name. The order of the fields
         is the order in `include`, or the order they were declared
         in the SQLAlchemy model class if no `include` is specified.
 
@@ -172,8 +441,9 @@ class ModelRenderer(object):
         instance.  Stick to referencing `Field`'s from their parent
         `FieldSet` to always get the "right" instance.)
         """
-        self._fields = OrderedDict()
-        self._render_fields = OrderedDict()
+        _compile_mappers()
+        self._fields = FieldRegistry()
+        self._render_fields = FieldRegistry()
         self.model = self.session = None
         self.prefix = prefix
 
@@ -199,26 +469,10 @@ class ModelRenderer(object):
             if not self._fields:
                 raise Exception("not bound to a SA instance, and no manual Field definitions found")
         else:
-            # SA class.
-            # load synonyms so we can ignore them
-            synonyms = set(p for p in class_mapper(cls).iterate_properties
-                           if isinstance(p, SynonymProperty))
-            # load discriminators so we can ignore them
-            discs = set(p for p in class_mapper(cls).iterate_properties
-                        if hasattr(p, '_is_polymorphic_discriminator')
-                        and p._is_polymorphic_discriminator)
-            # attributes we're interested in
-            attrs = []
-            for p in class_mapper(cls).iterate_properties:
-                attr = _get_attribute(cls, p)
-                if ((isinstance(p, SynonymProperty) or attr.property.key not in (s.name for s in synonyms))
-                    and not isinstance(attr.impl, DynamicAttributeImpl)
-                    and p not in discs):
-                    attrs.append(attr)
-            # sort relations last before storing in the OrderedDict
-            L = [fields.AttributeField(attr, self) for attr in attrs]
-            L.sort(lambda a, b: cmp(a.is_relation, b.is_relation)) # note, key= not used for 2.3 support
-            self._fields.update((field.key, field) for field in L)
+            # SA class.  the (expensive) introspection is done once per mapper;
+            # we only need a copy of the resulting fields.
+            self._fields.update((field.key, field._modified(parent=self))
+                                for field in _introspect(cls, self))
 
     def append(self, field):
         """Add a form Field. By default, this Field will be included in the rendered form or table."""
@@ -238,58 +492,56 @@ class ModelRenderer(object):
         for field in fields:
             self.append(field)
 
-    def insert(self, field, new_field):
-        """Insert a new field *before* an existing field.
+    def insert(self, field, new_field, *new_fields):
+        """Insert new fields *before* an existing field.
 
         This is like the normal ``insert()`` function of ``list`` objects. It
         takes the place of the previous element, and pushes the rest forward.
+        Several fields can be inserted at once, and fields that are already
+        part of the form are moved::
+
+            fs.insert(fs.password, Field('login'), fs.email)
         """
-        fields_ = self._render_fields or self._fields
-        if not isinstance(new_field, fields.Field):
-            raise ValueError('Can only add Field objects; got %s instead' % field)
-        if isinstance(field, fields.AbstractField):
-            try:
-                index = fields_.keys().index(field.name)
-            except ValueError:
-                raise ValueError('%s not in fields' % field.name)
-        else:
-            raise TypeError('field must be a Field. Got %r' % field)
-        new_field.parent = self
-        items = list(fields_.iteritems()) # prepare for Python 3
-        items.insert(index, (new_field.name, new_field))
-        if self._render_fields:
-            self._render_fields = OrderedDict(items)
-        else:
-            self._fields = OrderedDict(items)
+        self._insert(field, (new_field,) + new_fields, after=False)
 
-    def insert_after(self, field, new_field):
-        """Insert a new field *after* an existing field.
+    def insert_after(self, field, new_field, *new_fields):
+        """Insert new fields *after* an existing field.
 
         Use this if your business logic requires to add after a certain field,
         and not before.
         """
+        self._insert(field, (new_field,) + new_fields, after=True)
+
+    def _insert(self, field, new_fields, after):
         fields_ = self._render_fields or self._fields
-        if not isinstance(new_field, fields.Field):
-            raise ValueError('Can only add Field objects; got %s instead' % field)
+        for new_field in new_fields:
+            if not isinstance(new_field, fields.Field) and \
+               not (isinstance(new_field, fields.AbstractField) and new_field.key in fields_):
+                raise ValueError('Can only add Field objects; got %s instead' % new_field)
         if isinstance(field, fields.AbstractField):
-            try:
-                index = fields_.keys().index(field.name)
-            except ValueError:
+            if field.key not in fields_:
                 raise ValueError('%s not in fields' % field.name)
         else:
             raise TypeError('field must be a Field. Got %r' % field)
-        new_field.parent = self
-        items = list(fields_.iteritems())
-        new_item = (new_field.name, new_field)
-        if index + 1 == len(items): # after the last element ?
-            items.append(new_item)
-        else:
-            items.insert(index + 1, new_item)
-        if self._render_fields:
-            self._render_fields = OrderedDict(items)
-        else:
-            self._fields = OrderedDict(items)
+        for new_field in new_fields:
+            new_field.parent = self
+        fields_.insert(field.key, [(new_field.key, new_field) for new_field in new_fields], after)
+
+    def reorder(self, *args):
+        """Move the given fields (or field names) first, in the given order.
+        The other fields keep their order, after them::
 
+            fs.reorder(fs.name, 'email')
+        """
+        fields_ = self._render_fields or self._fields
+        keys = []
+        for field in args:
+            if isinstance(field, fields.AbstractField):
+                field = field.key
+            if field not in fields_:
+                raise ValueError('%s not in fields' % field)
+            keys.append(field)
+        fields_.reorder(keys)
 
     @property
     def render_fields(self):
@@ -298,7 +550,7 @@ class ModelRenderer(object):
         dict of `{fieldname: Field}` pairs
         """
         if not self._render_fields:
-            self._render_fields = OrderedDict([(field.key, field) for field in self._get_fields()])
+            self._render_fields = FieldRegistry([(field.key, field) for field in self._get_fields()])
         return self._render_fields
 
     def configure(self, pk=False, exclude=[], include=[], options=[]):
@@ -362,7 +614,7 @@ class ModelRenderer(object):
 
         >>> fs.configure(include=[fs.name, fs.orders.checkbox()])
         """
-        self._render_fields = OrderedDict([(field.key, field) for field in self._get_fields(pk, exclude, include, options)])
+        self._render_fields = FieldRegistry([(field.key, field) for field in self._get_fields(pk, exclude, include, options)])
 
     def bind(self, model=None, session=None, data=None):
         """
@@ -384,12 +636,24 @@ class ModelRenderer(object):
         mr.__dict__ = dict(self.__dict__)
         # two steps so bind's error checking can work
         ModelRenderer.rebind(mr, model, session, data)
-        mr._fields = OrderedDict([(key, renderer.bind(mr)) for key, renderer in self._fields.iteritems()])
-        if self._render_fields:
-            mr._render_fields = OrderedDict([(field.key, field) for field in
-                                             [field.bind(mr) for field in self._render_fields.itervalues()]])
+        self._bind_fields(mr)
         return mr
 
+    def _bind_fields(self, mr):
+        # bind our fields to `mr`, a copy of self.  `_fields` holds every
+        # field of the model, most of which are never rendered, so those are
+        # only bound on first access (see __getattr__)
+        if '_fields' in self.__dict__:
+            # a snapshot: the later changes of our fields are not seen by mr
+            unbound_fields = self._fields.snapshot()
+        else:
+            unbound_fields = self._unbound_fields
+        mr.__dict__.pop('_fields', None)
+        mr.__dict__['_unbound_fields'] = unbound_fields
+        if self._render_fields:
+            mr._render_fields = FieldRegistry([(field.key, field.bind(mr))
+                                             for field in self._render_fields.itervalues()])
+
     def copy(self, *args):
         """return a copy of the fieldset. args is a list of field names or field
         objects to render in the new fieldset"""
@@ -406,7 +670,7 @@ class ModelRenderer(object):
                 assert isinstance(field, fields.AbstractField), field
                 field.bind(mr)
                 _new_fields.append(field)
-            mr._render_fields = OrderedDict([(field.key, field) for field in _new_fields])
+            mr._render_fields = FieldRegistry([(field.key, field) for field in _new_fields])
         return mr
 
     def rebind(self, model=None, session=None, data=None):
@@ -508,6 +772,7 @@ class ModelRenderer(object):
                 if o_session and self.session is not o_session:
                     raise Exception('You may not explicitly bind to a session when your model already belongs to a different one')
 
+    @instrumented('sync')
     def sync(self):
         """
         Sync (copy to the corresponding attributes) the data passed to the constructor or `bind` to the `model`.
@@ -532,23 +797,23 @@ class ModelRenderer(object):
             raise ValueError('pk option must be True or False, not %s' % pk)
 
         # verify that options that should be lists of Fields, are
-        for iterable in ['include', 'exclude', 'options']:
+        for name, L in [('include', include), ('exclude', exclude), ('options', options)]:
             try:
-                L = list(eval(iterable))
+                L = list(L)
             except:
-                raise ValueError('`%s` parameter should be an iterable' % iterable)
+                raise ValueError('`%s` parameter should be an iterable' % name)
             for field in L:
                 if not isinstance(field, fields.AbstractField):
-                    raise TypeError('non-AbstractField object `%s` found in `%s`' % (field, iterable))
-                if field not in self._fields.values():
-                    raise ValueError('Unrecognized Field `%s` in `%s` -- did you mean to call append() first?' % (field, iterable))
+                    raise TypeError('non-AbstractField object `%s` found in `%s`' % (field, name))
+                if not self._fields.has_field(field):
+                    raise ValueError('Unrecognized Field `%s` in `%s` -- did you mean to call append() first?' % (field, name))
 
         # if include is given, those are the fields used.  otherwise, include those not explicitly (or implicitly) excluded.
         if not include:
-            ignore = list(exclude) # don't modify `exclude` directly to avoid surprising caller
-            if not pk:
-                ignore.extend([wrapper for wrapper in self._raw_fields() if wrapper.is_pk and not wrapper.is_collection])
-            ignore.extend([wrapper for wrapper in self._raw_fields() if wrapper.is_raw_foreign_key])
+            ignore = set(exclude) # don't modify `exclude` directly to avoid surprising caller
+            for wrapper in self._raw_fields():
+                if (not pk and wrapper.is_pk and not wrapper.is_collection) or wrapper.is_raw_foreign_key:
+                    ignore.add(wrapper)
             include = [field for field in self._raw_fields() if field not in ignore]
 
         # in the returned list, replace any fields in `include` w/ the corresponding one in `options`, if present.
@@ -566,6 +831,15 @@ class ModelRenderer(object):
         return L
 
     def __getattr__(self, attrname):
+        if attrname == '_fields':
+            # not yet bound, see _bind_fields
+            try:
+                unbound_fields = self.__dict__.pop('_unbound_fields')
+            except KeyError:
+                raise AttributeError(attrname)
+            self._fields = FieldRegistry([(key, field.bind(self)) for key, field
+                                        in unbound_fields.ordered])
+            return self._fields
         try:
             return self._render_fields[attrname]
         except KeyError:
@@ -578,14 +852,50 @@ class ModelRenderer(object):
 
     def __setattr__(self, attrname, value):
         if attrname not in ('_fields', '__dict__', 'focus', 'model', 'session', 'data') and \
-           (attrname in self._fields or isinstance(value, fields.AbstractField)):
+           (attrname in self._field_keys() or isinstance(value, fields.AbstractField)):
             raise AttributeError('Do not set field attributes manually.  Use append() or configure() instead')
         object.__setattr__(self, attrname, value)
+        if attrname in ('model', '_bound_pk', 'prefix'):
+            self.__dict__.pop('_name_prefix', None)
+        elif attrname == 'default_renderers':
+            # renderers are instantiated once per field: forget them
+            for name in ('_fields', '_render_fields'):
+                for field in self.__dict__.get(name, {}).itervalues():
+                    field._renderer_instance = None
+
+    def _get_name_prefix(self):
+        # `[prefix-]ModelName-pk-`, the beginning of the input names of our
+        # fields (see FieldRenderer.name).  computed once per binding.
+        try:
+            return self.__dict__['_name_prefix']
+        except KeyError:
+            pass
+        pk = self._bound_pk
+        assert pk != ''
+        if isinstance(pk, basestring) or not fields.iterable(pk):
+            pk_string = fields._stringify(pk)
+        else:
+            # remember to use a delimiter that can be used in the DOM (specifically, no commas).
+            # we don't have to worry about escaping the delimiter, since we never try to
+            # deserialize the generated name.  All we care about is generating unique
+            # names for a given model's domain.
+            pk_string = u'_'.join([fields._stringify(k) for k in pk])
+        components = [self.model.__class__.__name__, pk_string, u'']
+        if self.prefix:
+            components.insert(0, self.prefix)
+        prefix = self.__dict__['_name_prefix'] = u'-'.join(components)
+        return prefix
+
+    def _field_keys(self):
+        # names of `_fields`, without binding them
+        if '_fields' in self.__dict__:
+            return self._fields
+        return self.__dict__.get('_unbound_fields', ())
 
     def __delattr__(self, attrname):
         if attrname in self._render_fields:
             del self._render_fields[attrname]
-        elif attrname in self._fields:
+        elif attrname in self._field_keys():
             raise RuntimeError("You try to delete a field but your form is not configured")
         else:
             raise AttributeError("field %s does not exist" % attrname)
@@ -597,7 +907,7 @@ class ModelRenderer(object):
 
 
 class EditableRenderer(ModelRenderer):
-    default_renderers = {
+    default_renderers = fields.RendererMap({
         fatypes.String: fields.TextFieldRenderer,
         fatypes.Unicode: fields.TextFieldRenderer,
         fatypes.Text: fields.TextFieldRenderer,
@@ -617,4 +927,5 @@ class EditableRenderer(ModelRenderer):
         'radio': fields.RadioSet,
         'password': fields.PasswordFieldRenderer,
         'textarea': fields.TextAreaFieldRenderer,
-    }
+        'autocomplete': fields.AutocompleteFieldRenderer,
+    })
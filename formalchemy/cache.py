@@ -0,0 +1,499 @@
+# Copyright (C) 2007 Alexandre Conrad, alexandre (dot) conrad (at) gmail (dot) com
+#
+# This module is part of FormAlchemy and is released under
+# the MIT License: http://www.opensource.org/licenses/mit-license.php
+
+__doc__ = """
+Caches shared by all the forms of a process.
+
+:class:`OptionCache` stores the options of relation fields (the
+`(label, pk)` pairs queried from the related table) so that lookup tables
+are not queried again on each render. It is disabled by default. Enable it
+with::
+
+    >>> from formalchemy import config
+    >>> from formalchemy.cache import OptionCache
+    >>> cache = OptionCache(ttl=300, size=100)
+    >>> config.option_cache = cache
+
+Entries are keyed by related class, ordering and option label. They are
+dropped when a session flushes, commits or rolls back changes to instances of
+that class, provided the cache listens to your sessions. With SQLAlchemy >= 0.7::
+
+    cache.listen(Session)
+
+With older versions, add the session extension::
+
+    Session = scoped_session(sessionmaker(extension=cache.extension))
+
+Changes made outside of those sessions are only seen when the `ttl` (in
+seconds) expires.
+
+    >>> config.option_cache = None
+
+:class:`FragmentCache` stores the html of the readonly fields of persistent
+instances (readonly `Grid` rows, `show` pages), keyed by instance, field,
+renderer options and language. The fragments of an instance are stored
+together, so a `Grid` row costs one lookup in the backend. It is disabled
+by default. Enable it with::
+
+    >>> from formalchemy.cache import FragmentCache, MemoryBackend
+    >>> fragments = FragmentCache(MemoryBackend(size=10000))
+    >>> config.fragment_cache = fragments
+
+It listens to your sessions like the :class:`OptionCache`. The fragments of
+an instance are dropped when it is flushed, with the fragments rendering it
+as a relation of other instances. When the mapper of the instance has a
+`version_id_col`, the version is checked too, so the changes made by other
+processes are seen. New and modified instances are rendered without the
+cache.
+
+:class:`MemoryBackend` keeps the most recently used instances in memory,
+:class:`DbmBackend` stores them in a dbm file which survives restarts. Other
+backends only need the `get`, `set`, `delete` and `clear` methods of
+:class:`MemoryBackend`.
+
+    >>> config.fragment_cache = None
+"""
+
+import time
+import anydbm
+import cPickle
+import itertools
+import threading
+import weakref
+
+from sqlalchemy.orm import Session, object_mapper
+from sqlalchemy.orm.attributes import instance_state
+from sqlalchemy.orm.exc import UnmappedInstanceError
+from sqlalchemy.orm.interfaces import SessionExtension
+try:
+    from sqlalchemy import event
+except ImportError: # 0.6 support
+    event = None
+
+
+class _SessionCache(object):
+    """A cache invalidated by the writes of sessions. Subclasses implement
+    `_flushed(session)` and `_ended(session)`"""
+
+    def listen(self, target):
+        """Invalidate the cache on flush, commit and rollback of the sessions
+        created by `target` (a session, sessionmaker or scoped_session)"""
+        if event is not None:
+            event.listen(target, 'after_flush', self.extension.after_flush)
+            event.listen(target, 'after_commit', self.extension.after_commit)
+            event.listen(target, 'after_rollback', self.extension.after_rollback)
+        elif isinstance(target, Session):
+            target.extensions.append(self.extension)
+        else:
+            raise ValueError('Use sessionmaker(extension=cache.extension) with this version of SQLAlchemy')
+
+
+class OptionCache(_SessionCache):
+    """A thread safe cache of relation options.
+
+    `ttl` is the lifetime of an entry in seconds (`None` means forever) and
+    `size` the maximum number of entries. When an entry expires, the first
+    thread asking for it refreshes it while the other threads keep getting
+    the expired value, so only one query is made.
+    """
+
+    def __init__(self, ttl=None, size=1000):
+        self.ttl = ttl
+        self.size = size
+        # key -> (value, expiration time, creation time)
+        self._entries = {}
+        # key -> lock held by the thread creating the value
+        self._locks = {}
+        self._mutex = threading.Lock()
+        # incremented by invalidations, so that values created from outdated
+        # data are not stored
+        self._generation = 0
+        # session -> classes flushed in the current transaction
+        self._touched = weakref.WeakKeyDictionary()
+        self.extension = _OptionCacheExtension(self)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _get_lock(self, key):
+        self._mutex.acquire()
+        try:
+            lock = self._locks.get(key)
+            if lock is None:
+                lock = self._locks[key] = threading.Lock()
+            return lock
+        finally:
+            self._mutex.release()
+
+    def _valid(self, entry):
+        return entry is not None and (entry[1] is None or entry[1] > time.time())
+
+    def get(self, key, creator):
+        """Return the value stored for `key`, calling `creator()` to create
+        it if needed. `key` is a tuple whose first item is the related class"""
+        entry = self._entries.get(key)
+        if self._valid(entry):
+            return entry[0]
+        lock = self._get_lock(key)
+        if entry is not None:
+            # expired: let another thread refresh it and use the old value
+            if not lock.acquire(False):
+                return entry[0]
+        else:
+            lock.acquire()
+        try:
+            # it may have been created while we were waiting for the lock
+            entry = self._entries.get(key)
+            if self._valid(entry):
+                return entry[0]
+            generation = self._generation
+            value = creator()
+            self._mutex.acquire()
+            try:
+                if generation == self._generation:
+                    self._store(key, value)
+            finally:
+                self._mutex.release()
+            return value
+        finally:
+            lock.release()
+
+    def _store(self, key, value):
+        entries = self._entries
+        if key not in entries and len(entries) >= self.size:
+            # drop the oldest entry
+            oldest = min(entries.iteritems(), key=lambda item: item[1][2])[0]
+            del entries[oldest]
+            self._locks.pop(oldest, None)
+        now = time.time()
+        if self.ttl is None:
+            entries[key] = (value, None, now)
+        else:
+            entries[key] = (value, now + self.ttl, now)
+
+    def invalidate(self, *classes):
+        """Drop the entries of `classes`, their parent and child classes"""
+        classes = tuple(classes)
+        self._mutex.acquire()
+        try:
+            self._generation += 1
+            for key in self._entries.keys():
+                cls = key[0]
+                if issubclass(cls, classes) or [c for c in classes if issubclass(c, cls)]:
+                    del self._entries[key]
+        finally:
+            self._mutex.release()
+
+    def clear(self):
+        """Drop all the entries"""
+        self._mutex.acquire()
+        try:
+            self._generation += 1
+            self._entries.clear()
+        finally:
+            self._mutex.release()
+
+    def _flushed(self, session):
+        classes = set([type(obj) for obj in session.new])
+        classes.update([type(obj) for obj in session.dirty])
+        classes.update([type(obj) for obj in session.deleted])
+        if classes:
+            self._touched.setdefault(session, set()).update(classes)
+            # the flushing session must see its own changes
+            self.invalidate(*classes)
+
+    def _ended(self, session):
+        # entries created during the transaction may contain changes which
+        # are not visible (or rolled back) for other sessions
+        classes = self._touched.pop(session, None)
+        if classes:
+            self.invalidate(*classes)
+
+
+class _OptionCacheExtension(SessionExtension):
+    """Invalidate an :class:`OptionCache` (or a :class:`FragmentCache`) when
+    a session writes"""
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    def after_flush(self, session, flush_context):
+        self.cache._flushed(session)
+
+    def after_commit(self, session):
+        self.cache._ended(session)
+
+    def after_rollback(self, session):
+        self.cache._ended(session)
+
+
+class MemoryBackend(object):
+    """A thread safe in-process backend keeping the values of the `size`
+    most recently used keys"""
+
+    def __init__(self, size=10000):
+        self.size = size
+        # key -> [last use, value]
+        self._entries = {}
+        self._clock = 0
+        self._mutex = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Return the value stored for `key` or None"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._clock += 1
+        entry[0] = self._clock
+        return entry[1]
+
+    def set(self, key, value):
+        self._mutex.acquire()
+        try:
+            entries = self._entries
+            if key not in entries and len(entries) >= self.size:
+                # drop the least recently used tenth at once, so that the
+                # entries are not sorted on each insertion
+                ordered = sorted(entries.iteritems(), key=lambda item: item[1][0])
+                for old, entry in ordered[:max(1, self.size / 10)]:
+                    del entries[old]
+            self._clock += 1
+            entries[key] = [self._clock, value]
+        finally:
+            self._mutex.release()
+
+    def delete(self, key):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+
+class DbmBackend(object):
+    """A backend storing the values in the dbm file `filename` (created if
+    needed), so they survive restarts. Values are pickled. Unless your dbm
+    implementation supports it, do not share the file between processes"""
+
+    def __init__(self, filename):
+        self.filename = filename
+        self._db = anydbm.open(filename, 'c')
+        self._mutex = threading.Lock()
+
+    def __len__(self):
+        return len(self._db)
+
+    def get(self, key):
+        self._mutex.acquire()
+        try:
+            try:
+                data = self._db[key]
+            except KeyError:
+                return None
+        finally:
+            self._mutex.release()
+        return cPickle.loads(data)
+
+    def set(self, key, value):
+        data = cPickle.dumps(value, 2)
+        self._mutex.acquire()
+        try:
+            self._db[key] = data
+        finally:
+            self._mutex.release()
+
+    def delete(self, key):
+        self._mutex.acquire()
+        try:
+            try:
+                del self._db[key]
+            except KeyError:
+                pass
+        finally:
+            self._mutex.release()
+
+    def clear(self):
+        self._mutex.acquire()
+        try:
+            for key in self._db.keys():
+                del self._db[key]
+        finally:
+            self._mutex.release()
+
+    def close(self):
+        self._db.close()
+
+
+class FragmentCache(_SessionCache):
+    """A cache of the html of readonly fields, stored in `backend` (a
+    :class:`MemoryBackend` by default).
+
+    The backend maps an instance key to a `(version, fragments, related)`
+    tuple: `fragments` is a dict of html keyed by field, renderer options
+    and language, `related` the stamps of the instances rendered as a
+    relation, keyed by instance key. Flushing an instance changes its stamp
+    (stored under `'stamp:' + key`), which makes the entries rendering it
+    outdated. A missing stamp is written when it is read, so an evicted
+    stamp gets a new value and its dependents are outdated too: the backend
+    can drop any key.
+
+    Only the instances which are persistent and not modified are cached,
+    with at most `max_related` related instances.
+    """
+
+    max_related = 100
+
+    def __init__(self, backend=None):
+        if backend is None:
+            backend = MemoryBackend()
+        self.backend = backend
+        # incremented by invalidations, so that fragments rendered from
+        # outdated data are not stored
+        self._generation = 0
+        self._stamps = itertools.count()
+        # session -> instance keys flushed in the current transaction
+        self._touched = weakref.WeakKeyDictionary()
+        self.extension = _OptionCacheExtension(self)
+
+    def _key(self, instance):
+        """return the key and the version of a persistent instance, or None"""
+        from formalchemy.fields import _pk
+        try:
+            mapper = object_mapper(instance)
+        except UnmappedInstanceError:
+            return None
+        pk = _pk(instance)
+        if pk is None or (isinstance(pk, tuple) and None in pk):
+            return None
+        cls = mapper.class_
+        key = '%s.%s:%r' % (cls.__module__, cls.__name__, pk)
+        version = None
+        if mapper.version_id_col is not None:
+            version = getattr(instance, mapper._columntoproperty[mapper.version_id_col].key)
+        return key, version
+
+    def _cacheable_key(self, instance):
+        """return the key and the version of `instance` if its fragments
+        can be cached: it is persistent and not modified. Else None"""
+        try:
+            state = instance_state(instance)
+        except (AttributeError, UnmappedInstanceError):
+            return None
+        if state.key is None or state.modified:
+            return None
+        return self._key(instance)
+
+    def _stamp(self, key, memo):
+        if memo is not None and ('stamp', key) in memo:
+            return memo[('stamp', key)]
+        stamp = self.backend.get('stamp:' + key)
+        if stamp is None:
+            stamp = self._new_stamp()
+            self.backend.set('stamp:' + key, stamp)
+        if memo is not None:
+            memo[('stamp', key)] = stamp
+        return stamp
+
+    def _entry(self, key, version, memo=None):
+        entry = self.backend.get(key)
+        if entry is None or entry[0] != version:
+            return (version, {}, {})
+        for related_key, stamp in entry[2].iteritems():
+            if self._stamp(related_key, memo) != stamp:
+                return (version, {}, {})
+        return entry
+
+    def _related(self, related, entry, memo):
+        """return the stamps of the `related` instances by key, or None if
+        the fragment rendering them can not be cached"""
+        if not isinstance(related, list):
+            related = related is not None and [related] or []
+        stamps = {}
+        for instance in related:
+            related_key = self._cacheable_key(instance)
+            if related_key is None:
+                return None
+            related_key = related_key[0]
+            stamps[related_key] = self._stamp(related_key, memo)
+        new = [key for key in stamps if key not in entry[2]]
+        if len(entry[2]) + len(new) > self.max_related:
+            return None
+        return stamps
+
+    def render(self, field, opts):
+        """Return the readonly html of `field`, rendered with `opts`"""
+        model = field.parent.model
+        # the key and the entry of the instance are only computed once per
+        # render of the parent
+        memo = field.parent._fragments
+        cached = memo is not None and memo.get(id(model)) or None
+        if cached is None:
+            key = self._cacheable_key(model)
+            if key is not None:
+                key, version = key
+                cached = (key, self._entry(key, version, memo))
+            else:
+                cached = (None, None)
+            if memo is not None:
+                memo[id(model)] = cached
+        key, entry = cached
+        if key is None:
+            return field.renderer.render_readonly(**opts)
+        fragment = (field.key, field.renderer.__class__, opts.get('lang', 'en'),
+                    opts and repr(sorted(opts.items())) or '')
+        html = entry[1].get(fragment)
+        if html is not None:
+            return html
+        related = None
+        if field.is_relation:
+            related = self._related(field.raw_value, entry, memo)
+            if related is None:
+                return field.renderer.render_readonly(**opts)
+        generation = self._generation
+        html = field.renderer.render_readonly(**opts)
+        if generation == self._generation:
+            entry[1][fragment] = html
+            if related:
+                entry[2].update(related)
+            self.backend.set(key, entry)
+        return html
+
+    def _new_stamp(self):
+        # unique across processes and restarts, for the persistent backends
+        return '%r-%i-%i' % (time.time(), self._generation, self._stamps.next())
+
+    def _invalidate_keys(self, keys):
+        self._generation += 1
+        stamp = self._new_stamp()
+        backend = self.backend
+        for key in keys:
+            backend.delete(key)
+            backend.set('stamp:' + key, stamp)
+
+    def invalidate(self, *instances):
+        """Drop the fragments of `instances` and of the instances rendering
+        them as a relation"""
+        self._invalidate_keys([key[0] for key in map(self._key, instances) if key])
+
+    def clear(self):
+        """Drop all the fragments"""
+        self._generation += 1
+        self.backend.clear()
+
+    def _flushed(self, session):
+        instances = list(session.new) + list(session.dirty) + list(session.deleted)
+        keys = set([key[0] for key in map(self._key, instances) if key])
+        if keys:
+            self._touched.setdefault(session, set()).update(keys)
+            self._invalidate_keys(keys)
+
+    def _ended(self, session):
+        # fragments rendered during the transaction may contain changes
+        # which are not visible (or rolled back) for other sessions
+        keys = self._touched.pop(session, None)
+        if keys:
+            self._invalidate_keys(keys)
@@ -13,6 +13,22 @@ There is two configuration settings available in a global config object.
 
 - date_edit_format: Used to retrieve field order. Default to m-d-y
 
+- option_cache: A :class:`~formalchemy.cache.OptionCache` used to store the
+  options of relation fields. Default to None (options are queried on each
+  render)
+
+- fragment_cache: A :class:`~formalchemy.cache.FragmentCache` used to store the
+  html of readonly fields. Default to None (fields are rendered each time)
+
+- instrumentation: An :class:`~formalchemy.instrumentation.Instrumentation`
+  reporting the timings of the renders, validations and syncs of the forms
+  to its observers. Default to None (no timings)
+
+- reload_translations: If True, the modification time of the translation
+  catalogs is checked each time a translator is needed and changed catalogs
+  are reloaded (useful during development). Default to False (catalogs are
+  loaded once)
+
 Here is a simple example::
 
     >>> from formalchemy import config
@@ -47,6 +63,10 @@ class Config(object):
         date_format='%Y-%m-%d',
         date_edit_format='m-d-y',
         engine = templates.default_engine,
+        option_cache = None,
+        fragment_cache = None,
+        instrumentation = None,
+        reload_translations = False,
     )
 
     def __getattr__(self, attr):
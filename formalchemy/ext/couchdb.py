@@ -98,11 +98,10 @@ Same for grids::
 from formalchemy.forms import FieldSet as BaseFieldSet
 from formalchemy.tables import Grid as BaseGrid
 from formalchemy.fields import Field as BaseField
-from formalchemy.base import SimpleMultiDict
+from formalchemy.base import SimpleMultiDict, FieldRegistry
 from formalchemy import fields
 from formalchemy import validators
 from formalchemy import fatypes
-from sqlalchemy.util import OrderedDict
 from couchdbkit.schema.properties_proxy import LazySchemaList
 from couchdbkit import schema
 
@@ -227,8 +226,8 @@ class Field(BaseField):
 class FieldSet(BaseFieldSet):
     """See :class:`~formalchemy.forms.FieldSet`"""
     def __init__(self, model, session=None, data=None, prefix=None):
-        self._fields = OrderedDict()
-        self._render_fields = OrderedDict()
+        self._fields = FieldRegistry()
+        self._render_fields = FieldRegistry()
         self.model = self.session = None
         if model is not None and isinstance(model, schema.Document):
             BaseFieldSet.rebind(self, model.__class__, data=data)
@@ -278,10 +277,7 @@ class FieldSet(BaseFieldSet):
         mr.__dict__ = dict(self.__dict__)
         # two steps so bind's error checking can work
         mr.rebind(model, session, data)
-        mr._fields = OrderedDict([(key, renderer.bind(mr)) for key, renderer in self._fields.iteritems()])
-        if self._render_fields:
-            mr._render_fields = OrderedDict([(field.key, field) for field in
-                                             [field.bind(mr) for field in self._render_fields.itervalues()]])
+        self._bind_fields(mr)
         return mr
 
     def rebind(self, model=None, session=None, data=None):
@@ -1,6 +1,8 @@
 # -*- coding: utf-8 -*-
 import os
+import formalchemy
 from paste.urlparser import StaticURLParser
+from paste.cascade import Cascade
 from pylons import request, response, session, tmpl_context as c
 from pylons.controllers.util import abort, redirect
 from pylons.templating import render_mako as render
@@ -8,7 +10,7 @@ from pylons import url
 from webhelpers.paginate import Page
 from sqlalchemy.orm import class_mapper, object_session
 from formalchemy.fields import _pk
-from formalchemy.fields import _stringify
+from formalchemy.fields import AutocompleteFieldRenderer
 from formalchemy import Grid, FieldSet
 from formalchemy.i18n import get_translator
 from formalchemy.fields import Field
@@ -44,6 +46,11 @@ class _RESTController(object):
 
     template = '/forms/restfieldset.mako'
     engine = prefix_name = None
+    # rows of the listing rendered at a time, e.g. 100. The rows are rendered
+    # while the response is sent, so the session must outlive the response
+    # (not be removed by BaseController.__call__ before). None
+    # renders the whole page at once
+    stream_chunk_size = None
     FieldSet = FieldSet
     Grid = Grid
     pager_args = dict(link_attr={'class': 'ui-pager-link ui-state-default ui-corner-all'},
@@ -162,11 +169,14 @@ class _RESTController(object):
 
             S = self.Session()
             query = S.query(self.get_model())
+            # eager load the relations rendered by the grid
+            query = self.get_grid().prepare_query(query)
             kwargs = request.environ.get('pylons.routes_dict', {})
             return Page(query, page=int(request.GET.get('page', '1')), **kwargs)
         """
         S = self.Session()
-        options = dict(collection=S.query(self.get_model()), page=int(request.GET.get('page', '1')))
+        query = self.get_grid().prepare_query(S.query(self.get_model()))
+        options = dict(collection=query, page=int(request.GET.get('page', '1')))
         options.update(request.environ.get('pylons.routes_dict', {}))
         options.update(kwargs)
         collection = options.pop('collection')
@@ -270,16 +280,15 @@ class _RESTController(object):
         fs.readonly = True
         if format == 'json':
             values = []
-            for item in page:
-                pk = _pk(item)
-                fs._set_active(item)
+            jqgrid = 'jqgrid' in request.GET
+            keys = fs.render_fields.keys()
+            for pk, fields in fs.records(text=jqgrid):
                 value = dict(id=pk,
                              item_url=model_url(self.member_name, id=pk))
-                if 'jqgrid' in request.GET:
-                    fields = [_stringify(field.render_readonly()) for field in fs.render_fields.values()]
+                if jqgrid:
                     value['cell'] = [pk] + fields
                 else:
-                    value.update(dict([(field.key, field.model_value) for field in fs.render_fields.values()]))
+                    value.update(zip(keys, fields))
                 values.append(value)
             return self.render_json_format(rows=values,
                                            records=len(values),
@@ -289,8 +298,30 @@ class _RESTController(object):
             pager = page.pager(**self.pager_args)
         else:
             pager = kwargs.pop('pager')
+        if self.stream_chunk_size:
+            return fs.stream_page(lambda: self.render_grid(format=format, fs=fs, id=None, pager=pager),
+                                  self.stream_chunk_size)
         return self.render_grid(format=format, fs=fs, id=None, pager=pager)
 
+    def autocomplete(self, format='json', **kwargs):
+        """REST api. Return the items matching the ``term`` parameter for the
+        relation ``field`` rendered with an ``AutocompleteFieldRenderer``, as
+        a json list of ``{"label": ..., "value": ...}``. Only ``limit`` items
+        (at most the limit given to ``Field.autocomplete()``, or 20) are queried."""
+        fs = self.get_add_fieldset()
+        fs = fs.bind(session=self.Session())
+        field = fs.render_fields.get(request.GET.get('field'))
+        if field is None or not isinstance(field.renderer, AutocompleteFieldRenderer):
+            abort(404)
+        try:
+            limit = field.renderer.limit(request.GET.get('limit'))
+        except ValueError:
+            abort(400)
+        items = field.renderer.search(request.GET.get('term', ''), limit)
+        response.content_type = 'text/javascript'
+        return json.dumps([dict(label=label, value=field.renderer.stringify_value(pk))
+                           for label, pk in items])
+
     def create(self, format='html', **kwargs):
         """REST api"""
         fs = self.get_add_fieldset()
@@ -384,7 +415,9 @@ class _ModelsController(_RESTController):
     engine = None
     model = forms = None
 
-    _static_app = StaticURLParser(os.path.join(os.path.dirname(__file__), 'resources'))
+    # the autocomplete script is shared with the pyramid admin
+    _static_app = Cascade([StaticURLParser(os.path.join(os.path.dirname(__file__), 'resources')),
+                           StaticURLParser(os.path.join(os.path.dirname(formalchemy.__file__), 'resources'))])
 
     def Session(self):
         return meta.Session
@@ -4,7 +4,7 @@ from paste.urlparser import StaticURLParser
 from webhelpers.paginate import Page
 from sqlalchemy.orm import class_mapper, object_session
 from formalchemy.fields import _pk
-from formalchemy.fields import _stringify
+from formalchemy.fields import AutocompleteFieldRenderer
 from formalchemy import Grid, FieldSet
 from formalchemy.i18n import get_translator
 from formalchemy.fields import Field
@@ -12,6 +12,7 @@ from formalchemy import fatypes
 from pyramid.view import view_config
 from pyramid.renderers import render
 from pyramid.renderers import get_renderer
+from pyramid.response import Response
 from pyramid import httpexceptions as exc
 
 try:
@@ -57,7 +58,7 @@ class ModelListing(object):
         if item in ('json',):
             self.request.format = item
             return self
-        if item in ('new',):
+        if item in ('new', 'autocomplete'):
             raise KeyError()
         model = ModelItem(self.request, item)
         model.__parent__ = self
@@ -73,6 +74,11 @@ class ModelView(object):
     """A RESTful view bound to a model"""
 
     engine = prefix_name = None
+    # rows of the listing rendered at a time, e.g. 100. The rows are rendered
+    # while the response is sent, so the session must outlive the response
+    # (not be committed or closed by a transaction manager before). None
+    # renders the whole page at once
+    stream_chunk_size = None
     pager_args = dict(link_attr={'class': 'ui-pager-link ui-state-default ui-corner-all'},
                       curpage_attr={'class': 'ui-pager-curpage ui-state-highlight ui-corner-all'})
 
@@ -251,6 +257,8 @@ class ModelView(object):
 
             S = self.Session()
             query = S.query(self.get_model())
+            # eager load the relations rendered by the grid
+            query = self.get_grid().prepare_query(query)
             kwargs = request.environ.get('pylons.routes_dict', {})
             return Page(query, page=int(request.GET.get('page', '1')), **kwargs)
         """
@@ -260,7 +268,8 @@ class ModelView(object):
             if partial:
                 url += "&partial=1"
             return url
-        options = dict(collection=S.query(self.get_model()),
+        query = self.get_grid().prepare_query(S.query(self.get_model()))
+        options = dict(collection=query,
                        page=int(self.request.GET.get('page', '1')),
                        url=get_page_url)
         options.update(kwargs)
@@ -378,16 +387,15 @@ class ModelView(object):
         if self.request.format == 'json':
             values = []
             request = self.request
-            for item in page:
-                pk = _pk(item)
-                fs._set_active(item)
+            jqgrid = 'jqgrid' in request.GET
+            keys = fs.render_fields.keys()
+            for pk, fields in fs.records(text=jqgrid):
                 value = dict(id=pk,
                              item_url=self.route_url(request.model_name, pk))
-                if 'jqgrid' in request.GET:
-                    fields = [_stringify(field.render_readonly()) for field in fs.render_fields.values()]
+                if jqgrid:
                     value['cell'] = [pk] + fields
                 else:
-                    value.update(dict([(field.key, field.model_value) for field in fs.render_fields.values()]))
+                    value.update(zip(keys, fields))
                 values.append(value)
             return self.render_json_format(rows=values,
                                            records=len(values),
@@ -397,8 +405,46 @@ class ModelView(object):
             pager = page.pager(**self.pager_args)
         else:
             pager = kwargs.pop('pager')
+        if self.stream_chunk_size:
+            self.stream_listing(fs)
         return self.render_grid(fs=fs, id=None, pager=pager)
 
+    def stream_listing(self, fs):
+        """Render the grid `fs` as a placeholder in the page rendered by the
+        renderer of the view, and stream its rows in place of the
+        placeholder, `stream_chunk_size` at a time"""
+        chunk_size = self.stream_chunk_size
+        placeholder = fs._placeholder = u'<!-- grid %i -->' % id(fs)
+        def stream(request, response):
+            fs.__dict__.pop('_placeholder', None)
+            if getattr(request, 'exception', None) is not None:
+                # the response of an exception view, not the listing
+                fs.__dict__.pop('_placeholder_kwargs', None)
+                return
+            charset = response.charset or 'utf-8'
+            response.app_iter = fs._stream_page(response.body, placeholder, chunk_size, charset)
+            response.content_length = None
+        self.request.add_response_callback(stream)
+
+    def autocomplete(self):
+        """REST api. Return the items matching the ``term`` parameter for the
+        relation ``field`` rendered with an ``AutocompleteFieldRenderer``, as
+        a json list of ``{"label": ..., "value": ...}``. Only ``limit`` items
+        (at most the limit given to ``Field.autocomplete()``, or 20) are queried."""
+        request = self.request
+        fs = self.get_add_fieldset()
+        fs = fs.bind(session=self.Session())
+        field = fs.render_fields.get(request.GET.get('field'))
+        if field is None or not isinstance(field.renderer, AutocompleteFieldRenderer):
+            raise exc.HTTPNotFound()
+        try:
+            limit = field.renderer.limit(request.GET.get('limit'))
+        except ValueError:
+            raise exc.HTTPBadRequest()
+        items = field.renderer.search(request.GET.get('term', ''), limit)
+        return [dict(label=label, value=field.renderer.stringify_value(pk))
+                for label, pk in items]
+
     def create(self):
         """REST api"""
         request = self.request
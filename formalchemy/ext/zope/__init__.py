@@ -203,11 +203,10 @@ from formalchemy.forms import FieldSet as BaseFieldSet
 from formalchemy.tables import Grid as BaseGrid
 from formalchemy.fields import Field as BaseField
 from formalchemy.fields import _stringify
-from formalchemy.base import SimpleMultiDict
+from formalchemy.base import SimpleMultiDict, FieldRegistry
 from formalchemy import fields
 from formalchemy import validators
 from formalchemy import fatypes
-from sqlalchemy.util import OrderedDict
 from datetime import datetime
 from uuid import UUID
 from zope import schema
@@ -468,8 +467,8 @@ class FieldSet(BaseFieldSet):
     }
 
     def __init__(self, model, session=None, data=None, prefix=None):
-        self._fields = OrderedDict()
-        self._render_fields = OrderedDict()
+        self._fields = FieldRegistry()
+        self._render_fields = FieldRegistry()
         self.model = self.session = None
         self.prefix = prefix
         self.model = model
@@ -514,10 +513,7 @@ class FieldSet(BaseFieldSet):
         mr.__dict__ = dict(self.__dict__)
         # two steps so bind's error checking can work
         mr.rebind(model, session, data)
-        mr._fields = OrderedDict([(key, renderer.bind(mr)) for key, renderer in self._fields.iteritems()])
-        if self._render_fields:
-            mr._render_fields = OrderedDict([(field.key, field) for field in
-                                             [field.bind(mr) for field in self._render_fields.itervalues()]])
+        self._bind_fields(mr)
         return mr
 
     def gen_model(self, model=None, dict_like=False, **kwargs):
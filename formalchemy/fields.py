@@ -10,16 +10,29 @@ logger = logging.getLogger('formalchemy.' + __name__)
 
 from copy import copy, deepcopy
 import datetime
+import threading
+from gettext import NullTranslations
 import warnings
+from operator import attrgetter
 
 from sqlalchemy.orm import class_mapper, Query
 from sqlalchemy.orm.attributes import ScalarAttributeImpl, ScalarObjectAttributeImpl, CollectionAttributeImpl, InstrumentedAttribute
 from sqlalchemy.orm.properties import CompositeProperty, ColumnProperty
+from sqlalchemy.sql import and_, or_
 from sqlalchemy.exceptions import InvalidRequestError # 0.4 support
+from sqlalchemy.sql.expression import _Label
+try:
+    from sqlalchemy.sql.expression import Function
+except ImportError:
+    from sqlalchemy.sql.expression import _Function as Function
+try:
+    from sqlalchemy.orm.attributes import manager_of_class
+except ImportError: # 0.4 support
+    manager_of_class = lambda cls: None
 from formalchemy import helpers as h
 from formalchemy import fatypes, validators
 from formalchemy import config
-from formalchemy.i18n import get_translator
+from formalchemy.i18n import get_translator, _Translator
 from formalchemy.i18n import _
 
 __all__ = ['Field', 'FieldRenderer',
@@ -27,7 +40,8 @@ __all__ = ['Field', 'FieldRenderer',
            'PasswordFieldRenderer', 'HiddenFieldRenderer',
            'DateFieldRenderer', 'TimeFieldRenderer',
            'DateTimeFieldRenderer',
-           'CheckBoxFieldRenderer', 'CheckBoxSet',
+           'CheckBoxFieldRenderer', 'CheckBoxSet', 'OptionSet',
+           'AutocompleteFieldRenderer',
            'deserialize_once']
 
 
@@ -84,6 +98,88 @@ def deserialize_once(func):
         return self._deserialization_result
     return cache
 
+_slot_names_cache = {}
+
+def _slot_names(cls):
+    """names of the __slots__ of `cls` and its bases"""
+    try:
+        return _slot_names_cache[cls]
+    except KeyError:
+        names = []
+        for klass in cls.__mro__:
+            slots = klass.__dict__.get('__slots__', ())
+            if isinstance(slots, basestring):
+                slots = [slots]
+            names.extend([name for name in slots
+                          if name not in ('__dict__', '__weakref__')])
+        _slot_names_cache[cls] = names = tuple(names)
+        return names
+
+def _shallow_copy(obj):
+    """Same as copy(obj), without the overhead of the pickle protocol, for
+    objects with __slots__ (including __dict__)"""
+    clone = object.__new__(obj.__class__)
+    for name in _slot_names(obj.__class__):
+        try:
+            setattr(clone, name, getattr(obj, name))
+        except AttributeError:
+            # unset slot
+            pass
+    if obj.__dict__:
+        clone.__dict__.update(obj.__dict__)
+    return clone
+
+class RendererMap(dict):
+    """
+    The dict used for `default_renderers`.  It remembers which renderer was
+    found for each type (see `_resolve_renderer`), and forgets it as soon as
+    it is modified.  Plain dicts work too, without the cache.
+    """
+    def __init__(self, *args, **kwargs):
+        dict.__init__(self, *args, **kwargs)
+        self._resolved = {}
+
+    def _changed(method):
+        def wrapper(self, *args, **kwargs):
+            self._resolved.clear()
+            return method(self, *args, **kwargs)
+        wrapper.__name__ = method.__name__
+        return wrapper
+    __setitem__ = _changed(dict.__setitem__)
+    __delitem__ = _changed(dict.__delitem__)
+    clear = _changed(dict.clear)
+    pop = _changed(dict.pop)
+    popitem = _changed(dict.popitem)
+    setdefault = _changed(dict.setdefault)
+    update = _changed(dict.update)
+    del _changed
+
+    def copy(self):
+        return self.__class__(self)
+
+def _resolve_renderer(renderers, type_):
+    """Return the renderer of `renderers` (a `default_renderers` dict) for
+    `type_` (a type instance), or None: the renderer of the closest class in
+    its MRO, or else of the first type it is an instance of"""
+    cls = type_.__class__
+    resolved = getattr(renderers, '_resolved', None)
+    if resolved is not None and cls in resolved:
+        return resolved[cls]
+    renderer = None
+    for klass in getattr(cls, '__mro__', ()):
+        if klass in renderers:
+            renderer = renderers[klass]
+            break
+    else:
+        # old style classes, abstract base classes...
+        for t in renderers:
+            if not isinstance(t, basestring) and isinstance(type_, t):
+                renderer = renderers[t]
+                break
+    if resolved is not None:
+        resolved[cls] = renderer
+    return renderer
+
 class FieldRenderer(object):
     """
     This should be the super class of all Renderer classes.
@@ -95,9 +191,21 @@ class FieldRenderer(object):
     Subclasses should override `render` and `deserialize`.
     See their docstrings for details.
     """
+    # there is one renderer per bound field, so keep them small.  the stock
+    # renderers define (empty) __slots__ too.  __dict__ is only allocated if
+    # some other attribute is set.
+    __slots__ = ('field', '_deserialization_result', '_name_prefix', '_name',
+                 '__dict__')
+
+    # whether the options of relation fields must be queried for render()
+    needs_options = True
+
     def __init__(self, field):
         self.field = field
         assert isinstance(self.field, AbstractField)
+        # name cache, valid as long as the name prefix of the parent is the
+        # same object
+        self._name_prefix = self._name = None
 
     @property
     def name(self):
@@ -134,22 +242,11 @@ class FieldRenderer(object):
         get the field's `name` HTML attribute, both when rendering
         and deserializing.
         """
-        clsname = self.field.model.__class__.__name__
-        pk = self.field.parent._bound_pk
-        assert pk != ''
-        if isinstance(pk, basestring) or not iterable(pk):
-            pk_string = _stringify(pk)
-        else:
-            # remember to use a delimiter that can be used in the DOM (specifically, no commas).
-            # we don't have to worry about escaping the delimiter, since we never try to
-            # deserialize the generated name.  All we care about is generating unique
-            # names for a given model's domain.
-            pk_string = u'_'.join([_stringify(k) for k in pk])
-
-        components = [clsname, pk_string, self.field.name]
-        if self.field.parent.prefix:
-            components.insert(0, self.field.parent.prefix)
-        return u"-".join(components)
+        prefix = self.field.parent._get_name_prefix()
+        if prefix is not self._name_prefix:
+            self._name = prefix + self.field.name
+            self._name_prefix = prefix
+        return self._name
 
     @property
     def value(self):
@@ -194,7 +291,15 @@ class FieldRenderer(object):
             lang = kwargs.pop('lang')
         else:
             lang = 'en'
-        return get_translator(lang=lang).gettext
+        # the catalog is only looked up once per render of the parent
+        translators = self.field.parent._translators
+        if translators is None:
+            return get_translator(lang=lang).gettext
+        try:
+            return translators[lang]
+        except KeyError:
+            F_ = translators[lang] = get_translator(lang=lang).gettext
+            return F_
 
     @property
     def errors(self):
@@ -392,6 +497,7 @@ class EscapingReadonlyRenderer(FieldRenderer):
     output.  The FormAlchemy admin app extension for Pylons uses this,
     for instance.)
     """
+    __slots__ = ('_renderer',)
     def __init__(self, field):
         FieldRenderer.__init__(self, field)
         self._renderer = field._get_renderer()(field)
@@ -405,6 +511,7 @@ class EscapingReadonlyRenderer(FieldRenderer):
 
 class TextFieldRenderer(FieldRenderer):
     """render a field as a text field"""
+    __slots__ = ()
     @property
     def length(self):
         return self.field.type.length
@@ -415,17 +522,20 @@ class TextFieldRenderer(FieldRenderer):
 
 class IntegerFieldRenderer(FieldRenderer):
     """render an integer as a text field"""
+    __slots__ = ()
     def render(self, **kwargs):
         return h.text_field(self.name, value=self.value, **kwargs)
 
 
 class FloatFieldRenderer(FieldRenderer):
     """render a float as a text field"""
+    __slots__ = ()
     def render(self, **kwargs):
         return h.text_field(self.name, value=self.value, **kwargs)
 
 class IntervalFieldRenderer(FloatFieldRenderer):
     """render an interval as a text field"""
+    __slots__ = ()
 
     def _deserialize(self, data):
         value = FloatFieldRenderer._deserialize(self, data)
@@ -435,6 +545,7 @@ class IntervalFieldRenderer(FloatFieldRenderer):
 
 class PasswordFieldRenderer(TextFieldRenderer):
     """Render a password field"""
+    __slots__ = ()
     def render(self, **kwargs):
         return h.password_field(self.name, value=self.value, maxlength=self.length, **kwargs)
     def render_readonly(self):
@@ -442,6 +553,7 @@ class PasswordFieldRenderer(TextFieldRenderer):
 
 class TextAreaFieldRenderer(FieldRenderer):
     """render a field as a textarea"""
+    __slots__ = ()
     def render(self, **kwargs):
         if isinstance(kwargs.get('size'), tuple):
             kwargs['size'] = 'x'.join([str(i) for i in kwargs['size']])
@@ -450,6 +562,7 @@ class TextAreaFieldRenderer(FieldRenderer):
 
 class HiddenFieldRenderer(FieldRenderer):
     """render a field as an hidden field"""
+    __slots__ = ()
     def render(self, **kwargs):
         return h.hidden_field(self.name, value=self.value, **kwargs)
     def render_readonly(self):
@@ -458,6 +571,7 @@ class HiddenFieldRenderer(FieldRenderer):
 
 class CheckBoxFieldRenderer(FieldRenderer):
     """render a boolean value as checkbox field"""
+    __slots__ = ()
     def render(self, **kwargs):
         return h.check_box(self.name, True, checked=_simple_eval(self.value or ''), **kwargs)
     def _serialized_value(self):
@@ -471,6 +585,7 @@ class CheckBoxFieldRenderer(FieldRenderer):
 
 class FileFieldRenderer(FieldRenderer):
     """render a file input field"""
+    __slots__ = ('_data', '_filename')
     remove_label = _('Remove')
     def __init__(self, *args, **kwargs):
         FieldRenderer.__init__(self, *args, **kwargs)
@@ -534,8 +649,46 @@ def _ternary(condition, first, second):
         return first()
     return second()
 
+# catalog -> [last use, OptionSets of the month and day selects], for the
+# `_max_date_options` most recently used catalogs
+_date_options = {}
+_max_date_options = 20
+_date_options_clock = [0]
+_date_options_lock = threading.Lock()
+
+def _build_date_options(F_):
+    month_labels = (F_('Month'),) + tuple([unicode(F_('month_%02i' % i), 'utf-8') for i in xrange(1, 13)])
+    return (OptionSet(zip(month_labels, ['MM'] + [str(i) for i in xrange(1, 13)])),
+            OptionSet([(F_('Day'), 'DD')] + [(i, str(i)) for i in xrange(1, 32)]))
+
+def _get_date_options(F_):
+    """return the month and day OptionSets translated by `F_`"""
+    # only the gettext of the catalogs returned by get_translator is cached:
+    # the catalogs are loaded once, and always translate the same way. Other
+    # translators may depend on the current request
+    catalog = getattr(F_, 'im_self', None)
+    if not isinstance(catalog, (NullTranslations, _Translator)) or \
+       getattr(F_, '__name__', None) != 'gettext':
+        return _build_date_options(F_)
+    _date_options_clock[0] += 1
+    entry = _date_options.get(catalog)
+    if entry is not None:
+        entry[0] = _date_options_clock[0]
+        return entry[1]
+    options = _build_date_options(F_)
+    _date_options_lock.acquire()
+    try:
+        if catalog not in _date_options and len(_date_options) >= _max_date_options:
+            oldest = min(_date_options.iteritems(), key=lambda item: item[1][0])[0]
+            del _date_options[oldest]
+        _date_options[catalog] = [_date_options_clock[0], options]
+    finally:
+        _date_options_lock.release()
+    return options
+
 class DateFieldRenderer(FieldRenderer):
     """Render a date field"""
+    __slots__ = ()
     @property
     def format(self):
         return config.date_format
@@ -547,9 +700,7 @@ class DateFieldRenderer(FieldRenderer):
         return value and value.strftime(self.format) or ''
     def _render(self, **kwargs):
         data = self.params
-        F_ = self.get_translator(**kwargs)
-        month_options = [(F_('Month'), 'MM')] + [(unicode(F_('month_%02i' % i), 'utf-8'), str(i)) for i in xrange(1, 13)]
-        day_options = [(F_('Day'), 'DD')] + [(i, str(i)) for i in xrange(1, 32)]
+        month_options, day_options = _get_date_options(self.get_translator(**kwargs))
         mm_name = self.name + '__month'
         dd_name = self.name + '__day'
         yyyy_name = self.name + '__year'
@@ -561,8 +712,8 @@ class DateFieldRenderer(FieldRenderer):
         else:
             yyyy = str(self.field.model_value and self.field.model_value.year or 'YYYY')
         selects = dict(
-                m=h.select(mm_name, [mm], month_options, **kwargs),
-                d=h.select(dd_name, [dd], day_options, **kwargs),
+                m=month_options.select(mm_name, [mm], **kwargs),
+                d=day_options.select(dd_name, [dd], **kwargs),
                 y=h.text_field(yyyy_name, value=yyyy, maxlength=4, size=4, **kwargs))
         value = [selects.get(l) for l in self.edit_format.split('-')]
         return h.literal('\n').join(value)
@@ -574,6 +725,7 @@ class DateFieldRenderer(FieldRenderer):
 
 class TimeFieldRenderer(FieldRenderer):
     """Render a time field"""
+    __slots__ = ()
     format = '%H:%M:%S'
     def is_time_type(self):
         return isinstance(self.field.model_value, (datetime.datetime, datetime.date, datetime.time))
@@ -582,9 +734,6 @@ class TimeFieldRenderer(FieldRenderer):
         return isinstance(value, datetime.time) and value.strftime(self.format) or ''
     def _render(self, **kwargs):
         data = self.params
-        hour_options = ['HH'] + [str(i) for i in xrange(24)]
-        minute_options = ['MM' ] + [str(i) for i in xrange(60)]
-        second_options = ['SS'] + [str(i) for i in xrange(60)]
         hh_name = self.name + '__hour'
         mm_name = self.name + '__minute'
         ss_name = self.name + '__second'
@@ -599,9 +748,9 @@ class TimeFieldRenderer(FieldRenderer):
                        lambda: data[ss_name][-1],
                        lambda: str(is_time_type and self.field.model_value.second))
         return h.literal(':').join([
-                    h.select(hh_name, [hh], hour_options, **kwargs),
-                    h.select(mm_name, [mm], minute_options, **kwargs),
-                    h.select(ss_name, [ss], second_options, **kwargs)])
+                    _hour_options.select(hh_name, [hh], **kwargs),
+                    _minute_options.select(mm_name, [mm], **kwargs),
+                    _second_options.select(ss_name, [ss], **kwargs)])
     def render(self, **kwargs):
         return h.content_tag('span', self._render(**kwargs), id=self.name)
 
@@ -611,6 +760,7 @@ class TimeFieldRenderer(FieldRenderer):
 
 class DateTimeFieldRenderer(DateFieldRenderer, TimeFieldRenderer):
     """Render a date time field"""
+    __slots__ = ()
     format = '%Y-%m-%d %H:%M:%S'
     def render(self, **kwargs):
         return h.content_tag('span', DateFieldRenderer._render(self, **kwargs) + h.literal(' ') + TimeFieldRenderer._render(self, **kwargs), id=self.name)
@@ -635,8 +785,90 @@ def _extract_options(options):
             yield (choice, choice)
 
 
+class OptionSet(list):
+    """
+    A list of options (`(label, value)` pairs or strings) which renders its
+    `<option>` tags once. They are reused by all the selects rendering the
+    same OptionSet (the rows of a grid, or all the requests for options
+    configured with `dropdown()` or cached by `config.option_cache`); only
+    the selected options are rendered again. Do not modify an OptionSet once
+    it has been rendered.
+
+        >>> options = OptionSet([('One', 1), ('Two', 2)])
+        >>> print options.select('number', [2])
+        <select id="number" name="number">
+        <option value="1">One</option>
+        <option selected="selected" value="2">Two</option>
+        </select>
+    """
+    __slots__ = ('_html',)
+
+    def __init__(self, options=()):
+        list.__init__(self, options)
+        # null value -> (<option> tags, value -> positions, labels, selected
+        # <option> tags rendered so far), or None if there are optgroups
+        self._html = {}
+
+    def _pairs(self, null_value=u''):
+        if self and not isinstance(self[0], basestring) and len(self[0]) == 2:
+            return [(k, _stringify(v, null_value)) for k, v in self]
+        return [_stringify(k) for k in self]
+
+    def _render(self, null_value):
+        tags = []
+        positions = {}
+        labels = []
+        for option in self._pairs(null_value):
+            if isinstance(option, tuple):
+                label, value = option
+            else:
+                label = value = option
+            if isinstance(value, (list, tuple)):
+                # an optgroup
+                return None
+            if not isinstance(label, unicode):
+                label = unicode(label)
+            positions.setdefault(value, []).append(len(tags))
+            labels.append(label)
+            tags.append(unicode(h.HTML.option(label, value=value)))
+        return tags, positions, labels, [None] * len(tags)
+
+    def select(self, name, selected, null_value=u'', **kwargs):
+        """Render a select named `name` whose `selected` values (a value or a
+        list of values) are selected. Options values are stringified with
+        `null_value` as value of `None`."""
+        try:
+            html = self._html[null_value]
+        except KeyError:
+            html = self._html[null_value] = self._render(null_value)
+        if html is None or 'prompt' in kwargs:
+            return h.select(name, selected, self._pairs(null_value), **kwargs)
+        tags, positions, labels, selected_tags = html
+        if selected is None:
+            selected = (u'',)
+        elif isinstance(selected, (basestring, int, long)):
+            selected = (selected,)
+        body = tags
+        for value in set([unicode(v) for v in selected]):
+            for i in positions.get(value, ()):
+                if body is tags:
+                    body = list(tags)
+                tag = selected_tags[i]
+                if tag is None:
+                    tag = selected_tags[i] = unicode(h.HTML.option(labels[i], value=value, selected='selected'))
+                body[i] = tag
+        return h.select_around(name, u'\n'.join(body), **kwargs)
+
+
+# options of the selects of TimeFieldRenderer
+_hour_options = OptionSet(['HH'] + [str(i) for i in xrange(24)])
+_minute_options = OptionSet(['MM'] + [str(i) for i in xrange(60)])
+_second_options = OptionSet(['SS'] + [str(i) for i in xrange(60)])
+
+
 class RadioSet(FieldRenderer):
     """render a field as radio"""
+    __slots__ = ('radios',)
     widget = staticmethod(h.radio_button)
     format = '%(field)s%(label)s'
 
@@ -650,8 +882,11 @@ class RadioSet(FieldRenderer):
             value = self.value
         return value == _stringify(choice_value)
 
+    def _selection(self):
+        return self.value
+
     def render(self, options, **kwargs):
-        value = self.value
+        value = self._selection()
         self.radios = []
         if callable(options):
             options = options(self.field.parent)
@@ -667,6 +902,7 @@ class RadioSet(FieldRenderer):
 
 
 class CheckBoxSet(RadioSet):
+    __slots__ = ()
     widget = staticmethod(h.check_box)
 
     def _serialized_value(self):
@@ -674,6 +910,13 @@ class CheckBoxSet(RadioSet):
             return []
         return FieldRenderer._serialized_value(self)
 
+    def _selection(self):
+        # a set, so that _is_checked() does not scan the selected values
+        value = self.value
+        if isinstance(value, (list, tuple)):
+            return set(value)
+        return value
+
     def _is_checked(self, choice_value, value=NoDefault):
         if value is NoDefault:
             value = self.value
@@ -682,6 +925,7 @@ class CheckBoxSet(RadioSet):
 
 class SelectFieldRenderer(FieldRenderer):
     """render a field as select"""
+    __slots__ = ()
     def _serialized_value(self):
         if self.name not in self.params:
             if self.field.is_collection:
@@ -695,7 +939,13 @@ class SelectFieldRenderer(FieldRenderer):
             if not self.field.is_required() and not self.field.is_collection:
                 L.insert(0, self.field._null_option)
         else:
-            L = list(options)
+            L = options
+        if self.__class__.stringify_value.im_func is FieldRenderer.stringify_value.im_func:
+            if not isinstance(L, OptionSet):
+                L = OptionSet(L)
+            return L.select(self.name, self.value, self.field._null_option[1], **kwargs)
+        # custom stringify_value()
+        L = list(L)
         if len(L) > 0:
             if len(L[0]) == 2:
                 L = [(k, self.stringify_value(v)) for k, v in L]
@@ -730,6 +980,92 @@ class SelectFieldRenderer(FieldRenderer):
         return _stringify(D.get(value, value))
 
 
+class AutocompleteFieldRenderer(FieldRenderer):
+    """
+    render a scalar relation as a text input completed by the server. Only
+    the current value is rendered: the related table is not queried. Use
+    `Field.autocomplete()` to configure it.
+
+    The pk of the selected item is stored in a hidden input (whose id ends
+    with `__value`). The text input has a `fa_autocomplete` class and its
+    `data-source` is the url returning the matching items (see `search()`),
+    as a json list of `{"label": ..., "value": ...}` objects.
+    """
+    __slots__ = ()
+    needs_options = False
+    #: the number of items returned when the field has no `limit`
+    default_limit = 20
+
+    @property
+    def label_name(self):
+        """name of the text input"""
+        return self.name + '__label'
+
+    @property
+    def max_limit(self):
+        """the maximum number of items returned by a search"""
+        return self.field._render_opt('limit') or self.default_limit
+
+    def limit(self, requested=None):
+        """
+        Return the number of items to search for a client asking for
+        `requested` items (e.g. the `limit` parameter of the request): at
+        most `max_limit`. Raise a `ValueError` if `requested` is not a
+        positive integer.
+        """
+        if requested is None or requested == '':
+            return self.max_limit
+        requested = int(requested)
+        if requested < 1:
+            raise ValueError('limit must be positive, got %r' % requested)
+        return min(requested, self.max_limit)
+
+    def render(self, url=None, label=None, limit=None, **kwargs):
+        if callable(url):
+            url = url(self.field)
+        limit = limit or self.default_limit
+        if self.params is not None and self.label_name in self.params:
+            text = self.params.getone(self.label_name)
+        else:
+            text = self.raw_value
+            text = text is not None and _stringify(text) or ''
+        attrs = {'data-source': url, 'data-limit': limit}
+        attrs.update(kwargs)
+        attrs['class_'] = ' '.join([c for c in ('fa_autocomplete', attrs.get('class_')) if c])
+        # the text input gets the id of the field, for labels and focus
+        attrs.setdefault('id', self.name)
+        return h.hidden_field(self.name, value=self.value, id=self.name + '__value') + \
+               h.text_field(self.label_name, value=text, autocomplete='off', **attrs)
+
+    def _label_column(self):
+        cls = self.field.relation_type()
+        label = self.field._render_opt('label')
+        if label is None:
+            label = self.field._option_label
+        if label is not None:
+            if isinstance(label, basestring):
+                label = getattr(cls, label)
+            return label
+        # the first string column
+        for column in class_mapper(cls).columns:
+            if isinstance(column.type, fatypes.String):
+                return column
+        raise ValueError('No label column found for %s. Use autocomplete(label=...)' % cls.__name__)
+
+    def search(self, term, limit=None):
+        """
+        Return the `(label, pk)` pairs of at most `limit` related items whose
+        label column starts with `term`.
+        """
+        if limit is None:
+            limit = self.max_limit
+        column = self._label_column()
+        term = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        q = self.field.query(self.field.relation_type())
+        q = q.filter(column.like(term + '%', escape='\\')).order_by(column)
+        return _query_options(q.limit(limit))
+
+
 
 
 
@@ -737,6 +1073,14 @@ class SelectFieldRenderer(FieldRenderer):
 
 
 
+def _expression_key(expression):
+    """return a key identifying a SQL expression, with its bind values:
+    `str(expression)` renders them as `?`"""
+    if hasattr(expression, '__clause_element__'):
+        expression = expression.__clause_element__()
+    compiled = expression.compile()
+    return (str(compiled), repr(sorted(compiled.params.items())))
+
 def _pk_one_column(instance, column):
     try:
         attr = getattr(instance, column.key)
@@ -755,9 +1099,47 @@ def _pk_one_column(instance, column):
                     break
     return attr
 
+def _pk_attribute_name(cls, column):
+    """return the name of the attribute of `cls` mapped to the PK `column`"""
+    if hasattr(cls, column.key):
+        return column.key
+    # the PK column may be named differently from its attribute, e.g.
+    #    id = Column('UGLY_NAMED_ID', primary_key=True)
+    for k in manager_of_class(cls).keys():
+        props = getattr(cls, k).property
+        if hasattr(props, 'columns'):
+            if props.columns[0] is column:
+                return k
+    return column.key
+
+# class -> (class manager, attrgetter returning the PK of an instance). The
+# manager is checked so that remapped classes are introspected again
+_pk_getters = {}
+
+def _pk_getter(cls, manager):
+    try:
+        cached_manager, getter = _pk_getters[cls]
+        if cached_manager is manager:
+            return getter
+    except KeyError:
+        pass
+    columns = class_mapper(cls).primary_key
+    # attrgetter returns a tuple when given several names, which is what
+    # Query.get() wants for multicolumn PKs
+    getter = attrgetter(*[_pk_attribute_name(cls, column) for column in columns])
+    _pk_getters[cls] = (manager, getter)
+    return getter
+
 def _pk(instance):
     # Return the value of this instance's primary key, suitable for passing to Query.get().
     # Will be a tuple if PK is multicolumn.
+    cls = type(instance)
+    manager = manager_of_class(cls)
+    if manager is not None:
+        try:
+            return _pk_getter(cls, manager)(instance)
+        except InvalidRequestError:
+            pass
     try:
         columns = class_mapper(type(instance)).primary_key
     except InvalidRequestError:
@@ -819,8 +1201,9 @@ def _query_options(L):
 def _normalized_options(options):
     """
     If `options` is an SA query or an iterable of SA instances, it will be
-    turned into a list of `(item description, item value)` pairs. Otherwise, a
-    copy of the original options will be returned with no further validation.
+    turned into an `OptionSet` of `(item description, item value)` pairs.
+    Otherwise, an `OptionSet` copy of the original options will be returned
+    with no further validation.
     """
     if isinstance(options, Query):
         options = options.all()
@@ -830,12 +1213,12 @@ def _normalized_options(options):
     try:
         first = i.next()
     except StopIteration:
-        return []
+        return OptionSet()
     try:
         class_mapper(type(first))
     except:
-        return list(options)
-    return _query_options(options)
+        return OptionSet(options)
+    return OptionSet(_query_options(options))
 
 
 def _foreign_keys(property):
@@ -879,7 +1262,16 @@ class AbstractField(object):
     >>> fs.configure(options=[fs.name.label('Username').readonly()])
 
     """
-    _null_option = (u'None', u'')
+    # there is a Field for each attribute of each FieldSet (and each bound
+    # copy of it), so keep them small.  the containers (render_opts,
+    # validators, errors, html_options and metadata) are stored in the
+    # underscored slots, where None means empty, and are only allocated when
+    # they are first accessed through their public attribute.  __dict__ is
+    # only allocated if some custom attribute is set.
+    __slots__ = ('parent', '_renderer', '_renderer_instance', '_render_opts', '_validators',
+                 '_errors', '_readonly', 'label_text', '_html_options',
+                 'is_pk', 'is_raw_foreign_key', '_metadata', '_null_option',
+                 '_option_label', '__dict__')
 
     def __init__(self, parent):
         # the FieldSet (or any ModelRenderer) owning this instance
@@ -891,37 +1283,68 @@ class AbstractField(object):
         # be autoguessed, unless the user forces it with .dropdown,
         # .checkbox, etc.
         self._renderer = None
+        # the renderer instance, created on first access to .renderer
+        self._renderer_instance = None
         # other render options, such as size, multiple, etc.
-        self.render_opts = {}
+        self._render_opts = None
         # validator functions added with .validate()
-        self.validators = []
+        self._validators = None
         # errors found by _validate() (which runs implicit and
         # explicit validators)
-        self.errors = []
+        self._errors = None
         self._readonly = False
         # label to use for the rendered field.  autoguessed if not specified by .label()
         self.label_text = None
         # optional attributes to pass to renderers
-        self.html_options = {}
+        self._html_options = None
         # True iff this Field is a primary key
         self.is_pk = False
         # True iff this Field is a raw foreign key
         self.is_raw_foreign_key = False
         # Field metadata, for customization
-        self.metadata = {}
+        self._metadata = None
+        # option used to render None, changed by .with_null_as()
+        self._null_option = (u'None', u'')
+        # column or SQL expression labelling the options of a relation,
+        # changed by .with_option_label()
+        self._option_label = None
         return False
 
+    def _container(slot, factory):
+        def fget(self):
+            value = getattr(self, slot)
+            if value is None:
+                value = factory()
+                setattr(self, slot, value)
+            return value
+        def fset(self, value):
+            setattr(self, slot, value)
+        return property(fget, fset)
+    render_opts = _container('_render_opts', dict)
+    validators = _container('_validators', list)
+    errors = _container('_errors', list)
+    html_options = _container('_html_options', dict)
+    metadata = _container('_metadata', dict)
+    del _container
+
+    def _render_opt(self, key, default=None):
+        # same as render_opts.get(), without allocating render_opts
+        if self._render_opts is None:
+            return default
+        return self._render_opts.get(key, default)
+
     def __deepcopy__(self, memo):
-        wrapper = copy(self)
-        wrapper.render_opts = dict(self.render_opts)
-        wrapper.validators = list(self.validators)
-        wrapper.errors = list(self.errors)
-        try:
-            wrapper._renderer = copy(self._renderer)
-        except TypeError: # 2.4 support
-            # it's a lambda, safe to just use same referende
-            pass
-        if hasattr(wrapper._renderer, 'field'):
+        wrapper = _shallow_copy(self)
+        for slot in ('_render_opts', '_validators', '_errors',
+                     '_html_options', '_metadata'):
+            value = getattr(self, slot)
+            if value:
+                setattr(wrapper, slot, type(value)(value))
+            else:
+                setattr(wrapper, slot, None)
+        wrapper._renderer_instance = None
+        if isinstance(self._renderer, FieldRenderer):
+            wrapper._renderer = _shallow_copy(self._renderer)
             wrapper._renderer.field = wrapper
         return wrapper
 
@@ -949,27 +1372,34 @@ class AbstractField(object):
             self.errors.append(e.message)
             return False
 
-        L = list(self.validators)
+        L = list(self._validators or ())
         if self.is_required() and validators.required not in L:
             L.append(validators.required)
+        report = self.parent._report
         for validator in L:
             if (not (hasattr(validator, 'accepts_none') and validator.accepts_none)) and value is None:
                 continue
+            if report is None:
+                self._call_validator(validator, value)
+            else:
+                report._time_validator(self, validator, value)
+        return not self.errors
+
+    def _call_validator(self, validator, value):
+        try:
+            validator(value, self)
+        except validators.ValidationError, e:
+            self.errors.append(e.message)
+        except TypeError:
+            warnings.warn(DeprecationWarning('Please provide a field argument to your %r validator. Your validator will break in FA 1.5' % validator))
             try:
-                validator(value, self)
+                validator(value)
             except validators.ValidationError, e:
                 self.errors.append(e.message)
-            except TypeError:
-                warnings.warn(DeprecationWarning('Please provide a field argument to your %r validator. Your validator will break in FA 1.5' % validator))
-                try:
-                    validator(value)
-                except validators.ValidationError, e:
-                    self.errors.append(e.message)
-        return not self.errors
 
     def is_required(self):
         """True iff this Field must be given a non-empty value"""
-        return validators.required in self.validators
+        return validators.required in (self._validators or ())
 
     def is_readonly(self):
         """True iff this Field is in readonly mode"""
@@ -980,8 +1410,11 @@ class AbstractField(object):
         return self.parent.model
 
     def _modified(self, **kwattrs):
-        # return a copy of self, with the given attributes modified
-        copied = deepcopy(self)
+        # return a copy of self, with the given attributes modified.
+        # __deepcopy__ is called directly since copy.deepcopy's memo
+        # bookkeeping is useless here and this is called for each field on
+        # FieldSet construction and bind
+        copied = self.__deepcopy__({})
         for attr, value in kwattrs.iteritems():
             setattr(copied, attr, value)
         return copied
@@ -989,8 +1422,8 @@ class AbstractField(object):
     def set(self, **kwattrs):
         """
         Update field attributes in place. Allowed attributes are: validate,
-        renderer, required, readonly, nul_as, label, multiple, options, size,
-        instructions, metadata::
+        renderer, required, readonly, nul_as, option_label, label, multiple,
+        options, size, instructions, metadata::
 
             >>> field = Field('myfield')
             >>> field.set(label='My field', renderer=SelectFieldRenderer,
@@ -1006,28 +1439,36 @@ class AbstractField(object):
         mapping = dict(renderer='_renderer',
                        readonly='_readonly',
                        null_as='_null_option',
+                       option_label='_option_label',
                        label='label_text')
+        # containers may be shared with bound copies of this field (see
+        # bind()), so they are replaced rather than modified in place
         for attr in attrs:
             value = kwattrs.pop(attr)
             if attr == 'validate':
-                self.validators.append(value)
+                self.validators = self.validators + [value]
             elif attr == 'metadata':
+                self.metadata = dict(self.metadata)
                 self.metadata.update(value)
             elif attr == 'instructions':
-                self.metadata['instructions'] = value
+                self.metadata = dict(self.metadata, instructions=value)
             elif attr == 'required':
                 if value:
                     if validators.required not in self.validators:
-                        self.validators.append(validators.required)
+                        self.validators = self.validators + [validators.required]
                 else:
                     if validators.required in self.validators:
-                        self.validators.remove(validators.required)
+                        self.validators = [v for v in self.validators
+                                           if v is not validators.required]
             elif attr in mapping:
                 attr = mapping.get(attr)
                 setattr(self, attr, value)
+                if attr == '_renderer':
+                    self._renderer_instance = None
             elif attr in ('multiple', 'options', 'size'):
                 if attr == 'options' and value is not None:
                     value = _normalized_options(value)
+                self.render_opts = dict(self.render_opts)
                 self.render_opts[attr] = value
             else:
                 raise ValueError('Invalid argument %s' % attr)
@@ -1036,6 +1477,14 @@ class AbstractField(object):
     def with_null_as(self, option):
         """Render null as the given option tuple of text, value."""
         return self._modified(_null_option=option)
+    def with_option_label(self, label):
+        """
+        Label the options of a relation with `label`, a column (or attribute
+        name) of the related class or any SQL expression, instead of
+        `unicode(item)`. The options are then fetched as `(label, pk)` rows,
+        without loading the related instances.
+        """
+        return self._modified(_option_label=label)
     def with_renderer(self, renderer):
         """
         Return a copy of this Field, with a different renderer.
@@ -1045,8 +1494,22 @@ class AbstractField(object):
         """
         return self._modified(_renderer=renderer)
     def bind(self, parent):
-        """Return a copy of this Field, bound to a different parent"""
-        return self._modified(parent=parent)
+        """Return a copy of this Field, bound to a different parent.
+
+        The copy shares its configuration (`validators`, `render_opts`,
+        `html_options` and `metadata`) with this Field; only the per-request
+        state (parent, errors and renderer instance) is its own. Use the
+        Field API (`set()`, `validate()`, ...) rather than modifying those
+        containers in place.
+        """
+        field = _shallow_copy(self)
+        field.parent = parent
+        field._errors = None
+        field._renderer_instance = None
+        if isinstance(self._renderer, FieldRenderer):
+            # also drops the result of deserialize_once
+            field._renderer = self._renderer.__class__(field)
+        return field
     def with_metadata(self, **attrs):
         """Attach some metadata attributes to the Field, to be used by
         conditions in templates.
@@ -1169,6 +1632,21 @@ class AbstractField(object):
         if multiple:
             field.render_opts['size'] = size
         return field
+    def autocomplete(self, url, label=None, limit=20):
+        """
+        Render a relation as a text input completed by the server, instead of
+        a select containing all the related items. `url` (or `url(field)` if
+        it is callable) returns the items matching the `term` parameter. See
+        `AutocompleteFieldRenderer`.
+
+        `label` is the column (or attribute name) of the related class
+        searched by `AutocompleteFieldRenderer.search()`, and `limit` the
+        maximum number of items returned.
+        """
+        field = deepcopy(self)
+        field._renderer = lambda f: f.parent.default_renderers['autocomplete']
+        field.render_opts = {'url': url, 'label': label, 'limit': limit}
+        return field
     def reset(self):
         """
         Return the field with all configuration changes reverted.
@@ -1176,48 +1654,54 @@ class AbstractField(object):
         return deepcopy(self.parent._fields[self.name])
 
     def _get_renderer(self):
-        for t in self.parent.default_renderers:
-            if not isinstance(t, basestring) and type(self.type) is t:
-                return self.parent.default_renderers[t]
-        for t in self.parent.default_renderers:
-            if not isinstance(t, basestring) and isinstance(self.type, t):
-                return self.parent.default_renderers[t]
-        raise TypeError(
-                'No renderer found for field %s. '
-                'Type %s as no default renderer' % (self.name, self.type))
+        renderer = _resolve_renderer(self.parent.default_renderers, self.type)
+        if renderer is None:
+            raise TypeError(
+                    'No renderer found for field %s. '
+                    'Type %s as no default renderer' % (self.name, self.type))
+        return renderer
 
     @property
     def renderer(self):
-        if self._renderer is None:
-            self._renderer = self._get_renderer()
-        try:
-            self._renderer = self._renderer(self)
-        except TypeError:
-            pass
-        if not isinstance(self._renderer, FieldRenderer):
-            # must be a Renderer class.  instantiate.
-            self._renderer = self._renderer(self)
-        return self._renderer
+        renderer = self._renderer_instance
+        if renderer is None:
+            renderer = self._renderer
+            if not isinstance(renderer, FieldRenderer):
+                if renderer is None:
+                    renderer = self._get_renderer()
+                renderer = renderer(self)
+                if not isinstance(renderer, FieldRenderer):
+                    # a callable returning a Renderer class, like the ones
+                    # set by .password(), .dropdown(), etc.  instantiate.
+                    renderer = renderer(self)
+            self._renderer_instance = renderer
+        return renderer
 
     def _get_render_opts(self):
         """
         Calculate the final options dict to be sent to renderers.
         """
+        opts = {}
         # Use options from internally set render_opts
-        opts = dict(self.render_opts)
+        if self._render_opts:
+            opts.update(self._render_opts)
         # Override with user-specified options (with .with_html())
-        opts.update(self.html_options)
+        if self._html_options:
+            opts.update(self._html_options)
         return opts
 
     def render(self):
         """
         Render this Field as HTML.
         """
+        report = self.parent._report
+        if report is not None and report._field is None:
+            return report._time_field(self, self.render)
         if self.is_readonly():
             return self.render_readonly()
+        return self._render(self._get_render_opts())
 
-        opts = self._get_render_opts()
-
+    def _render(self, opts):
         if (isinstance(self.type, fatypes.Boolean)
             and not opts.get('options')
             and self.renderer.__class__ in [self.parent.default_renderers['dropdown'], self.parent.default_renderers['radio']]):
@@ -1228,6 +1712,9 @@ class AbstractField(object):
         """
         Render this Field as HTML for read only mode.
         """
+        report = self.parent._report
+        if report is not None and report._field is None:
+            return report._time_field(self, self.render_readonly)
         return self.renderer.render_readonly(**self._get_render_opts())
 
     def _pkify(self, value):
@@ -1276,6 +1763,9 @@ class Field(AbstractField):
     """
     A manually-added form field
     """
+    __slots__ = ('type', 'name', 'key', '_value', 'is_relation',
+                 'is_scalar_relation')
+
     def __init__(self, name=None, type=fatypes.String, value=None, **kwattrs):
         """
         Create a new Field object.
@@ -1322,7 +1812,7 @@ class Field(AbstractField):
     def is_collection(self):
         if isinstance(self.type, (fatypes.List, fatypes.Set)):
             return True
-        return self.render_opts.get('multiple', False) or isinstance(self.renderer, self.parent.default_renderers['checkbox'])
+        return self._render_opt('multiple', False) or isinstance(self.renderer, self.parent.default_renderers['checkbox'])
 
     @property
     def raw_value(self):
@@ -1360,6 +1850,11 @@ class AttributeField(AbstractField):
     """
     Field corresponding to an SQLAlchemy attribute.
     """
+    __slots__ = ('_impl', '_property', 'is_collection', 'is_scalar_relation',
+                 'is_relation', 'is_composite', 'is_composite_foreign_key',
+                 'type', 'key', '_column_name', 'name', '_default',
+                 '_column_readonly', '_collection_cache')
+
     def __init__(self, instrumented_attribute, parent):
         """
             >>> from formalchemy.tests import FieldSet, Order
@@ -1421,13 +1916,29 @@ class AttributeField(AbstractField):
         else:
             self.name = self._column_name
 
+        # labels are computed by the database and can't be edited
+        self._column_readonly = isinstance(_columns[0], _Label)
+
+        # the column default, used as value of empty attributes
+        self._default = None
+        default = len(_columns) == 1 and getattr(_columns[0], 'default', None)
+        if default and hasattr(default, 'arg'): # Sequences have no value
+            arg = default.arg
+            # callables often depend on the current time, e.g. datetime.now or the equivalent SQL function.
+            # these are meant to be the value *at insertion time*, so it's not strictly correct to
+            # generate a value at form-edit time.
+            if not (callable(arg) or isinstance(arg, Function)):
+                self._default = arg
+
+        # (session, data, submitted pks, instances) of the last deserialization
+        self._collection_cache = None
+
         # smarter default "required" value
         if not self.is_collection and not self.is_readonly() and [c for c in _columns if not c.nullable]:
             self.validators.append(validators.required)
 
     def is_readonly(self):
-        from sqlalchemy.sql.expression import _Label
-        return AbstractField.is_readonly(self) or isinstance(self._columns[0], _Label)
+        return self._readonly or self._column_readonly
 
     @property
     def _columns(self):
@@ -1475,22 +1986,7 @@ class AttributeField(AbstractField):
                 v = getattr(self.model, self.key)
         if v is not None:
             return v
-
-        _columns = self._columns
-        if len(_columns) == 1 and  _columns[0].default:
-            try:
-                from sqlalchemy.sql.expression import Function
-            except ImportError:
-                from sqlalchemy.sql.expression import _Function as Function
-            arg = _columns[0].default.arg
-            if callable(arg) or isinstance(arg, Function):
-                # callables often depend on the current time, e.g. datetime.now or the equivalent SQL function.
-                # these are meant to be the value *at insertion time*, so it's not strictly correct to
-                # generate a value at form-edit time.
-                pass
-            else:
-                return arg
-        return None
+        return self._default
 
     def sync(self):
         """Set the attribute's value in `model` to the value given in `data`"""
@@ -1511,26 +2007,138 @@ class AttributeField(AbstractField):
         return 'AttributeField(%s)' % self.key
 
     def render(self):
+        report = self.parent._report
+        if report is not None and report._field is None:
+            return report._time_field(self, self.render)
         if self.is_readonly():
             return self.render_readonly()
-        if self.is_relation and self.render_opts.get('options') is None:
-            if self.is_required() or self.is_collection:
-                self.render_opts['options'] = []
-            else:
-                self.render_opts['options'] = [self._null_option]
-            # todo 2.0 this does not handle primaryjoin (/secondaryjoin) alternate join conditions
-            fk_cls = self.relation_type()
-            order_by = self._property.order_by or list(class_mapper(fk_cls).primary_key)
-            if order_by and not isinstance(order_by, list):
-                order_by = [order_by]
-            q = self.query(fk_cls).order_by(*order_by)
-            self.render_opts['options'] += _query_options(q)
-            logger.debug('options for %s are %s' % (self.name, self.render_opts['options']))
+        opts = self._get_render_opts()
+        if self.is_relation and self._render_opt('options') is None and self.renderer.needs_options:
+            opts['options'] = self._relation_options()
         if self.is_collection and isinstance(self.renderer, self.parent.default_renderers['dropdown']):
-            self.render_opts['multiple'] = True
-            if 'size' not in self.render_opts:
-                self.render_opts['size'] = 5
-        return AbstractField.render(self)
+            if not (self._html_options and 'multiple' in self._html_options):
+                opts['multiple'] = True
+            opts.setdefault('size', 5)
+        return self._render(opts)
+
+    def render_readonly(self):
+        report = self.parent._report
+        if report is not None and report._field is None:
+            return report._time_field(self, self.render_readonly)
+        cache = config.fragment_cache
+        if cache is None:
+            return AbstractField.render_readonly(self)
+        return cache.render(self, self._get_render_opts())
+
+    def _relation_options(self):
+        """
+        The options of a relation field without explicit options. They are
+        queried once per render of the parent (rows of a `Grid` share them).
+        """
+        memo = self.parent._options_memo
+        if memo is not None and self.key in memo:
+            return memo[self.key]
+        if self.is_required() or self.is_collection:
+            null_option = None
+        else:
+            null_option = self._null_option
+        # todo 2.0 this does not handle primaryjoin (/secondaryjoin) alternate join conditions
+        fk_cls = self.relation_type()
+        order_by = self._property.order_by or list(class_mapper(fk_cls).primary_key)
+        if order_by and not isinstance(order_by, list):
+            order_by = [order_by]
+        label = self._option_label
+        if isinstance(label, basestring):
+            label = getattr(fk_cls, label)
+        def load():
+            options = OptionSet(null_option and [null_option] or [])
+            options += self._load_options(fk_cls, order_by, label)
+            return options
+        cache = config.option_cache
+        if cache is None:
+            options = load()
+        else:
+            # the cached OptionSet keeps its rendered html between requests
+            key = (fk_cls, tuple([_expression_key(o) for o in order_by]),
+                   label is not None and _expression_key(label) or None, null_option)
+            options = cache.get(key, load)
+        logger.debug('options for %s are %s' % (self.name, options))
+        if memo is not None:
+            memo[self.key] = options
+        return options
+
+    def _load_options(self, fk_cls, order_by, label=None):
+        if label is None:
+            q = self.query(fk_cls).order_by(*order_by)
+            return _query_options(q)
+        # only fetch the label and the pk columns: no instance is created
+        mapper = class_mapper(fk_cls)
+        pk_columns = list(mapper.primary_key)
+        q = self.query(label, *pk_columns).select_from(mapper.mapped_table)
+        criterion = mapper._single_table_criterion
+        if criterion is not None:
+            q = q.filter(criterion)
+        q = q.order_by(*order_by)
+        if len(pk_columns) == 1:
+            return [(_stringify(row[0]), row[1]) for row in q]
+        return [(_stringify(row[0]), tuple(row[1:])) for row in q]
+
+    # maximum number of bind parameters of the IN queries of _load_collection
+    _in_query_size = 500
+
+    def _load_collection(self, pks):
+        """
+        Return the related instances for the submitted `pks`, in the same
+        order (`None` for unknown keys), like `query.get(pk)` would. Instances
+        missing from the identity map are loaded with a few `IN` queries. The
+        result is kept while the field is bound to the same session and data,
+        since `_validate()`, `value` and `sync()` all deserialize.
+        """
+        session = self.parent.session
+        data = self.parent.data
+        cached = self._collection_cache
+        if cached is not None and cached[0] is session and cached[1] is data and cached[2] == pks:
+            return list(cached[3])
+        query = self.query(self.relation_type())
+        mapper = self._property.mapper
+        columns = mapper.primary_key
+
+        def pk_key(pk):
+            if len(columns) == 1:
+                pk = (pk,)
+            return tuple([unicode(v) for v in pk])
+
+        found = {}
+        missing = []
+        for pk in pks:
+            if len(columns) == 1:
+                identity_key = mapper.identity_key_from_primary_key([pk])
+            else:
+                identity_key = mapper.identity_key_from_primary_key(list(pk))
+            if identity_key in session.identity_map:
+                # no query, unless the instance is expired
+                found[pk_key(pk)] = query.get(pk)
+            else:
+                missing.append(pk)
+        size = max(1, self._in_query_size / len(columns))
+        for i in range(0, len(missing), size):
+            chunk = missing[i:i + size]
+            if len(columns) == 1:
+                criterion = columns[0].in_(chunk)
+            else:
+                criterion = or_(*[and_(*[c == v for c, v in zip(columns, pk)]) for pk in chunk])
+            for instance in query.filter(criterion):
+                found[pk_key(_pk(instance))] = instance
+
+        instances = []
+        for pk in pks:
+            key = pk_key(pk)
+            if key not in found:
+                # types which do not compare as strings, or unknown keys
+                found[key] = query.get(pk)
+            instances.append(found[key])
+        self._collection_cache = (session, data, pks, instances)
+        return list(instances)
 
     def _get_renderer(self):
         if self.is_relation:
@@ -1546,7 +2154,7 @@ class AttributeField(AbstractField):
             python_pk = lambda st: st
 
         if self.is_collection:
-            return [self.query(self.relation_type()).get(python_pk(pk)) for pk in self.renderer.deserialize()]
+            return self._load_collection([python_pk(pk) for pk in self.renderer.deserialize()])
         if self.is_composite_foreign_key:
             return self.query(self.relation_type()).get(python_pk(self.renderer.deserialize()))
         return self.renderer.deserialize()
@@ -11,6 +11,7 @@ import base, fields
 from validators import ValidationError
 from formalchemy import config
 from formalchemy import exceptions
+from formalchemy.instrumentation import instrumented
 
 from tempita import Template as TempitaTemplate # must import after base
 
@@ -93,6 +94,7 @@ class AbstractFieldSet(base.EditableRenderer):
         base.EditableRenderer.configure(self, pk, exclude, include, options)
         self.validator = global_validator
 
+    @instrumented('validate')
     def validate(self):
         """
         Validate attributes and `global_validator`.
@@ -189,6 +191,7 @@ class FieldSet(AbstractFieldSet):
             raise Exception('Cannot sync a read-only FieldSet')
         AbstractFieldSet.sync(self)
 
+    @instrumented('render')
     def render(self, **kwargs):
         if fields._pk(self.model) != self._bound_pk and self.data is not None:
             msg = ("Primary key of model has changed since binding, "
@@ -196,15 +199,24 @@ class FieldSet(AbstractFieldSet):
                    "You can solve this by either binding to a model "
                    "with the original primary key again, or by binding data to None.")
             raise exceptions.PkError(msg % (self._bound_pk, fields._pk(self.model)))
-        engine = self.engine or config.engine
-        if self._render or self._render_readonly:
-            warnings.warn(DeprecationWarning('_render and _render_readonly are deprecated and will be removed in 1.5. Use a TemplateEngine instead'))
-        if self.readonly:
-            if self._render_readonly is not None:
-                engine._update_args(kwargs)
-                return self._render_readonly(fieldset=self, **kwargs)
-            return engine('fieldset_readonly', fieldset=self, **kwargs)
-        if self._render is not None:
-            engine._update_args(kwargs)
-            return self._render(fieldset=self, **kwargs)
-        return engine('fieldset', fieldset=self, **kwargs)
+        # the fragment cache entry of the model is only read once
+        self._fragments = {}
+        try:
+            engine = self.engine or config.engine
+            if self._render or self._render_readonly:
+                warnings.warn(DeprecationWarning('_render and _render_readonly are deprecated and will be removed in 1.5. Use a TemplateEngine instead'))
+            if self.readonly:
+                if self._render_readonly is not None:
+                    engine._update_args(kwargs)
+                    return self._render_readonly(fieldset=self, **kwargs)
+                name = 'fieldset_readonly'
+            else:
+                if self._render is not None:
+                    engine._update_args(kwargs)
+                    return self._render(fieldset=self, **kwargs)
+                name = 'fieldset'
+            if self._report is not None:
+                return self._report._time_template(engine, name, fieldset=self, **kwargs)
+            return engine(name, fieldset=self, **kwargs)
+        finally:
+            self._fragments = None
@@ -1,6 +1,8 @@
 """
 A small module to wrap WebHelpers in FormAlchemy.
 """
+import re
+
 from webhelpers.html.tags import text
 from webhelpers.html.tags import hidden
 from webhelpers.html.tags import password
@@ -8,13 +10,74 @@ from webhelpers.html.tags import textarea
 from webhelpers.html.tags import checkbox
 from webhelpers.html.tags import radio
 from webhelpers.html import tags
-from webhelpers.html import HTML, literal
+from webhelpers.html import HTML, literal, escape
+from webhelpers.html.builder import empty_tags
 
 def html_escape(s):
     return HTML(s)
 
 escape_once = html_escape
 
+# The helpers below build their tags themselves instead of calling
+# WebHelpers, which is slow for the many small tags of a grid. The markup is
+# the same: attributes are sorted by argument name and escaped, `None`
+# attributes are skipped and the trailing `_` of python keywords is removed.
+
+# argument name -> ' name="'
+_attr_prefixes = {}
+
+_needs_escape = re.compile(u'[&<>"\']').search
+
+def _escape(value):
+    # most values are ids, names and numbers which need no escaping
+    if isinstance(value, basestring) and _needs_escape(value) is None:
+        return value
+    return escape(value)
+
+def _format_attrs(attrs):
+    keys = attrs.keys()
+    keys.sort()
+    strings = []
+    for key in keys:
+        value = attrs[key]
+        if value is None:
+            continue
+        try:
+            prefix = _attr_prefixes[key]
+        except KeyError:
+            prefix = _attr_prefixes[key] = u' %s="' % (key.endswith('_') and key[:-1] or key)
+        strings.append(u'%s%s"' % (prefix, _escape(value)))
+    return u''.join(strings)
+
+def _is_plain(attrs):
+    """return False if WebHelpers gives a special meaning to some of `attrs`
+    (the helpers then let WebHelpers build the tag)"""
+    return not ('c' in attrs or '_nl' in attrs or 'id_' in attrs)
+
+def _set_id(attrs):
+    # an empty id set by the caller removes the id attribute
+    id = attrs['id']
+    if id is None or id == '':
+        del attrs['id']
+
+def _convert_booleans(attrs, names):
+    for name in names:
+        if name in attrs:
+            if attrs[name]:
+                attrs[name] = name
+            else:
+                del attrs[name]
+
+def _input(type, name, value, attrs, booleans=()):
+    """return an <input> tag, like the WebHelpers input helpers called with
+    the `attrs` updated by `_update_fa()`"""
+    _set_id(attrs)
+    attrs['type'] = type
+    attrs['name'] = name
+    attrs['value'] = value
+    _convert_booleans(attrs, booleans)
+    return literal(u'<input%s />' % _format_attrs(attrs))
+
 def content_tag(name, content, **options):
     """
     Create a tag with content
@@ -28,10 +91,11 @@ def content_tag(name, content, **options):
         >>> print content_tag("div", content_tag("p", "Hello world!"), class_="strong")
         <div class="strong"><p>Hello world!</p></div>
     """
-    if content is None:
-        content = ''
-    tag = HTML.tag(name, _closed=False, **options) + HTML(content) + literal('</%s>' % name)
-    return tag
+    if not _is_plain(options):
+        if content is None:
+            content = ''
+        return HTML.tag(name, _closed=False, **options) + HTML(content) + literal('</%s>' % name)
+    return literal(u'<%s%s>%s</%s>' % (name, _format_attrs(options), _escape(content), name))
 
 def text_field(name, value=None, **options):
     """
@@ -46,9 +110,16 @@ def text_field(name, value=None, **options):
     * ``maxlength`` - The maximum number of characters that the browser will allow the user to enter.
 
     Remaining keyword options will be standard HTML options for the tag.
+
+    Example::
+
+        >>> print text_field('name', value='<b>', id=None, class_='wide', disabled=True)
+        <input class="wide" disabled="disabled" name="name" type="text" value="&lt;b&gt;" />
     """
     _update_fa(options, name)
-    return text(name, value=value, **options)
+    if not _is_plain(options):
+        return text(name, value=value, **options)
+    return _input(options.pop('type', 'text'), name, value, options, ('disabled',))
 
 def password_field(name="password", value=None, **options):
     """
@@ -57,7 +128,9 @@ def password_field(name="password", value=None, **options):
     Takes the same options as text_field
     """
     _update_fa(options, name)
-    return password(name, value=value, **options)
+    if not _is_plain(options):
+        return password(name, value=value, **options)
+    return _input('password', name, value, options)
 
 def text_area(name, content='', **options):
     """
@@ -76,7 +149,11 @@ def text_area(name, content='', **options):
     if 'size' in options:
         options["cols"], options["rows"] = options["size"].split("x")
         del options['size']
-    return textarea(name, content=content, **options)
+    if not _is_plain(options):
+        return textarea(name, content=content, **options)
+    _set_id(options)
+    options['name'] = name
+    return literal(u'<textarea%s>%s</textarea>' % (_format_attrs(options), _escape(content)))
 
 def check_box(name, value="1", checked=False, **options):
     """
@@ -85,7 +162,9 @@ def check_box(name, value="1", checked=False, **options):
     _update_fa(options, name)
     if checked:
         options["checked"] = "checked"
-    return tags.checkbox(name, value=value, **options)
+    if 'label' in options or not _is_plain(options):
+        return tags.checkbox(name, value=value, **options)
+    return _input('checkbox', name, value, options, ('disabled', 'readonly'))
 
 def hidden_field(name, value=None, **options):
     """
@@ -94,7 +173,9 @@ def hidden_field(name, value=None, **options):
     Takes the same options as text_field
     """
     _update_fa(options, name)
-    return tags.hidden(name, value=value, **options)
+    if not _is_plain(options):
+        return tags.hidden(name, value=value, **options)
+    return _input('hidden', name, value, options)
 
 def file_field(name, value=None, **options):
     """
@@ -108,11 +189,20 @@ def file_field(name, value=None, **options):
         <input id="myfile" name="myfile" type="file" />
     """
     _update_fa(options, name)
-    return tags.file(name, value=value, type="file", **options)
+    if not _is_plain(options):
+        return tags.file(name, value=value, type="file", **options)
+    return _input('file', name, value, options)
 
 def radio_button(name, *args, **options):
     _update_fa(options, name)
-    return radio(name, *args, **options)
+    if len(args) != 1 or 'label' in options or not _is_plain(options):
+        return radio(name, *args, **options)
+    if options.pop('checked', False):
+        options['checked'] = 'checked'
+    options['type'] = 'radio'
+    options['name'] = name
+    options['value'] = args[0]
+    return literal(u'<input%s />' % _format_attrs(options))
 
 def tag_options(**options):
     strip_unders(options)
@@ -148,7 +238,13 @@ def tag(name, open=False, **options):
         >>> print tag("input", type='text', disabled='disabled')
         <input disabled="disabled" type="text" />
     """
-    return HTML.tag(name, _closed=not open, **options)
+    if not _is_plain(options):
+        return HTML.tag(name, _closed=not open, **options)
+    if open:
+        return literal(u'<%s%s>' % (name, _format_attrs(options)))
+    if name in empty_tags:
+        return literal(u'<%s%s />' % (name, _format_attrs(options)))
+    return literal(u'<%s%s></%s>' % (name, _format_attrs(options), name))
 
 def label(value, **kwargs):
     """
@@ -160,7 +256,9 @@ def label(value, **kwargs):
     """
     if 'for_' in kwargs:
         kwargs['for'] = kwargs.pop('for_')
-    return tag('label', open=True, **kwargs) + literal(value) + literal('</label>')
+    if not _is_plain(kwargs):
+        return tag('label', open=True, **kwargs) + literal(value) + literal('</label>')
+    return literal(u'<label%s>%s</label>' % (_format_attrs(kwargs), literal(value)))
 
 def select(name, selected, select_options, **attrs):
     """
@@ -178,6 +276,26 @@ def select(name, selected, select_options, **attrs):
     _update_fa(attrs, name)
     return tags.select(name, selected, select_options, **attrs)
 
+def select_around(name, option_tags, **attrs):
+    """
+    Creates a dropdown selection box containing `option_tags`, the already
+    rendered options::
+
+    >>> print select_around('people', '<option value="George">George</option>')
+    <select id="people" name="people">
+    <option value="George">George</option>
+    </select>
+
+    """
+    if not _is_plain(attrs) or 'prompt' in attrs:
+        start, end = select(name, None, [], **attrs).split('\n\n', 1)
+        return literal(u'%s\n%s\n%s' % (start, option_tags, end))
+    _update_fa(attrs, name)
+    _set_id(attrs)
+    attrs['name'] = name
+    _convert_booleans(attrs, ('multiple',))
+    return literal(u'<select%s>\n%s\n</select>' % (_format_attrs(attrs), option_tags))
+
 def options_for_select(container, selected=None):
     import warnings
     warnings.warn(DeprecationWarning('options_for_select will be removed in FormAlchemy 2.5'))
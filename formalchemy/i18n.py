@@ -4,24 +4,60 @@
 # the MIT License: http://www.opensource.org/licenses/mit-license.php
 
 import os
+import sys
 from gettext import GNUTranslations
 
 i18n_path = os.path.join(os.path.dirname(__file__), 'i18n_resources')
 
-try:
-    from pylons.i18n import get_lang
-    HAS_PYLONS = True
-except:
-    HAS_PYLONS = False
-
-if not HAS_PYLONS:
-    def get_lang(): return []
+def get_lang():
+    """return the languages of the current Pylons request, if Pylons is
+    used. (Pylons is not imported here: it is slow and a Pylons application
+    has always imported it before rendering a form)"""
+    if 'pylons' not in sys.modules:
+        return []
+    try:
+        from pylons.i18n import get_lang
+    except ImportError:
+        return []
+    return get_lang()
 
 class _Translator(object):
     """dummy translator"""
     def gettext(self, value):
         return value
 
+_translator = _Translator()
+
+# lang -> (GNUTranslations or None, mtime of the .mo file). Only a limited
+# number of unknown languages is remembered
+_catalogs = {}
+_max_unknown_catalogs = 100
+
+def _get_catalog(lang):
+    """return the GNUTranslations instance of `lang`, or None. Catalogs are
+    loaded once, unless `config.reload_translations` is set"""
+    from formalchemy import config
+    entry = _catalogs.get(lang)
+    if entry is not None and not config.reload_translations:
+        return entry[0]
+    filename = os.path.join(i18n_path, lang, 'LC_MESSAGES', 'formalchemy.mo')
+    try:
+        mtime = os.path.getmtime(filename)
+    except OSError:
+        mtime = None
+    if entry is None or entry[1] != mtime:
+        catalog = None
+        if mtime is not None:
+            fd = open(filename, 'rb')
+            try:
+                catalog = GNUTranslations(fd)
+            finally:
+                fd.close()
+        elif len(_catalogs) >= _max_unknown_catalogs:
+            return None
+        entry = _catalogs[lang] = (catalog, mtime)
+    return entry[0]
+
 def get_translator(lang=None):
     """
     return a GNUTranslations instance for `lang`::
@@ -33,6 +69,11 @@ def get_translator(lang=None):
         ... assert translator.gettext('Remove') == 'Remove'
         ... assert translator.gettext('month_01') == 'January'
 
+    The catalogs are loaded once per process::
+
+        >>> get_translator('fr') is get_translator('fr')
+        True
+
     """
     # get possible fallback languages
     try:
@@ -50,13 +91,12 @@ def get_translator(lang=None):
 
     # get the first available catalog
     for lang in langs:
-        filename = os.path.join(i18n_path, lang, 'LC_MESSAGES','formalchemy.mo')
-        if os.path.isfile(filename):
-            translations_path = os.path.join(i18n_path, lang, 'LC_MESSAGES','formalchemy.mo')
-            return GNUTranslations(open(translations_path, 'rb'))
+        catalog = _get_catalog(lang)
+        if catalog is not None:
+            return catalog
 
     # dummy translator
-    return _Translator()
+    return _translator
 
 def _(value):
     """dummy 'translator' to mark translation strings in python code"""
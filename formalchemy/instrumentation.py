@@ -0,0 +1,248 @@
+# Copyright (C) 2007 Alexandre Conrad, alexandre (dot) conrad (at) gmail (dot) com
+#
+# This module is part of FormAlchemy and is released under
+# the MIT License: http://www.opensource.org/licenses/mit-license.php
+
+__doc__ = """
+Timings of the renders, validations and syncs of the forms, to find the
+slow renderers, validators, templates and queries of an application.
+
+The instrumentation is disabled by default, and then costs nothing. Enable
+it with::
+
+    >>> from formalchemy import config
+    >>> from formalchemy.instrumentation import Instrumentation
+    >>> instrumentation = Instrumentation()
+    >>> config.instrumentation = instrumentation
+
+and subscribe observers. An observer is a callable, called with a
+:class:`Report` after each `render()`, `validate()` and `sync()` of a
+`FieldSet` or a `Grid` (each chunk of `Grid.render_iter()` is a render)::
+
+    >>> import logging
+    >>> def log_slow_operations(report):
+    ...     if report.elapsed > 0.5:
+    ...         logging.warning(report.summary())
+    >>> instrumentation.subscribe(log_slow_operations)
+
+The SQL statements are timed when the instrumentation listens to your
+engines. With SQLAlchemy >= 0.7::
+
+    instrumentation.listen(engine)
+
+With older versions, create the engine with the proxy::
+
+    engine = create_engine(url, proxy=instrumentation.proxy)
+
+Operations made during another operation of the same thread (the rows of a
+`Grid.sync()`, a form rendered by a renderer) are part of the outer one.
+
+    >>> config.instrumentation = None
+"""
+
+import sys
+import logging
+import threading
+from time import time
+
+from sqlalchemy.interfaces import ConnectionProxy
+try:
+    from sqlalchemy import event
+except ImportError: # 0.6 support
+    event = None
+
+from formalchemy import config
+
+logger = logging.getLogger('formalchemy.' + __name__)
+
+
+class Report(object):
+    """The timings of an operation, in seconds:
+
+    - `operation`: `'render'`, `'validate'` or `'sync'`
+
+    - `renderer`: the `FieldSet` or `Grid`
+
+    - `elapsed`: the duration of the operation
+
+    - `fields`: a dict of `[calls, seconds]` spent rendering the fields,
+      keyed by `(field key, renderer class)`. It includes the queries of the
+      relation options
+
+    - `validators`: a dict of `[calls, seconds]` keyed by
+      `(field key, validator)`
+
+    - `templates`: a dict of `[calls, seconds]` keyed by template name. A
+      template includes the fields it renders
+
+    - `statements`: the list of the `(statement, seconds)` of the SQL
+      statements
+    """
+
+    def __init__(self, operation, renderer):
+        self.operation = operation
+        self.renderer = renderer
+        self.elapsed = 0
+        self.fields = {}
+        self.validators = {}
+        self.templates = {}
+        self.statements = []
+        # the field being rendered
+        self._field = None
+
+    def _add(self, timings, key, seconds):
+        try:
+            timing = timings[key]
+        except KeyError:
+            timings[key] = [1, seconds]
+        else:
+            timing[0] += 1
+            timing[1] += seconds
+
+    def _time_field(self, field, method):
+        key = (field.key, field.renderer.__class__)
+        self._field = field
+        start = time()
+        try:
+            return method()
+        finally:
+            self._add(self.fields, key, time() - start)
+            self._field = None
+
+    def _time_validator(self, field, validator, value):
+        start = time()
+        try:
+            field._call_validator(validator, value)
+        finally:
+            self._add(self.validators, (field.key, validator), time() - start)
+
+    def _time_template(self, engine, name, **kwargs):
+        start = time()
+        try:
+            return engine(name, **kwargs)
+        finally:
+            self._add(self.templates, name, time() - start)
+
+    def summary(self, limit=5):
+        """Return a text listing the `limit` slowest fields, validators,
+        templates and statements of the operation"""
+        lines = ['%s of %r: %.1fms, %i SQL statements' % (
+                  self.operation, self.renderer, self.elapsed * 1000, len(self.statements))]
+        def add(title, items, label):
+            items = sorted(items, key=lambda item: -item[1][1])[:limit]
+            if items:
+                lines.append('  %s:' % title)
+            for key, (calls, seconds) in items:
+                lines.append('    %-50s %5i %9.1fms' % (label(key), calls, seconds * 1000))
+        add('fields', self.fields.items(),
+            lambda key: '%s (%s)' % (key[0], key[1].__name__))
+        add('validators', self.validators.items(),
+            lambda key: '%s (%s)' % (key[0], getattr(key[1], '__name__', repr(key[1]))))
+        add('templates', self.templates.items(), str)
+        add('statements', [(statement, (1, seconds)) for statement, seconds in self.statements],
+            lambda statement: ' '.join(statement.split())[:50])
+        return '\n'.join(lines)
+
+    def __repr__(self):
+        return '<Report of %s of %r (%.1fms)>' % (self.operation, self.renderer, self.elapsed * 1000)
+
+
+class Instrumentation(object):
+    """A registry of observers of the operations of the forms. It is thread
+    safe, the observers are called by the thread which ran the operation"""
+
+    def __init__(self):
+        self._observers = []
+        self._local = threading.local()
+        self.proxy = _InstrumentationProxy(self)
+
+    def subscribe(self, observer):
+        """Call `observer` with the :class:`Report` of each operation"""
+        self._observers = self._observers + [observer]
+
+    def unsubscribe(self, observer):
+        """Stop calling `observer`"""
+        self._observers = [o for o in self._observers if o != observer]
+
+    def listen(self, engine):
+        """Time the SQL statements executed by `engine`"""
+        if event is None:
+            raise ValueError('Use create_engine(proxy=instrumentation.proxy) with this version of SQLAlchemy')
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+
+    def _before_cursor_execute(self, conn, cursor, statement, *args):
+        self._local.statement_start = time()
+
+    def _after_cursor_execute(self, conn, cursor, statement, *args):
+        report = getattr(self._local, 'report', None)
+        start = getattr(self._local, 'statement_start', None)
+        if report is not None and start is not None:
+            report.statements.append((statement, time() - start))
+
+    def run(self, operation, renderer, method, *args, **kwargs):
+        """Run `method` and report it as the `operation` of `renderer`"""
+        local = self._local
+        outer = getattr(local, 'report', None)
+        if outer is not None:
+            if renderer._report is outer:
+                return method(*args, **kwargs)
+            renderer._report = outer
+            try:
+                return method(*args, **kwargs)
+            finally:
+                renderer.__dict__.pop('_report', None)
+        report = local.report = renderer._report = Report(operation, renderer)
+        start = time()
+        try:
+            result = method(*args, **kwargs)
+        except:
+            exc_info = sys.exc_info()
+            self._notify(report, start)
+            raise exc_info[0], exc_info[1], exc_info[2]
+        self._notify(report, start)
+        return result
+
+    def _notify(self, report, start):
+        """end `report` and call the observers. Their errors are logged, so
+        that they can not change the result of the operation"""
+        report.elapsed = time() - start
+        self._local.report = None
+        report.renderer.__dict__.pop('_report', None)
+        for observer in self._observers:
+            try:
+                observer(report)
+            except Exception:
+                logger.exception('Error in the instrumentation observer %r', observer)
+
+
+class _InstrumentationProxy(ConnectionProxy):
+    """Time the SQL statements for an :class:`Instrumentation`"""
+
+    def __init__(self, instrumentation):
+        self.instrumentation = instrumentation
+
+    def cursor_execute(self, execute, cursor, statement, parameters, context, executemany):
+        report = getattr(self.instrumentation._local, 'report', None)
+        if report is None:
+            return execute(cursor, statement, parameters, context)
+        start = time()
+        try:
+            return execute(cursor, statement, parameters, context)
+        finally:
+            report.statements.append((statement, time() - start))
+
+
+def instrumented(operation):
+    """Decorate a method of a `FieldSet` or `Grid` performing `operation`,
+    so it is reported to `config.instrumentation`"""
+    def decorate(method):
+        def wrapper(self, *args, **kwargs):
+            instrumentation = config.instrumentation
+            if instrumentation is None:
+                return method(self, *args, **kwargs)
+            return instrumentation.run(operation, self, method, self, *args, **kwargs)
+        wrapper.__name__ = method.__name__
+        wrapper.__doc__ = method.__doc__
+        return wrapper
+    return decorate
@@ -0,0 +1,47 @@
+/* Completion of the inputs rendered by formalchemy's AutocompleteFieldRenderer.
+   The data-source url is queried with the typed text as `term` and must
+   return a json list of {"label": ..., "value": ...} objects. */
+(function() {
+  function complete(input) {
+    var hidden = document.getElementById(input.id + '__value');
+    var list = document.createElement('ul');
+    var request = null;
+    list.className = 'fa_autocomplete_items';
+    list.style.display = 'none';
+    input.parentNode.insertBefore(list, input.nextSibling);
+    input.onkeyup = function() {
+      var term = input.value;
+      hidden.value = '';
+      if (request) request.abort();
+      if (!term) { list.style.display = 'none'; return; }
+      var source = input.getAttribute('data-source');
+      request = new XMLHttpRequest();
+      request.open('GET', source + (source.indexOf('?') < 0 ? '?' : '&') +
+                   'term=' + encodeURIComponent(term) +
+                   '&limit=' + input.getAttribute('data-limit'));
+      request.onreadystatechange = function() {
+        if (this.readyState != 4 || this.status != 200) return;
+        var items = JSON.parse(this.responseText);
+        list.innerHTML = '';
+        for (var i = 0; i < items.length; i++) {
+          var li = document.createElement('li');
+          li.appendChild(document.createTextNode(items[i].label));
+          li.onclick = (function(item) { return function() {
+            input.value = item.label;
+            hidden.value = item.value;
+            list.style.display = 'none';
+          }; })(items[i]);
+          list.appendChild(li);
+        }
+        list.style.display = items.length ? '' : 'none';
+      };
+      request.send(null);
+    };
+  }
+  function init() {
+    var inputs = document.getElementsByClassName('fa_autocomplete');
+    for (var i = 0; i < inputs.length; i++) complete(inputs[i]);
+  }
+  // do not replace the other load handlers of the page
+  window.addEventListener('load', init, false);
+})();
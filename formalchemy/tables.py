@@ -4,9 +4,20 @@
 # the MIT License: http://www.opensource.org/licenses/mit-license.php
 
 import helpers as h
+from itertools import islice
+
+from sqlalchemy.orm import class_mapper, defer
+from sqlalchemy.orm.properties import ColumnProperty
+try:
+    from sqlalchemy.orm import joinedload, subqueryload
+except ImportError: # 0.5 support
+    from sqlalchemy.orm import eagerload as joinedload
+    subqueryload = joinedload
 
 from formalchemy import config
 from formalchemy import base
+from formalchemy import fields
+from formalchemy.instrumentation import instrumented
 
 from tempita import Template as TempitaTemplate # must import after base
 
@@ -46,7 +57,8 @@ class Grid(base.EditableRenderer):
     dictionary whose keys are `Field`s, and whose values are
     `ValidationError` instances.
     """
-    engine = _render = _render_readonly = None
+    engine = _render = _render_readonly = _placeholder = _placeholder_kwargs = None
+    _render_head = True
 
     def __init__(self, cls, instances=[], session=None, data=None, prefix=None):
         from sqlalchemy.orm import class_mapper
@@ -90,7 +102,64 @@ class Grid(base.EditableRenderer):
         if instances is not None:
             self.rows = instances
 
+    def prepare_query(self, query, defer_columns=False):
+        """
+        Return `query` (a query of the grid class, e.g. the one given to a
+        paginator) with the relations rendered by this grid eagerly loaded,
+        so that rendering the rows does not run one query per row and
+        relation. Scalar relations are joined, collections are loaded with a
+        second query for all the rows.
+
+        If `defer_columns` is true, the columns which are not rendered are
+        not loaded either. Only use it when the manual fields of the grid
+        (`Field` with a callable value) do not read them, since each row would
+        then run a query.
+        """
+        mapper = class_mapper(self._original_cls)
+        options = []
+        rendered = set()
+        for field in self.render_fields.itervalues():
+            if not isinstance(field, fields.AttributeField):
+                continue
+            if field.is_scalar_relation:
+                options.append(joinedload(field.key))
+            elif field.is_collection:
+                options.append(subqueryload(field.key))
+            else:
+                rendered.update(field._columns)
+        if defer_columns:
+            kept = set(mapper.primary_key)
+            if mapper.polymorphic_on is not None:
+                kept.add(mapper.polymorphic_on)
+            if mapper.version_id_col is not None:
+                kept.add(mapper.version_id_col)
+            for prop in mapper.iterate_properties:
+                if not isinstance(prop, ColumnProperty) or prop.deferred:
+                    continue
+                if not [c for c in prop.columns if c in rendered or c in kept]:
+                    options.append(defer(prop.key))
+        if not options:
+            return query
+        return query.options(*options)
+
     def render(self, **kwargs):
+        if self._placeholder is not None:
+            # see stream_page: the rows are rendered later, with the same kwargs
+            self._placeholder_kwargs = kwargs
+            return self._placeholder
+        # relation options are queried once per render, not once per row
+        self._options_memo = {}
+        self._translators = {}
+        self._fragments = {}
+        try:
+            return self._render_grid(**kwargs)
+        finally:
+            self._options_memo = None
+            self._translators = None
+            self._fragments = None
+
+    @instrumented('render')
+    def _render_grid(self, **kwargs):
         engine = self.engine or config.engine
         if self._render or self._render_readonly:
             import warnings
@@ -99,11 +168,147 @@ class Grid(base.EditableRenderer):
             if self._render_readonly is not None:
                 engine._update_args(kwargs)
                 return self._render_readonly(collection=self, **kwargs)
-            return engine('grid_readonly', collection=self, **kwargs)
-        if self._render is not None:
-            engine._update_args(kwargs)
-            return self._render(collection=self, **kwargs)
-        return engine('grid', collection=self, **kwargs)
+            name = 'grid_readonly'
+        else:
+            if self._render is not None:
+                engine._update_args(kwargs)
+                return self._render(collection=self, **kwargs)
+            name = 'grid'
+        if self._report is not None:
+            return self._report._time_template(engine, name, collection=self, **kwargs)
+        return engine(name, collection=self, **kwargs)
+
+    def render_iter(self, chunk_size=100, **kwargs):
+        """
+        Render the grid like `render`, but return a generator yielding the
+        html of `chunk_size` rows at a time (the first chunk also contains
+        the table head). The rows are consumed as the generator is, so a
+        query or any other iterable can be bound to the grid without loading
+        all the instances in memory.
+
+        `chunk_size` is rounded up to an even number, so the rows keep
+        alternating their `even`/`odd` classes. Each chunk is rendered with
+        the grid templates: custom templates must only render the table head
+        when `collection._render_head` is true.
+        """
+        chunk_size += chunk_size % 2
+        rows = self.rows
+        iterator = iter(rows)
+        self._options_memo = {}
+        self._translators = {}
+        self._fragments = {}
+        try:
+            chunk = list(islice(iterator, chunk_size))
+            while True:
+                self.rows = chunk
+                yield self._render_grid(**dict(kwargs))
+                chunk = list(islice(iterator, chunk_size))
+                if not chunk:
+                    break
+                self._render_head = False
+        finally:
+            self.rows = rows
+            self.__dict__.pop('_render_head', None)
+            self._options_memo = None
+            self._translators = None
+            self._fragments = None
+
+    def records(self, text=False):
+        """
+        Return a list of `(pk, values)` tuples, one per bound row, `values`
+        being the list of the model values (`field.model_value`) of the
+        `render_fields`, or of their readonly html (`field.render_readonly()`)
+        as unicode if `text` is true. The rows are not rebound: the way to
+        read each field is computed once, which makes it a lot faster than
+        `_set_active` for json listings::
+
+            keys = grid.render_fields.keys()
+            rows = [dict(zip(keys, values), id=pk) for pk, values in grid.records()]
+
+        The list is built at once, so the grid is back to its own model when
+        it is returned.
+        """
+        extractors = [self._extractor(field, text) for field in self.render_fields.itervalues()]
+        model, bound_pk = self.model, self._bound_pk
+        self._options_memo = {}
+        self._translators = {}
+        self._fragments = {}
+        records = []
+        try:
+            for row in self.rows:
+                # the fields read the model of their parent, and their names
+                # its pk
+                pk = fields._pk(row)
+                self.model = row
+                self._bound_pk = pk
+                records.append((pk, [extract(row) for extract in extractors]))
+        finally:
+            self.model = model
+            self._bound_pk = bound_pk
+            self._options_memo = None
+            self._translators = None
+            self._fragments = None
+        return records
+
+    def _extractor(self, field, text):
+        """return a function returning the value of `field` for a row, once
+        the row is the model of the grid"""
+        if text:
+            render_readonly = field.render_readonly
+            return lambda row: fields._stringify(render_readonly())
+        if isinstance(field, fields.AttributeField) and not field.is_relation:
+            # a column: read it like AttributeField.raw_value
+            if hasattr(type(self.model), field.name):
+                name = field.name
+            else:
+                name = field.key
+            default = field._default
+            def extract(row):
+                value = getattr(row, name)
+                if value is None:
+                    return default
+                return value
+            return extract
+        return lambda row: field.model_value
+
+    def stream_page(self, render_page, chunk_size=100, encoding='utf-8'):
+        """
+        Return a generator of the `encoding` encoded html of a page
+        containing this grid, suitable as a WSGI response body.
+
+        `render_page` is a callable rendering the page, which calls the
+        `render()` method of the grid once. It is called immediately,
+        with the grid rendered as a placeholder, then the rows are streamed
+        in place of the placeholder with `render_iter`, which is given the
+        keyword arguments of the `render()` call. A `ValueError` is raised
+        if the page does not render the grid::
+
+            return grid.stream_page(lambda: render('/listing.mako', grid=grid))
+        """
+        placeholder = self._placeholder = u'<!-- grid %i -->' % id(self)
+        try:
+            page = render_page()
+        finally:
+            self.__dict__.pop('_placeholder')
+        return self._stream_page(page, placeholder, chunk_size, encoding)
+
+    def _stream_page(self, page, placeholder, chunk_size, encoding):
+        """stream the rows in place of `placeholder` in the rendered `page`"""
+        kwargs = self.__dict__.pop('_placeholder_kwargs', None)
+        if isinstance(page, str):
+            page = page.decode(encoding)
+        parts = page.split(placeholder, 1)
+        if len(parts) != 2 or kwargs is None:
+            raise ValueError('The page does not render the grid')
+        return self._stream_parts(parts, chunk_size, encoding, kwargs)
+
+    def _stream_parts(self, parts, chunk_size, encoding, kwargs):
+        yield parts[0].encode(encoding)
+        for chunk in self.render_iter(chunk_size, **kwargs):
+            if isinstance(chunk, unicode):
+                chunk = chunk.encode(encoding)
+            yield chunk
+        yield parts[1].encode(encoding)
 
     def _set_active(self, instance, session=None):
         base.EditableRenderer.rebind(self, instance, session or self.session, self.data)
@@ -113,6 +318,7 @@ class Grid(base.EditableRenderer):
             return self.errors.get(row, {})
         return {}
 
+    @instrumented('validate')
     def validate(self):
         """These are the same as in `FieldSet`"""
         if self.data is None:
@@ -142,6 +348,7 @@ class Grid(base.EditableRenderer):
         self._set_active(row)
         base.EditableRenderer.sync(self)
 
+    @instrumented('sync')
     def sync(self):
         """These are the same as in `FieldSet`"""
         for row in self.rows:
@@ -1,43 +1,128 @@
 # -*- coding: utf-8 -*-
 import os
 import sys
+import pkgutil
+import cPickle
+import tempfile
+from hashlib import md5
 
 from formalchemy.i18n import get_translator
 from formalchemy import helpers
 
 from tempita import Template as TempitaTemplate
-try:
-    from mako.lookup import TemplateLookup
-    from mako.template import Template as MakoTemplate
-    from mako.exceptions import TopLevelLookupException
-    HAS_MAKO = True
-except ImportError:
-    HAS_MAKO = False
-try:
-    from genshi.template import TemplateLoader as GenshiTemplateLoader
-    HAS_GENSHI = True
-except ImportError:
-    HAS_GENSHI = False
+
+def _is_installed(name):
+    """True if an importer (including zipped eggs and the PEP 302 hooks)
+    finds the top level module `name`. It is not imported: mako and genshi
+    are only imported by the engines using them, when they load their first
+    template"""
+    try:
+        return pkgutil.find_loader(name) is not None
+    except ImportError:
+        return False
+
+HAS_MAKO = _is_installed('mako')
+HAS_GENSHI = _is_installed('genshi')
 
 MAKO_TEMPLATES = os.path.join(
         os.path.dirname(__file__),
         'paster_templates','pylons_fa','+package+','templates', 'forms')
 
+# template filename -> source of the bundled mako templates, once processed
+# by tempita
+_mako_sources = {}
+
+def _write_file(filename, data):
+    """write `data` to `filename` atomically, so that concurrent processes
+    never read a partial file"""
+    dirname = os.path.dirname(filename)
+    if not os.path.isdir(dirname):
+        try:
+            os.makedirs(dirname)
+        except OSError:
+            # created by another process
+            pass
+    fd, tmp = tempfile.mkstemp(dir=dirname)
+    try:
+        os.write(fd, data)
+    finally:
+        os.close(fd)
+    os.chmod(tmp, 0644)
+    os.rename(tmp, filename)
+
+def _is_fresh(filename, source, production):
+    """True if `filename` (created from `source`) exists and is up to date"""
+    if not os.path.isfile(filename):
+        return False
+    return production or os.path.getmtime(filename) >= os.path.getmtime(source)
+
+class _Templates(dict):
+    """The templates of an engine by name, loaded on first use"""
+
+    def __init__(self, engine, options):
+        dict.__init__(self)
+        self.engine = engine
+        self.options = options
+
+    def __missing__(self, name):
+        template = self[name] = self.engine.get_template(name, **self.options)
+        return template
+
+    def get(self, name, default=None):
+        template = self[name]
+        if template is None:
+            return default
+        return template
+
 class TemplateEngine(object):
     """Base class for templates engines
+
+    Besides the options of the underlying template library, engines accept:
+
+    - `directories`: the directories containing your templates
+
+    - `extension`: the extension of the template files
+
+    - `cache_dir`: a directory where the compiled templates are stored, so
+      that new processes do not compile them again. Mako templates are
+      compiled to python modules, tempita templates are pickled. Genshi has
+      no persistent cache
+
+    - `production`: if True, mako does not check the template files for
+      modifications, so clear the `cache_dir` when you deploy new mako
+      templates. The tempita pickles are keyed by the source of their
+      template, so they are always up to date. Default to False
+
+    Templates are loaded when they are first rendered. Use `preload()` to
+    load the default ones earlier.
     """
     directories = []
     extension = None
+    cache_dir = None
+    production = False
     _templates = ['fieldset', 'fieldset_readonly',
                   'grid', 'grid_readonly']
     def __init__(self, **kw):
-        self.templates = {}
         if 'extension' in kw:
             self.extension = kw.pop('extension')
         if 'directories' in kw:
             self.directories = list(kw.pop('directories'))
+        if 'cache_dir' in kw:
+            self.cache_dir = kw.pop('cache_dir')
+        if 'production' in kw:
+            production = kw.pop('production')
+            if isinstance(production, basestring):
+                # from a config file
+                production = production.lower() in ('true', 'yes', 'on', '1')
+            self.production = production
+        self.templates = _Templates(self, kw)
+
+    def preload(self):
+        """load the default templates now, e.g. in a server before it forks
+        its workers"""
         for name in self._templates:
-            self.templates[name] = self.get_template(name, **kw)
+            self.templates[name]
+        return self
 
     def get_template(self, name, **kw):
         """return the template object for `name`. Must be override by engines"""
@@ -71,8 +156,32 @@ class TempitaEngine(TemplateEngine):
     extension = 'tmpl'
     def get_template(self, name, **kw):
         filename = self.get_filename(name)
-        if filename:
+        if not filename:
+            return None
+        if self.cache_dir is None or kw:
             return TempitaTemplate.from_filename(filename, **kw)
+        # the parsed template is pickled, keyed by its path and source: a
+        # modified template gets a new pickle, even in production
+        fd = open(filename, 'rb')
+        try:
+            source = fd.read()
+        finally:
+            fd.close()
+        key = md5(os.path.abspath(filename) + '\0' + source).hexdigest()[:12]
+        cached = os.path.join(self.cache_dir, 'tempita', '%s-%s.pickle' % (name, key))
+        if os.path.isfile(cached):
+            fd = open(cached, 'rb')
+            try:
+                try:
+                    return cPickle.load(fd)
+                except Exception:
+                    # written by another version of tempita
+                    pass
+            finally:
+                fd.close()
+        template = TempitaTemplate.from_filename(filename)
+        _write_file(cached, cPickle.dumps(template, 2))
+        return template
 
     def render(self, template_name, **kwargs):
         template = self.templates.get(template_name, None)
@@ -84,6 +193,12 @@ class MakoEngine(TemplateEngine):
     extension = 'mako'
     _lookup = None
     def get_template(self, name, **kw):
+        from mako.lookup import TemplateLookup
+        from mako.exceptions import TopLevelLookupException
+        if self.cache_dir is not None:
+            kw.setdefault('module_directory', self.cache_dir)
+        if self.production:
+            kw.setdefault('filesystem_checks', False)
         if self._lookup is None:
             self._lookup = TemplateLookup(directories=self.directories, **kw)
         try:
@@ -91,8 +206,34 @@ class MakoEngine(TemplateEngine):
         except TopLevelLookupException:
             filename = os.path.join(MAKO_TEMPLATES, '%s.mako_tmpl' % name)
             if os.path.isfile(filename):
+                return self._get_bundled_template(filename, **kw)
+
+    def _get_bundled_template(self, filename, **kw):
+        # the bundled templates are shared with the paster template, so they
+        # are processed by tempita first
+        from mako.template import Template as MakoTemplate
+        kw.pop('filesystem_checks', None)
+        kw.pop('collection_size', None)
+        source = _mako_sources.get(filename)
+        module_directory = kw.get('module_directory')
+        if module_directory is None:
+            if source is None:
                 template = TempitaTemplate.from_filename(filename)
-                return MakoTemplate(template.substitute(template_engine='mako'), **kw)
+                source = _mako_sources[filename] = template.substitute(template_engine='mako')
+            return MakoTemplate(source, **kw)
+        # store the processed source, so that mako can compile it to a module
+        mako_filename = os.path.join(module_directory, 'formalchemy',
+                                     os.path.basename(filename)[:-len('_tmpl')])
+        if not _is_fresh(mako_filename, filename, self.production):
+            if source is None:
+                template = TempitaTemplate.from_filename(filename)
+                source = _mako_sources[filename] = template.substitute(template_engine='mako')
+            if isinstance(source, unicode):
+                # the templates declare this encoding
+                source = source.encode('utf-8')
+            _write_file(mako_filename, source)
+        uri = 'formalchemy/%s' % os.path.basename(mako_filename)
+        return MakoTemplate(filename=mako_filename, uri=uri, **kw)
 
     def render(self, template_name, **kwargs):
         template = self.templates.get(template_name, None)
@@ -103,8 +244,11 @@ class GenshiEngine(TemplateEngine):
     """
     extension = 'html'
     def get_template(self, name, **kw):
+        from genshi.template import TemplateLoader as GenshiTemplateLoader
         filename = self.get_filename(name)
         if filename:
+            if self.production:
+                kw.setdefault('auto_reload', False)
             loader = GenshiTemplateLoader(os.path.dirname(filename), **kw)
             return loader.load(os.path.basename(filename))
 
@@ -112,10 +256,125 @@ class GenshiEngine(TemplateEngine):
         template = self.templates.get(template_name, None)
         return template.generate(**kwargs).render('html', doctype=None)
 
+def _text(value):
+    """convert a value like tempita does"""
+    if value is None:
+        return ''
+    if isinstance(value, unicode):
+        return value.encode('utf8')
+    if isinstance(value, str):
+        return value
+    if hasattr(value, '__unicode__'):
+        return unicode(value).encode('utf8')
+    return str(value)
+
+def _label(fieldset, field):
+    if field.label_text is None:
+        return fieldset.prettify(field.key)
+    return field.label_text
+
+def _render_fieldset(fieldset, F_, html, **kw):
+    out = []
+    write = out.append
+    for error in fieldset.errors.get(None, []):
+        write('<div class="fieldset_error">\n  %s\n</div>\n' % _text(F_(error)))
+    focus = fieldset.focus
+    focus_rendered = False
+    for field in fieldset.render_fields.itervalues():
+        if not field.requires_label:
+            write('%s\n' % _text(field.render()))
+            continue
+        name = _text(field.renderer.name)
+        write('<div>\n  <label class="%s" for="%s">%s</label>\n  %s\n' % (
+              field.is_required() and 'field_req' or 'field_opt', name,
+              _text(html.escape_once(_label(fieldset, field))),
+              _text(field.render())))
+        if 'instructions' in field.metadata:
+            write('    <span class="instructions">%s</span>\n' % _text(field.metadata['instructions']))
+        for error in field.errors:
+            write('  <span class="field_error">%s</span>\n' % _text(F_(error)))
+        write('</div>\n')
+        if (focus == field or focus is True) and not focus_rendered:
+            if not field.is_readonly():
+                write('<script type="text/javascript">\n//<![CDATA[\n'
+                      'document.getElementById("%s").focus();\n//]]>\n</script>\n' % name)
+                focus_rendered = True
+    return ''.join(out)
+
+def _render_fieldset_readonly(fieldset, F_, html, **kw):
+    out = ['<tbody>\n']
+    write = out.append
+    for field in fieldset.render_fields.itervalues():
+        write('  <tr>\n    <td class="field_readonly">%s:</td>\n    <td>%s</td>\n  </tr>\n' % (
+              _text(html.escape_once(_label(fieldset, field))),
+              _text(field.render_readonly())))
+    write('</tbody>\n')
+    return ''.join(out)
+
+def _render_grid_head(collection, F_, html):
+    if not collection._render_head:
+        return ''
+    return '<thead>\n  <tr>\n%s  </tr>\n</thead>\n' % ''.join([
+        '      <th>%s</th>\n' % _text(html.escape_once(F_(field.label_text or collection.prettify(field.key))))
+        for field in collection.render_fields.itervalues()])
+
+def _render_grid(collection, F_, html, **kw):
+    out = [_render_grid_head(collection, F_, html), '\n<tbody>\n']
+    write = out.append
+    for i, row in enumerate(collection.rows):
+        collection._set_active(row)
+        row_errors = collection.get_errors(row)
+        write('  \n  <tr class="%s">\n' % (i % 2 and 'odd' or 'even'))
+        for field in collection.render_fields.itervalues():
+            write('    <td>\n      %s\n' % _text(field.render()))
+            for error in row_errors.get(field, []):
+                write('      <span class="grid_error">%s</span>\n' % _text(error))
+            write('    </td>\n')
+        write('  </tr>\n')
+    write('</tbody>\n')
+    return ''.join(out)
+
+def _render_grid_readonly(collection, F_, html, **kw):
+    out = [_render_grid_head(collection, F_, html), '\n<tbody>\n']
+    write = out.append
+    for i, row in enumerate(collection.rows):
+        collection._set_active(row)
+        write('  \n  <tr class="%s">\n' % (i % 2 and 'odd' or 'even'))
+        for field in collection.render_fields.itervalues():
+            write('    <td>%s</td>\n' % _text(field.render_readonly()))
+        write('  </tr>\n')
+    write('</tbody>\n')
+    return ''.join(out)
+
+class NativeEngine(TemplateEngine):
+    """Template engine rendering the default templates with python functions
+    instead of interpreting them. The html is the same as the one of the
+    :class:`TempitaEngine` (utf-8 encoded strings), but it is faster.
+
+    Templates found in `directories` (with the `.tmpl` extension) are
+    rendered with tempita.
+    """
+    extension = 'tmpl'
+    _functions = dict(fieldset=_render_fieldset,
+                      fieldset_readonly=_render_fieldset_readonly,
+                      grid=_render_grid,
+                      grid_readonly=_render_grid_readonly)
+    def get_template(self, name, **kw):
+        for dirname in self.directories:
+            filename = os.path.join(dirname, '%s.%s' % (name, self.extension))
+            if os.path.isfile(filename):
+                return TempitaTemplate.from_filename(filename, **kw).substitute
+        return self._functions.get(name)
+
+    def render(self, template_name, **kwargs):
+        template = self.templates.get(template_name, None)
+        return template(**kwargs)
+
 
 if HAS_MAKO:
     default_engine = MakoEngine(input_encoding='utf-8', output_encoding='utf-8')
-    engines = dict(mako=default_engine, tempita=TempitaEngine())
+    engines = dict(mako=default_engine, tempita=TempitaEngine(),
+                   native=NativeEngine())
 else:
     default_engine = TempitaEngine()
-    engines = dict(tempita=TempitaEngine())
+    engines = dict(tempita=TempitaEngine(), native=NativeEngine())
@@ -287,6 +287,17 @@ class Aliases(Base):
     id = Column(Integer, primary_key=True)
     text = Column('row_text', Text)
 
+primary_keys_holders = Table('primary_keys_holders', Base.metadata,
+                             Column('holder_id', Integer, ForeignKey('holders.id')),
+                             Column('key_id', Integer),
+                             Column('key_id2', String(10)),
+                             ForeignKeyConstraint(['key_id', 'key_id2'], ['primary_keys.id', 'primary_keys.id2']))
+
+class Holder(Base):
+    __tablename__ = 'holders'
+    id = Column(Integer, primary_key=True)
+    keys = relation(PrimaryKeys, secondary=primary_keys_holders)
+
 Base.metadata.create_all()
 
 session = Session()
@@ -343,6 +354,21 @@ def pretty_html(html):
     soup = BeautifulSoup(str(html))
     return soup.prettify().strip()
 
+class QueryCounter(object):
+    """count the SELECT statements executed between start() and stop()"""
+    def start(self):
+        self.count = 0
+        dialect = engine.dialect
+        do_execute = dialect.do_execute
+        def counting_execute(cursor, statement, *args, **kwargs):
+            if statement.lstrip().startswith('SELECT'):
+                self.count += 1
+            return do_execute(cursor, statement, *args, **kwargs)
+        dialect.do_execute = counting_execute
+    def stop(self):
+        del engine.dialect.do_execute
+        return self.count
+
 class FieldSet(DefaultFieldSet):
     def render(self, lang=None):
         if self.readonly:
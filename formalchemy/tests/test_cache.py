@@ -0,0 +1,278 @@
+# -*- coding: utf-8 -*-
+from formalchemy.tests import *
+from formalchemy import config
+from formalchemy.cache import OptionCache, FragmentCache, MemoryBackend, DbmBackend
+
+def option_cache():
+    """
+    Relation options are stored in the cache when it is enabled:
+
+    >>> cache = OptionCache()
+    >>> cache.listen(session)
+    >>> config.option_cache = cache
+    >>> fs = FieldSet(Order, session=session)
+    >>> fs.user.render() == FieldSet(Order, session=session).user.render()
+    True
+    >>> cache._entries.keys()
+    [(<class 'formalchemy.tests.User'>, (('users.id', '[]'),), None, None)]
+    >>> print cache._entries.values()[0][0]
+    [(u'Bill', 1), (u'John', 2)]
+
+    The labels are told apart by their bind values:
+
+    >>> fs = FieldSet(Order, session=session)
+    >>> 'Bill (a)' in fs.user.with_option_label(User.name + u' (a)').render()
+    True
+    >>> 'Bill (b)' in fs.user.with_option_label(User.name + u' (b)').render()
+    True
+    >>> cache.clear()
+
+    The entries of a class are dropped when a session flushes it:
+
+    >>> user = session.query(User).get(1)
+    >>> user.name = u'William'
+    >>> session.flush()
+    >>> len(cache)
+    0
+    >>> 'William' in FieldSet(Order, session=session).user.render()
+    True
+
+    And again at the end of the transaction, since they may contain changes
+    which were not committed:
+
+    >>> len(cache)
+    1
+    >>> session.rollback()
+    >>> len(cache)
+    0
+    >>> 'Bill' in FieldSet(Order, session=session).user.render()
+    True
+
+    Subclasses and parent classes are invalidated too:
+
+    >>> class Admin(User): pass
+    >>> cache.invalidate(Admin)
+    >>> len(cache)
+    0
+
+    >>> session.extensions.remove(cache.extension)
+    >>> config.option_cache = None
+    """
+
+def bounds():
+    """
+    Entries expire after `ttl` seconds:
+
+    >>> cache = OptionCache(ttl=0)
+    >>> cache.get((User,), lambda: 'value')
+    'value'
+    >>> cache.get((User,), lambda: 'new value')
+    'new value'
+
+    The oldest entry is dropped when the cache is full:
+
+    >>> cache = OptionCache(size=2)
+    >>> for cls in (User, Order, One):
+    ...     _ = cache.get((cls,), lambda: cls.__name__)
+    >>> sorted([key[0].__name__ for key in cache._entries])
+    ['One', 'Order']
+
+    When an entry expires, the thread refreshing it holds its lock and the
+    other threads get the expired value instead of querying it too:
+
+    >>> cache = OptionCache(ttl=0)
+    >>> cache.get((User,), lambda: 'value')
+    'value'
+    >>> lock = cache._get_lock((User,))
+    >>> lock.acquire()
+    True
+    >>> cache.get((User,), lambda: 'new value')
+    'value'
+    >>> lock.release()
+    >>> cache.get((User,), lambda: 'new value')
+    'new value'
+
+    Values created while the class is invalidated are not stored:
+
+    >>> cache = OptionCache()
+    >>> def creator():
+    ...     cache.invalidate(User)
+    ...     return 'outdated'
+    >>> cache.get((User,), creator)
+    'outdated'
+    >>> len(cache)
+    0
+    """
+
+def fragment_cache():
+    """
+    The html of readonly fields is stored in the cache when it is enabled:
+
+    >>> cache = FragmentCache()
+    >>> cache.listen(session)
+    >>> config.fragment_cache = cache
+    >>> grid = Grid(User).bind(session.query(User).order_by(User.id).all())
+    >>> grid.configure(include=[grid.name, grid.orders], readonly=True)
+    >>> html = grid.render()
+    >>> sorted(cache.backend._entries) #doctest: +NORMALIZE_WHITESPACE
+    ['formalchemy.tests.User:1', 'formalchemy.tests.User:2',
+     'stamp:formalchemy.tests.Order:1', 'stamp:formalchemy.tests.Order:2',
+     'stamp:formalchemy.tests.Order:3']
+
+    The users store the stamps of the orders they render, which are written
+    when they are first read:
+
+    >>> stamps = cache.backend.get('formalchemy.tests.User:1')[2]
+    >>> stamps.keys()
+    ['formalchemy.tests.Order:1']
+    >>> stamps['formalchemy.tests.Order:1'] == cache.backend.get('stamp:formalchemy.tests.Order:1')
+    True
+
+    Modified instances are rendered without the cache, so their fragments do
+    not survive a rollback:
+
+    >>> bill = session.query(User).get(1)
+    >>> bill.name = u'William'
+    >>> 'William' in grid.render()
+    True
+    >>> session.rollback()
+    >>> 'William' in grid.render()
+    False
+    >>> bill.name = u'William'
+    >>> session.flush()
+    >>> 'William' in grid.render()
+    True
+
+    Flushing an instance drops the fragments rendering it as a relation, and
+    the end of the transaction drops them again:
+
+    >>> order = session.query(Order).get(1)
+    >>> order.quantity = 42
+    >>> session.flush()
+    >>> 'Quantity: 42' in grid.render()
+    True
+    >>> session.rollback()
+    >>> html = grid.render()
+    >>> 'William' in html, 'Quantity: 42' in html
+    (False, False)
+
+    Transient and pending instances are not cached, even with a primary key:
+
+    >>> entries = len(cache.backend)
+    >>> fs = FieldSet(User)
+    >>> fs.configure(readonly=True)
+    >>> html = fs.render()
+    >>> pending = User(id=42, email=u'pending@example.com', password=u'1', name=u'Pending')
+    >>> session.add(pending)
+    >>> html = fs.bind(pending).render()
+    >>> len(cache.backend) == entries
+    True
+    >>> session.rollback()
+
+    >>> session.extensions.remove(cache.extension)
+    >>> config.fragment_cache = None
+    """
+
+def fragment_eviction():
+    """
+    The backend can evict any key, the flushes are still seen:
+
+    >>> backend = MemoryBackend(size=6)
+    >>> cache = FragmentCache(backend)
+    >>> cache.listen(session)
+    >>> config.fragment_cache = cache
+    >>> grid = Grid(User).bind(session.query(User).order_by(User.id).all())
+    >>> grid.configure(include=[grid.name, grid.orders], readonly=True)
+    >>> html = grid.render()
+    >>> order = session.query(Order).get(1)
+    >>> order.quantity = 42
+    >>> session.flush()
+    >>> 'Quantity: 42' in grid.render()
+    True
+
+    The stamp of the order is evicted by other keys, then the order is
+    flushed again:
+
+    >>> for i in range(3):
+    ...     backend.set('other %i' % i, None)
+    ...     users = backend.get('formalchemy.tests.User:1'), backend.get('formalchemy.tests.User:2')
+    >>> backend.get('stamp:formalchemy.tests.Order:1')
+    >>> None in users
+    False
+    >>> order.quantity = 43
+    >>> session.flush()
+    >>> html = grid.render()
+    >>> 'Quantity: 43' in html, 'Quantity: 42' in html
+    (True, False)
+
+    The fragments rendered during the transaction are dropped by the rollback:
+
+    >>> session.rollback()
+    >>> html = grid.render()
+    >>> 'Quantity: 43' in html, 'Quantity: 10' in html
+    (False, True)
+
+    A relation with more than `max_related` instances is not cached:
+
+    >>> cache.max_related = 1
+    >>> backend.clear()
+    >>> html = grid.render()
+    >>> sorted(backend.get('formalchemy.tests.User:2')[1])
+    [('name', <class 'formalchemy.fields.TextFieldRenderer'>, 'en', '')]
+
+    The stamps are written when they are first read, so that a fragment
+    never records a missing stamp, which an evicted one would match:
+
+    >>> cache.max_related = 100
+    >>> cache.backend = backend = MemoryBackend()
+    >>> html = grid.render()
+    >>> order = session.query(Order).get(2)
+    >>> order.quantity = 44
+    >>> session.flush()
+    >>> backend.delete('stamp:formalchemy.tests.Order:2')
+    >>> 'Quantity: 44' in grid.render()
+    True
+    >>> session.rollback()
+
+    >>> session.extensions.remove(cache.extension)
+    >>> config.fragment_cache = None
+    """
+
+def fragment_backends():
+    """
+    The memory backend drops the least recently used keys when it is full:
+
+    >>> backend = MemoryBackend(size=10)
+    >>> for i in range(10):
+    ...     backend.set(i, str(i))
+    >>> backend.get(0)
+    '0'
+    >>> backend.set(10, '10')
+    >>> len(backend), backend.get(0), backend.get(1)
+    (10, '0', None)
+
+    The dbm backend stores the pickled values in a file:
+
+    >>> import os, shutil, tempfile
+    >>> dirname = tempfile.mkdtemp()
+    >>> backend = DbmBackend(os.path.join(dirname, 'fragments'))
+    >>> cache = FragmentCache(backend)
+    >>> config.fragment_cache = cache
+    >>> fs = FieldSet(session.query(User).get(1))
+    >>> fs.configure(readonly=True)
+    >>> html = fs.render()
+    >>> len(backend)
+    2
+    >>> sorted(backend.get('formalchemy.tests.User:1')[1])[0]
+    ('email', <class 'formalchemy.fields.TextFieldRenderer'>, 'en', '')
+    >>> fs.render() == html
+    True
+    >>> cache.invalidate(session.query(Order).get(1))
+    >>> sorted(backend._db.keys())
+    ['formalchemy.tests.User:1', 'stamp:formalchemy.tests.Order:1']
+    >>> cache._entry('formalchemy.tests.User:1', None)
+    (None, {}, {})
+    >>> backend.close()
+    >>> shutil.rmtree(dirname)
+    >>> config.fragment_cache = None
+    """
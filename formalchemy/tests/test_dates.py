@@ -2473,6 +2473,49 @@ False
 <option value="0">0</option>
 ...
 
+The rows of a grid look up the translation catalog once per render:
+>>> from formalchemy import Grid as BaseGrid, fields, i18n
+>>> lookups = []
+>>> def get_translator(lang=None):
+...     lookups.append(lang)
+...     return i18n.get_translator(lang)
+>>> fields.get_translator = get_translator
+>>> grid = BaseGrid(Dt).bind([Dt(id=i, foo=datetime.date(2010, 1, i)) for i in range(1, 11)])
+>>> html = grid.render()
+>>> lookups
+['en']
+>>> fields.get_translator = i18n.get_translator
+>>> for row in grid.rows:
+...     session.expunge(row)
+
+The month and day options are translated once per catalog:
+>>> from formalchemy.fields import _get_date_options
+>>> month_options, day_options = _get_date_options(i18n.get_translator('fr').gettext)
+>>> month_options[:2]
+[('Mois', 'MM'), (u'Janvier', '1')]
+>>> _get_date_options(i18n.get_translator('fr').gettext)[0] is month_options
+True
+
+Other translators may depend on the request, they are not cached:
+>>> lang = ['fr']
+>>> def F_(value):
+...     return i18n.get_translator(lang[0]).gettext(value)
+>>> _get_date_options(F_)[0][1]
+(u'Janvier', '1')
+>>> lang[0] = 'en'
+>>> _get_date_options(F_)[0][1]
+(u'January', '1')
+
+Only the most recently used catalogs are kept:
+>>> from gettext import NullTranslations
+>>> catalogs = [NullTranslations() for i in range(fields._max_date_options + 1)]
+>>> for catalog in catalogs:
+...     options = _get_date_options(catalog.gettext)
+>>> len(fields._date_options) == fields._max_date_options
+True
+>>> catalogs[0] in fields._date_options, catalogs[-1] in fields._date_options
+(False, True)
+
 """
 
 if __name__ == '__main__':
@@ -1,6 +1,6 @@
 # -*- coding: utf-8 -*-
 from formalchemy.tests import *
-from formalchemy.fields import PasswordFieldRenderer
+from formalchemy.fields import PasswordFieldRenderer, TextAreaFieldRenderer
 
 def copy():
     """
@@ -13,6 +13,256 @@ def copy():
     ['name', 'email']
     """
 
+def introspection_cache():
+    """
+    Mapper introspection is cached but each FieldSet still has its own fields:
+
+    >>> fs1 = FieldSet(User)
+    >>> fs2 = FieldSet(User)
+    >>> fs1.email is fs2.email
+    False
+    >>> fs1.email.parent is fs1, fs2.email.parent is fs2
+    (True, True)
+    >>> fs1.configure(options=[fs1.email.set(instructions='Your email')])
+    >>> fs1.email.metadata
+    {'instructions': 'Your email'}
+    >>> FieldSet(User).email.metadata
+    {}
+
+    The cache is refreshed when the mapper changes:
+
+    >>> from sqlalchemy import Table, MetaData
+    >>> from sqlalchemy.orm import mapper, column_property
+    >>> table = Table('cached', MetaData(),
+    ...               Column('id', Integer, primary_key=True),
+    ...               Column('name', Unicode(20)))
+    >>> class Cached(object): pass
+    >>> _ = mapper(Cached, table)
+    >>> FieldSet(Cached)._fields.keys()
+    ['id', 'name']
+    >>> class_mapper(Cached).add_property('label', column_property(table.c.name.label('label')))
+    >>> FieldSet(Cached)._fields.keys()
+    ['id', 'name', 'label']
+    """
+
+def primary_keys():
+    """
+    The accessor extracting the primary key is computed once per mapped class:
+
+    >>> from formalchemy.fields import _pk
+    >>> _pk(primary1)
+    (1, u'22')
+    >>> _pk(PrimaryKeys(id=2, id2='44'))
+    (2, '44')
+
+    Primary key columns named differently from their attribute are supported:
+
+    >>> from sqlalchemy import Table, MetaData
+    >>> from sqlalchemy.orm import mapper
+    >>> table = Table('ugly', MetaData(),
+    ...               Column('UGLY_NAMED_ID', Integer, primary_key=True),
+    ...               Column('name', Unicode(20), default=u'nobody'))
+    >>> class Ugly(object): pass
+    >>> _ = mapper(Ugly, table, properties=dict(id=table.c.UGLY_NAMED_ID))
+    >>> obj = Ugly()
+    >>> obj.id = 3
+    >>> _pk(obj)
+    3
+
+    Unmapped objects may provide a `_pk` attribute:
+
+    >>> class Unmapped(object):
+    ...     _pk = 4
+    >>> _pk(Unmapped()), _pk(object())
+    (4, None)
+
+    Column defaults and readonly labels are looked up once, when the field is
+    created:
+
+    >>> fs = FieldSet(Ugly).bind(obj)
+    >>> fs.name.raw_value
+    u'nobody'
+    >>> fs_prop = FieldSet(Property)
+    >>> fs_prop.foo.is_readonly(), fs_prop.id.is_readonly()
+    (True, False)
+    """
+
+def bind():
+    """
+    Bound fields share the configuration of the FieldSet they are bound from:
+
+    >>> from formalchemy import validators
+    >>> fs = FieldSet(User)
+    >>> fs.configure(include=[fs.name.required().validate(validators.email), fs.email])
+    >>> user = session.query(User).first()
+    >>> fs1 = fs.bind(user)
+    >>> fs1.name.parent is fs1
+    True
+    >>> fs1.name.validators is fs.name.validators
+    True
+
+    But modifying them does not affect other FieldSets:
+
+    >>> fs1.name.set(instructions='Your name', required=False)
+    AttributeField(name)
+    >>> fs1.name.metadata, fs.name.metadata
+    ({'instructions': 'Your name'}, {})
+    >>> fs.name.is_required(), fs1.name.is_required()
+    (True, False)
+    >>> fs.bind(user).name.metadata
+    {}
+
+    Neither do errors:
+
+    >>> fs2 = fs.bind(user, data={'User-1-name': 'bill', 'User-1-email': 'bill@example.com'})
+    >>> fs2.validate()
+    False
+    >>> fs2.errors
+    {AttributeField(name): ['Missing @ sign']}
+    >>> fs.name.errors, fs.bind(user).name.errors
+    ([], [])
+
+    Unconfigured fields are bound when needed:
+
+    >>> '_fields' in fs1.__dict__
+    False
+    >>> fs1.password.parent is fs1
+    True
+    >>> '_fields' in fs1.__dict__
+    True
+
+    They are the fields of the form when it was bound:
+
+    >>> fs = FieldSet(User)
+    >>> fs3 = fs.bind(user)
+    >>> fs.append(Field('extra'))
+    >>> fs3._fields.keys(), fs3.render_fields.keys()
+    (['id', 'email', 'password', 'name', 'orders'], ['email', 'password', 'name', 'orders'])
+    >>> fs.bind(user)._fields.keys()
+    ['id', 'email', 'password', 'name', 'orders', 'extra']
+
+    A renderer without fields raises an AttributeError:
+
+    >>> getattr(object.__new__(FieldSet), '_fields', None) is None
+    True
+    """
+
+def containers():
+    """
+    Empty containers are not allocated until accessed:
+
+    >>> fs = FieldSet(User)
+    >>> fs.email._metadata is None
+    True
+    >>> fs.email.metadata
+    {}
+    >>> fs.email.metadata['instructions'] = 'Your email'
+    >>> fs.email._metadata
+    {'instructions': 'Your email'}
+
+    Copies do not share them:
+
+    >>> field = fs.email.label('Email')
+    >>> field.metadata['instructions'] = 'Your email address'
+    >>> fs.email.metadata
+    {'instructions': 'Your email'}
+    >>> field.render_opts is fs.email.render_opts
+    False
+    """
+
+def field_registry():
+    """
+    >>> fs = FieldSet(User)
+    >>> fs._fields.has_field(fs.email.label('Email'))
+    True
+    >>> fs._fields.get_field(fs.email.label('Email')) is fs.email
+    True
+    >>> fs._fields.has_field(Field('foo'))
+    False
+    >>> fs.append(Field('foo'))
+    >>> foo = fs.foo.label('Foo')
+    >>> fs.render_fields.has_field(foo)
+    True
+    >>> del fs.render_fields['foo']
+    >>> fs.render_fields.get_field(foo) is None
+    True
+    """
+
+def renderer():
+    """
+    Renderers are instantiated once per field:
+
+    >>> fs = FieldSet(User)
+    >>> fs.name.renderer is fs.name.renderer
+    True
+    >>> fs.name.renderer.field is fs.name
+    True
+    >>> fs.name.textarea().renderer
+    <TextAreaFieldRenderer for AttributeField(name)>
+    >>> fs.name.set(renderer=PasswordFieldRenderer).renderer
+    <PasswordFieldRenderer for AttributeField(name)>
+    >>> fs.bind(User).name.renderer
+    <PasswordFieldRenderer for AttributeField(name)>
+
+    Resolved renderers are cached by default_renderers, which forgets them
+    when modified:
+
+    >>> from formalchemy import fatypes, fields
+    >>> renderers = fields.RendererMap(FieldSet.default_renderers)
+    >>> fields._resolve_renderer(renderers, fatypes.Unicode())
+    <class 'formalchemy.fields.TextFieldRenderer'>
+    >>> renderers._resolved.keys()
+    [<class 'sqlalchemy.types.Unicode'>]
+    >>> renderers[fatypes.String] = TextAreaFieldRenderer
+    >>> renderers._resolved
+    {}
+
+    The closest type wins:
+
+    >>> del renderers[fatypes.Unicode]
+    >>> fields._resolve_renderer(renderers, fatypes.Unicode())
+    <class 'formalchemy.fields.TextAreaFieldRenderer'>
+    >>> fields._resolve_renderer(renderers, None) is None
+    True
+
+    Setting default_renderers on a FieldSet resets the renderers of its fields:
+
+    >>> fs = FieldSet(User)
+    >>> fs.email.renderer
+    <TextFieldRenderer for AttributeField(email)>
+    >>> fs.default_renderers = renderers
+    >>> fs.email.renderer
+    <TextAreaFieldRenderer for AttributeField(email)>
+    """
+
+def names():
+    """
+    Input names are computed once per binding:
+
+    >>> fs = FieldSet(User)
+    >>> fs.name.renderer.name
+    u'User--name'
+    >>> fs.name.renderer.name is fs.name.renderer.name
+    True
+    >>> fs.rebind(session.query(User).first())
+    >>> fs.name.renderer.name
+    u'User-1-name'
+    >>> fs.prefix = 'user'
+    >>> fs.name.renderer.name
+    u'user-User-1-name'
+    >>> fs.bind(User).name.renderer.name
+    u'user-User--name'
+
+    Also in grids:
+
+    >>> grid = Grid(User, session.query(User).order_by(User.id).all())
+    >>> for row in grid.rows:
+    ...     grid._set_active(row)
+    ...     print grid.name.renderer.name
+    User-1-name
+    User-2-name
+    """
+
 def append():
     """
     >>> fs = FieldSet(User)
@@ -71,6 +321,38 @@ def insert():
     ['email', 'login', 'password', 'name', 'orders']
     >>> fs.login
     AttributeField(login)
+
+    Several fields can be inserted at once. Existing fields are moved:
+
+    >>> fs.insert(fs.email, Field('first_name'), fs.name, Field('last_name'))
+    >>> fs._render_fields.keys()
+    ['first_name', 'name', 'last_name', 'email', 'login', 'password', 'orders']
+    >>> fs.insert_after(fs.orders, fs.email, fs.login)
+    >>> fs._render_fields.keys()
+    ['first_name', 'name', 'last_name', 'password', 'orders', 'email', 'login']
+    >>> fs.insert(fs.email, fs.email)
+    Traceback (most recent call last):
+    ...
+    ValueError: can not move email relative to itself
+    """
+
+def reorder():
+    """
+    >>> fs = FieldSet(User)
+    >>> fs.reorder('name', fs.email)
+    >>> fs._fields.keys()
+    ['name', 'email', 'id', 'password', 'orders']
+    >>> fs.configure(include=[fs.email, fs.name, fs.password])
+    >>> fs.reorder(fs.password)
+    >>> fs._render_fields.keys()
+    ['password', 'email', 'name']
+    >>> fs.reorder(fs.name, fs.name)
+    >>> fs._render_fields.keys()
+    ['name', 'password', 'email']
+    >>> fs.reorder('foo')
+    Traceback (most recent call last):
+    ...
+    ValueError: foo not in fields
     """
 
 def insert_after():
@@ -101,10 +383,53 @@ def insert_after():
     >>> fs.insert_after(fs.password, ['some', 'random', 'objects'])  #doctest: +ELLIPSIS
     Traceback (most recent call last):
     ...
-    ValueError: Can only add Field objects; got AttributeField(password) instead
+    ValueError: Can only add Field objects; got ['some', 'random', 'objects'] instead
+
+    Moving a field which already follows the anchor keeps it once:
+
+    >>> fs = FieldSet(User)
+    >>> fs.configure(include=[fs.name, fs.email, fs.password])
+    >>> fs.insert_after(fs.name, fs.email)
+    >>> fs._render_fields.keys()
+    ['name', 'email', 'password']
+    >>> fs.insert_after(fs.name, Field('a'), fs.email)
+    >>> fs._render_fields.keys()
+    ['name', 'a', 'email', 'password']
+    >>> fs.insert(fs.password, fs.a, fs.email, fs.email)
+    >>> fs._render_fields.keys()
+    ['name', 'a', 'email', 'password']
+    >>> fs.insert(fs.email, fs.name, fs.a)
+    >>> fs._render_fields.keys()
+    ['name', 'a', 'email', 'password']
+
+    Nothing is moved when a field is moved relative to itself:
+
+    >>> fs.insert_after(fs.password, fs.name, fs.password)
+    Traceback (most recent call last):
+    ...
+    ValueError: can not move password relative to itself
+    >>> fs._render_fields.keys()
+    ['name', 'a', 'email', 'password']
     """
 
 
+def field_registry():
+    """
+    Registries can be copied and pickled:
+
+    >>> import copy, pickle
+    >>> from formalchemy.base import FieldRegistry
+    >>> registry = FieldRegistry([('a', 1), ('b', 2)])
+    >>> copy.deepcopy(registry).keys(), copy.copy(registry).keys()
+    (['a', 'b'], ['a', 'b'])
+    >>> loaded = pickle.loads(pickle.dumps(registry, 2))
+    >>> loaded.items()
+    [('a', 1), ('b', 2)]
+    >>> loaded.insert('a', [('c', 3)])
+    >>> loaded.keys(), loaded.get_field(3)
+    (['c', 'a', 'b'], 3)
+    """
+
 def delete():
     """
     >>> fs = FieldSet(User)
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+from formalchemy.tests import *
+from formalchemy import config, fields
+from formalchemy.instrumentation import Instrumentation
+
+def instrumentation():
+    """
+    The observers get a report after each operation:
+
+    >>> instrumentation = Instrumentation()
+    >>> reports = []
+    >>> instrumentation.subscribe(reports.append)
+    >>> config.instrumentation = instrumentation
+
+    >>> fs = FieldSet(Order, session=session).bind(session.query(Order).get(1))
+    >>> html = fs.render()
+    >>> report = reports.pop()
+    >>> report.operation, report.renderer is fs, report.elapsed > 0
+    ('render', True, True)
+    >>> report.templates.keys()
+    ['fieldset']
+    >>> for (key, renderer), (calls, seconds) in sorted(report.fields.items()):
+    ...     print key, renderer.__name__, calls
+    quantity IntegerFieldRenderer 1
+    user SelectFieldRenderer 1
+
+    The validators are timed by field:
+
+    >>> fs = FieldSet(Order, session=session, data={'Order--quantity': '2', 'Order--user_id': '1'})
+    >>> fs.validate()
+    True
+    >>> for (key, validator), (calls, seconds) in sorted(reports.pop().validators.items()):
+    ...     print key, validator.__name__, calls
+    quantity required 1
+    user required 1
+
+    An operation of a grid is one report, the rows of the grid are summed.
+    Failed operations are reported too:
+
+    >>> grid = Grid(Order, session.query(Order).all())
+    >>> html = grid.render()
+    >>> report = reports.pop()
+    >>> report.templates.keys(), report.fields[('quantity', fields.IntegerFieldRenderer)][0]
+    (['grid'], 3)
+    >>> grid.readonly = True
+    >>> grid.rebind(data={})
+    >>> grid.sync()
+    Traceback (most recent call last):
+    ...
+    Exception: Cannot sync a read-only Grid
+    >>> reports.pop().operation
+    'sync'
+    >>> reports
+    []
+
+    The SQL statements are timed when the instrumentation listens to the
+    engine:
+
+    >>> from sqlalchemy.orm import sessionmaker
+    >>> instrumented = create_engine('sqlite://', proxy=instrumentation.proxy)
+    >>> Base.metadata.create_all(bind=instrumented)
+    >>> fs = FieldSet(Order, session=sessionmaker(bind=instrumented)())
+    >>> html = fs.render()
+    >>> for statement, seconds in reports.pop().statements:
+    ...     print ' '.join(statement.split()[:4])
+    SELECT users.id AS users_id,
+
+    Nothing is reported once the instrumentation is disabled:
+
+    >>> config.instrumentation = None
+    >>> html = FieldSet(Order).render()
+    >>> reports
+    []
+    """
+
+def summary():
+    """
+    >>> instrumentation = Instrumentation()
+    >>> reports = []
+    >>> instrumentation.subscribe(reports.append)
+    >>> config.instrumentation = instrumentation
+    >>> html = FieldSet(Order, session=session).bind(session.query(Order).get(1)).render()
+    >>> print reports[0].summary() #doctest: +ELLIPSIS
+    render of <FieldSet (configured) with ['quantity', 'user']>: ...ms, ... SQL statements
+      fields:
+        ...
+      templates:
+        fieldset ... 1 ...ms
+    >>> instrumentation.unsubscribe(reports.append)
+    >>> html = FieldSet(Order).render()
+    >>> len(reports)
+    1
+    >>> config.instrumentation = None
+    """
+
+def observer_errors():
+    """
+    The errors of the observers are logged, they do not change the result of
+    the operations:
+
+    >>> instrumentation = Instrumentation()
+    >>> def observer(report):
+    ...     raise RuntimeError('observer error')
+    >>> instrumentation.subscribe(observer)
+    >>> config.instrumentation = instrumentation
+    >>> fs = FieldSet(Order, session=session).bind(session.query(Order).get(1))
+    >>> config.instrumentation = None
+    >>> html = fs.render()
+    >>> config.instrumentation = instrumentation
+    >>> fs.render() == html
+    True
+    >>> grid = Grid(Order, session.query(Order).all())
+    >>> grid.readonly = True
+    >>> grid.rebind(data={})
+    >>> grid.sync()
+    Traceback (most recent call last):
+    ...
+    Exception: Cannot sync a read-only Grid
+    >>> config.instrumentation = None
+    """
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
@@ -99,3 +99,19 @@ def test_deserialize_new_record():
     session.rollback()
 
 
+
+def test_collection_deserialization():
+    """
+    Collections of objects with a composite primary key are loaded with one
+    query:
+
+    >>> s = sessionmaker(autoflush=False, bind=engine)()
+    >>> fs = FieldSet(Holder, session=s, data={'Holder--keys': ["(1, '33')", "(1, '22')"]})
+    >>> counter = QueryCounter()
+    >>> counter.start()
+    >>> fs.keys.value
+    [(1, u'33'), (1, u'22')]
+    >>> counter.stop()
+    1
+    >>> s.close()
+    """
@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 from formalchemy.tests import *
+from formalchemy.fields import OptionSet
 
 def test_dropdown():
     """
@@ -48,3 +49,196 @@ def test_lazy_record():
      </option>
     </select>
     """
+
+def test_collection_deserialization():
+    """
+    The selected items of a collection are loaded with one query, shared by
+    validate(), value and sync():
+
+    >>> s = sessionmaker(autoflush=False, bind=engine)()
+    >>> data = {'User--email': 'jack@example.com', 'User--password': 'pwd',
+    ...         'User--name': 'Jack', 'User--orders': ['1', '3', '2']}
+    >>> fs = FieldSet(User, session=s, data=data)
+    >>> counter = QueryCounter()
+    >>> counter.start()
+    >>> fs.validate()
+    True
+    >>> fs.orders.value
+    [1, 3, 2]
+    >>> fs.sync()
+    >>> counter.stop()
+    1
+    >>> [order.id for order in fs.model.orders]
+    [1, 3, 2]
+
+    Instances already loaded in the session are reused:
+
+    >>> fs = FieldSet(User, session=s, data=dict(data, **{'User--orders': ['2', '3']}))
+    >>> counter.start()
+    >>> fs.validate()
+    True
+    >>> counter.stop()
+    0
+
+    Unknown keys give None, like `query.get()`:
+
+    >>> fs = FieldSet(User, session=s, data=dict(data, **{'User--orders': ['1', '42']}))
+    >>> fs.orders.value
+    [1, None]
+
+    Long selections are split in several queries:
+
+    >>> s.close()
+    >>> fs = FieldSet(User, session=s, data=data)
+    >>> fs.orders._in_query_size = 2
+    >>> counter.start()
+    >>> fs.orders.value
+    [1, 3, 2]
+    >>> counter.stop()
+    2
+    >>> s.close()
+    """
+
+def test_autocomplete():
+    """
+    Only the current value is rendered, the options are not queried:
+
+    >>> order = session.query(Order).first()
+    >>> fs = FieldSet(order)
+    >>> fs.configure(include=[fs.user.autocomplete(lambda field: '/ac', label='name', limit=5), fs.quantity])
+    >>> _ = order.user
+    >>> counter = QueryCounter()
+    >>> counter.start()
+    >>> print fs.user.render()
+    <input id="Order-1-user_id__value" name="Order-1-user_id" type="hidden" value="1" /><input autocomplete="off" class="fa_autocomplete" data-limit="5" data-source="/ac" id="Order-1-user_id" name="Order-1-user_id__label" type="text" value="Bill" />
+    >>> counter.stop()
+    0
+
+    Items are searched by prefix of the label column:
+
+    >>> fs.user.renderer.search(u'J')
+    [(u'John', 2)]
+    >>> fs.user.renderer.search(u'%')
+    []
+    >>> fs.user.renderer.search(u'')
+    [(u'Bill', 1), (u'John', 2)]
+    >>> fs.user.renderer.search(u'', limit=1)
+    [(u'Bill', 1)]
+
+    The limit asked by the client is capped by the limit of the field, or by
+    `default_limit` when the field has none:
+
+    >>> fs.user.renderer.limit(), fs.user.renderer.limit('2'), fs.user.renderer.limit('1000')
+    (5, 2, 5)
+    >>> fs.user.renderer.limit('a lot')
+    Traceback (most recent call last):
+    ...
+    ValueError: invalid literal for int() with base 10: 'a lot'
+    >>> fs.user.renderer.limit('-1')
+    Traceback (most recent call last):
+    ...
+    ValueError: limit must be positive, got -1
+    >>> renderer = fs.user.autocomplete('/ac', limit=None).renderer
+    >>> renderer.limit(), renderer.limit('1000'), renderer.max_limit
+    (20, 20, 20)
+    >>> 'data-limit="20"' in renderer.render()
+    True
+
+    The first string column is used when no label is given:
+
+    >>> fs = FieldSet(Order, session=session)
+    >>> fs.user.autocomplete('/ac').renderer.search(u'john@')
+    [(u'John', 2)]
+
+    Submitted values are deserialized like a select, and the submitted label is
+    rendered again:
+
+    >>> fs = FieldSet(order, data={'Order-1-user_id': '2', 'Order-1-user_id__label': 'John',
+    ...                            'Order-1-quantity': '10'})
+    >>> fs.configure(include=[fs.user.autocomplete('/ac'), fs.quantity])
+    >>> fs.validate()
+    True
+    >>> print fs.user.render()
+    <input id="Order-1-user_id__value" name="Order-1-user_id" type="hidden" value="2" /><input autocomplete="off" class="fa_autocomplete" data-limit="20" data-source="/ac" id="Order-1-user_id" name="Order-1-user_id__label" type="text" value="John" />
+    >>> fs.sync()
+    >>> order.user_id
+    2
+    >>> session.rollback()
+    """
+
+def test_option_label():
+    """
+    Options labelled by a column are fetched as `(label, pk)` rows, the
+    related instances are not loaded:
+
+    >>> s = sessionmaker(autoflush=False, bind=engine)()
+    >>> fs = FieldSet(Order, session=s)
+    >>> fs.configure(include=[fs.user.with_option_label(User.email)])
+    >>> print pretty_html(fs.user.render())
+    <select id="Order--user_id" name="Order--user_id">
+     <option value="1">
+      bill@example.com
+     </option>
+     <option value="2">
+      john@example.com
+     </option>
+    </select>
+    >>> len(s.identity_map)
+    0
+
+    Attribute names and SQL expressions work too:
+
+    >>> fs.user.set(option_label='name').render_opts
+    {}
+    >>> fs.user._relation_options()
+    [(u'Bill', 1), (u'John', 2)]
+    >>> fs.user.set(option_label=User.name + ' <' + User.email + '>')._relation_options()
+    [(u'Bill <bill@example.com>', 1), (u'John <john@example.com>', 2)]
+    >>> fs = FieldSet(OptionalOrder, session=s)
+    >>> fs.user.with_option_label('email')._relation_options()
+    [(u'None', u''), (u'bill@example.com', 1), (u'john@example.com', 2)]
+    >>> s.close()
+    """
+
+def test_option_set():
+    """
+    Options are rendered once per OptionSet and only the selected options are
+    rendered again:
+
+    >>> options = OptionSet([('<b>', 'b'), ('None', None), ('C', 'c')])
+    >>> print options.select('name', ['b', ''], null_value='')
+    <select id="name" name="name">
+    <option selected="selected" value="b">&lt;b&gt;</option>
+    <option selected="selected" value="">None</option>
+    <option value="c">C</option>
+    </select>
+    >>> options._html.keys()
+    ['']
+    >>> print options.select('other', 'c', null_value='-', multiple=True)
+    <select id="other" multiple="multiple" name="other">
+    <option value="b">&lt;b&gt;</option>
+    <option value="-">None</option>
+    <option selected="selected" value="c">C</option>
+    </select>
+
+    Static and relation options are OptionSets, shared by the rows of a grid:
+
+    >>> fs = FieldSet(bill)
+    >>> isinstance(fs.orders.dropdown(options=[('a', 1)]).render_opts['options'], OptionSet)
+    True
+    >>> g = Grid(Order).bind(session.query(Order).all(), session=session)
+    >>> g._options_memo = {}
+    >>> rows = []
+    >>> for row in g.rows:
+    ...     g._set_active(row)
+    ...     rows.append(g.user._relation_options())
+    >>> rows[0] is rows[1], rows[0]._html.keys()
+    (True, [])
+    >>> g._options_memo = None
+
+    Checkboxes are checked with set lookups:
+
+    >>> fs.configure(include=[fs.orders.checkbox()])
+    >>> fs.orders.renderer._selection()
+    set([u'1'])
+    """
@@ -199,6 +199,138 @@ True
 >>> g.sync()
 >>> bill.email
 'updatebill_@example.com'
+
+Relation options are queried once per render, whatever the number of rows:
+>>> from formalchemy import Grid as BaseGrid
+>>> orders = session.query(Order).all() * 50
+>>> g = BaseGrid(Order).bind(orders, session=session)
+>>> counter = QueryCounter()
+>>> counter.start()
+>>> html = g.render()
+>>> html.count('<select'), html.count('Bill')
+(150, 150)
+>>> html = g.render()
+>>> counter.stop()
+2
+>>> g = BaseGrid(User).bind([bill, john] * 100, session=session)
+>>> counter.start()
+>>> html = g.render()
+>>> counter.stop()
+1
+
+prepare_query() eager loads the rendered relations:
+>>> g = BaseGrid(Order)
+>>> g.configure(readonly=True)
+>>> def count_queries(model, prepare=False):
+...     s = sessionmaker(autoflush=False, bind=engine)()
+...     query = s.query(model)
+...     if prepare:
+...         query = g.prepare_query(query)
+...     counter.start()
+...     html = g.bind(query.all(), session=s).render()
+...     s.close()
+...     return counter.stop()
+>>> count_queries(Order)
+3
+>>> count_queries(Order, prepare=True)
+1
+>>> g = BaseGrid(User)
+>>> g.configure(include=[g.name, g.orders], readonly=True)
+>>> count_queries(User)
+3
+>>> count_queries(User, prepare=True)
+2
+>>> print g.prepare_query(session.query(User), defer_columns=True)
+SELECT users.id AS users_id, users.name AS users_name 
+FROM users
+
+render_iter() renders the rows by chunks, the head only once:
+>>> g = BaseGrid(User).bind(iter([bill, john] * 3), session=session)
+>>> g.configure(include=[g.name], readonly=True)
+>>> chunks = list(g.render_iter(chunk_size=3))
+>>> len(chunks), [c.count('<thead>') for c in chunks], [c.count('<tr class') for c in chunks]
+(2, [1, 0], [4, 2])
+>>> ''.join(chunks).count('class="even"')
+3
+>>> print pretty_html(chunks[1])
+<tbody>
+ <tr class="even">
+  <td>
+   Bill_
+  </td>
+ </tr>
+ <tr class="odd">
+  <td>
+   John_
+  </td>
+ </tr>
+</tbody>
+>>> g._render_head
+True
+
+stream_page() streams the rows where the page renders the grid:
+>>> g = BaseGrid(User).bind([bill, john] * 3, session=session)
+>>> g.configure(include=[g.name], readonly=True)
+>>> page = g.stream_page(lambda: u'<table>%s</table>' % g.render(), chunk_size=2)
+>>> page.next()
+'<table>'
+>>> body = ''.join(page)
+>>> body.count('<thead>'), body.count('<tbody>'), body.count('Bill'), body[-8:]
+(1, 3, 3, '</table>')
+>>> g.render() == ''.join(g.render_iter(chunk_size=10))
+True
+>>> g.engine = lambda name, collection, **kwargs: u'<%s>' % kwargs['lang']
+>>> ''.join(g.stream_page(lambda: u'<div>%s</div>' % g.render(lang='fr'), chunk_size=6))
+'<div><fr></div>'
+
+A page which does not render the grid is an error:
+>>> g.stream_page(lambda: u'<div></div>')
+Traceback (most recent call last):
+...
+ValueError: The page does not render the grid
+
+records() yields the model values or the readonly text of the rows:
+>>> g = BaseGrid(User).bind([bill, john], session=session)
+>>> g.append(Field('upper', value=lambda user: user.name.upper()))
+>>> for pk, values in g.records():
+...     print pk, values
+1 ['updatebill_@example.com', '1234_', 'Bill_', [1], 'BILL_']
+2 ['john_@example.com', '5678_', 'John_', [2, 3], 'JOHN_']
+>>> for pk, values in g.records(text=True):
+...     print pk, values
+1 [u'updatebill_@example.com', u'1234_', u'Bill_', literal(u'Quantity: 10'), u'BILL_']
+2 [u'john_@example.com', u'5678_', u'John_', literal(u'Quantity: 5, Quantity: 6'), u'JOHN_']
+
+They are the values read by rebinding the grid to each row:
+>>> g = BaseGrid(Order).bind(session.query(Order).all(), session=session)
+>>> from formalchemy.fields import _pk, _stringify
+>>> def rebound(text):
+...     for row in g.rows:
+...         g._set_active(row)
+...         if text:
+...             yield _pk(row), [_stringify(f.render_readonly()) for f in g.render_fields.values()]
+...         else:
+...             yield _pk(row), [f.model_value for f in g.render_fields.values()]
+>>> model = g.model
+>>> values, texts = list(g.records()), list(g.records(text=True))
+>>> g.model is model
+True
+>>> [g.model is model for record in g.records()]
+[True, True, True]
+>>> values == list(rebound(False)), texts == list(rebound(True))
+(True, True)
+
+The names of the renderers are the ones of each row:
+>>> class NameRenderer(FieldRenderer):
+...     def render_readonly(self, **kwargs):
+...         return self.name
+>>> g = BaseGrid(Order).bind(session.query(Order).all(), session=session)
+>>> g.configure(include=[g.quantity.with_renderer(NameRenderer)])
+>>> for pk, values in g.records(text=True):
+...     print pk, values
+1 [u'Order-1-quantity']
+2 [u'Order-2-quantity']
+3 [u'Order-3-quantity']
 """
 
 if __name__ == '__main__':
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+import cPickle
+from formalchemy.tests import *
+from formalchemy import templates
+
+def render(engine):
+    return engine('fieldset', fieldset=FieldSet(User))
+
+def write(dirname, filename, source):
+    fd = open(os.path.join(dirname, filename), 'w')
+    fd.write(source)
+    fd.close()
+
+def tempita_cache():
+    """
+    The parsed templates are pickled in the `cache_dir`:
+
+    >>> cache_dir = tempfile.mkdtemp()
+    >>> html = render(templates.TempitaEngine(cache_dir=cache_dir))
+    >>> pickles = os.listdir(os.path.join(cache_dir, 'tempita'))
+    >>> [p.split('-')[0] for p in pickles], pickles[0].endswith('.pickle')
+    (['fieldset'], True)
+
+    Another engine renders the same html:
+
+    >>> render(templates.TempitaEngine(cache_dir=cache_dir)) == html
+    True
+
+    It does not parse the template again, it loads the pickle:
+
+    >>> pickle = os.path.join(cache_dir, 'tempita', pickles[0])
+    >>> write(os.path.dirname(pickle), pickles[0], cPickle.dumps(templates.TempitaTemplate('from the cache'), 2))
+    >>> render(templates.TempitaEngine(cache_dir=cache_dir))
+    'from the cache'
+    >>> render(templates.TempitaEngine(cache_dir=cache_dir, production=True))
+    'from the cache'
+
+    A modified template gets a new pickle, even in production:
+
+    >>> directory = tempfile.mkdtemp()
+    >>> write(directory, 'fieldset.tmpl', 'v1 {{fieldset.model.__class__.__name__}}')
+    >>> render(templates.TempitaEngine(directories=[directory], cache_dir=cache_dir, production=True))
+    'v1 User'
+    >>> write(directory, 'fieldset.tmpl', 'v2 {{fieldset.model.__class__.__name__}}')
+    >>> render(templates.TempitaEngine(directories=[directory], cache_dir=cache_dir, production=True))
+    'v2 User'
+    >>> len(os.listdir(os.path.join(cache_dir, 'tempita')))
+    3
+
+    >>> shutil.rmtree(cache_dir)
+    >>> shutil.rmtree(directory)
+    """
+
+def mako_cache():
+    """
+    The `cache_dir` is the `module_directory` of mako. The bundled templates
+    are written there with their modules:
+
+    >>> cache_dir = tempfile.mkdtemp()
+    >>> options = dict(input_encoding='utf-8', output_encoding='utf-8')
+    >>> html = render(templates.MakoEngine(cache_dir=cache_dir, **options))
+    >>> sorted(os.listdir(os.path.join(cache_dir, 'formalchemy')))
+    ['fieldset.mako', 'fieldset.mako.py']
+    >>> render(templates.MakoEngine(cache_dir=cache_dir, **options)) == html
+    True
+
+    The modules of the templates of the `directories` are there too. They are
+    compiled again when their template is modified:
+
+    >>> directory = tempfile.mkdtemp()
+    >>> write(directory, 'fieldset.mako', 'v1 ${fieldset.model.__class__.__name__}')
+    >>> render(templates.MakoEngine(directories=[directory], cache_dir=cache_dir, **options))
+    u'v1 User'
+    >>> os.path.isfile(os.path.join(cache_dir, 'fieldset.mako.py'))
+    True
+    >>> write(directory, 'fieldset.mako', 'v2 ${fieldset.model.__class__.__name__}')
+    >>> mtime = os.path.getmtime(os.path.join(cache_dir, 'fieldset.mako.py')) + 10
+    >>> os.utime(os.path.join(directory, 'fieldset.mako'), (mtime, mtime))
+    >>> render(templates.MakoEngine(directories=[directory], cache_dir=cache_dir, **options))
+    u'v2 User'
+
+    >>> shutil.rmtree(cache_dir)
+    >>> shutil.rmtree(directory)
+    """
+
+def installed():
+    """
+    The template languages are found without being imported, even in a
+    zipped egg:
+
+    >>> import sys, zipfile
+    >>> dirname = tempfile.mkdtemp()
+    >>> egg = zipfile.ZipFile(os.path.join(dirname, 'zipped.egg'), 'w')
+    >>> egg.writestr('zipped_language/__init__.py', 'raise ImportError')
+    >>> egg.close()
+    >>> sys.path.append(os.path.join(dirname, 'zipped.egg'))
+    >>> templates._is_installed('zipped_language'), 'zipped_language' in sys.modules
+    (True, False)
+    >>> templates._is_installed('missing_language')
+    False
+
+    >>> sys.path.remove(os.path.join(dirname, 'zipped.egg'))
+    >>> shutil.rmtree(dirname)
+    """
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
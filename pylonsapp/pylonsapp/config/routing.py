@@ -25,7 +25,8 @@ def make_map(config):
     map.connect('admin', '/admin', controller='admin', action='models')
     map.connect('formatted_admin', '/admin.json', controller='admin', action='models', format='json')
     # Models
-    map.resource('model', 'models', path_prefix='/admin/{model_name}', controller='admin')
+    map.resource('model', 'models', path_prefix='/admin/{model_name}', controller='admin',
+                 collection={'autocomplete': 'GET'})
 
     # serve couchdb's Pets as resource
     # Index page
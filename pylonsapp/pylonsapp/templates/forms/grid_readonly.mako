@@ -1,4 +1,5 @@
 # -*- coding: utf-8 -*-
+%if collection._render_head:
 <thead>
   <tr>
     %for field in collection.render_fields.itervalues():
@@ -6,6 +7,7 @@
     %endfor
   </tr>
 </thead>
+%endif
 
 <tbody>
 %for i, row in enumerate(collection.rows):
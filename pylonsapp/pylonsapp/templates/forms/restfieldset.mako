@@ -34,6 +34,7 @@ from pylons import url
     ${collection_name.title()}
     </title>
     <link rel="stylesheet" type="text/css" href="${url('fa_static', path_info='/admin.css')}" />
+    <script type="text/javascript" src="${url('fa_static', path_info='/autocomplete.js')}"></script>
   </head>
   <body>
 <div id="content" class="ui-admin ui-widget">
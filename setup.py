@@ -57,6 +57,7 @@ setup(name='FormAlchemy',
       packages=find_packages(),
       package_data={'formalchemy': ['*.tmpl', 'i18n_resources/*/LC_MESSAGES/formalchemy.mo',
                                     'ext/pylons/*.mako', 'ext/pylons/resources/*.css', 'ext/pylons/resources/*.png',
+                                    'resources/*.js',
                                     'tests/data/mako/*.mako', 'tests/data/genshi/*.html',
                                     'paster_templates/pylons_fa/+package+/*/*_tmpl',
                                     ]},